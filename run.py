@@ -8,20 +8,21 @@ A tool that evaluates product ideas using AI agents inspired by tech leaders.
 import os
 import subprocess
 import sys
-import requests
-from dotenv import load_dotenv
 
 def check_ollama_availability():
     """Check if Ollama is running and available."""
+    # urllib is enough for a single health check and avoids importing requests at startup
+    from urllib.request import urlopen
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=2)
-        return response.status_code == 200
+        with urlopen("http://localhost:11434/api/tags", timeout=2) as response:
+            return response.status == 200
     except:
         return False
 
 def main():
     """Run the AI Product Ideas Evaluator."""
     # Load environment variables
+    from dotenv import load_dotenv
     load_dotenv()
     
     # Check for model provider
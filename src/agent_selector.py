@@ -1,14 +1,16 @@
 from typing import Dict, List, Any, Optional, Callable
-from pydantic import BaseModel
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 import json
 import os
-from rich.console import Console
-from rich.prompt import Confirm, Prompt
-from rich.table import Table
-from rich import print as rprint
+import sys
 
+# dataclass(slots=True) needs Python 3.10+; older interpreters fall back to a regular dataclass
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-class AgentConfig(BaseModel):
+
+@dataclass(**_DATACLASS_OPTIONS)
+class AgentConfig:
     """Configuration for an agent."""
     name: str
     description: str
@@ -27,7 +29,17 @@ class AgentSelector:
             config_file: Optional path to a JSON config file to load/save agent settings
         """
         self.config_file = config_file or "agent_config.json"
-        self.console = Console()
+        self._console = None
+        
+        # Agent orderings, rebuilt lazily after configuration changes
+        self._sorted_ids: Optional[List[str]] = None
+        self._enabled_cache: Optional[Dict[str, AgentConfig]] = None
+        self._enabled_ids: frozenset = frozenset()
+        
+        # Set when the in-memory configuration differs from the config file
+        self._dirty = False
+        # Serialized configuration last read from or written to the config file
+        self._saved_config: Optional[str] = None
         
         # Default agent configurations
         self.agents = {
@@ -82,36 +94,80 @@ class AgentSelector:
         # Load configuration if file exists
         self._load_config()
     
+    @property
+    def console(self):
+        """Rich console, created on first use so importing the selector stays cheap."""
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console()
+        return self._console
+    
     def _load_config(self) -> None:
         """Load agent configuration from file if it exists."""
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r') as f:
-                    config_data = json.load(f)
-                    for agent_id, config in config_data.items():
-                        if agent_id in self.agents:
-                            self.agents[agent_id].enabled = config.get("enabled", True)
-                            self.agents[agent_id].priority = config.get("priority", 0)
-            except Exception as e:
-                self.console.print(f"[red]Error loading config: {e}[/red]")
+        try:
+            # Open directly instead of checking existence first to save a stat call
+            with open(self.config_file, 'rb') as f:
+                config_data = json.loads(f.read())
+            for agent_id, config in config_data.items():
+                if agent_id in self.agents:
+                    self.agents[agent_id].enabled = config.get("enabled", True)
+                    self.agents[agent_id].priority = config.get("priority", 0)
+            self._saved_config = self._serialize_config()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.console.print(f"[red]Error loading config: {e}[/red]")
+        self._invalidate_cache()
+    
+    def _invalidate_cache(self) -> None:
+        """Forget derived agent orderings after the configuration changes."""
+        self._sorted_ids = None
+        self._enabled_cache = None
+    
+    def _get_sorted_ids(self) -> List[str]:
+        """Get all agent IDs sorted by priority, then ID."""
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(
+                self.agents,
+                key=lambda agent_id: (self.agents[agent_id].priority, agent_id)
+            )
+        return self._sorted_ids
+    
+    def _serialize_config(self) -> str:
+        """Serialize the persisted subset of the agent configuration."""
+        return json.dumps({
+            agent_id: {
+                "enabled": agent.enabled,
+                "priority": agent.priority
+            }
+            for agent_id, agent in self.agents.items()
+        }, indent=2)
     
     def _save_config(self) -> None:
         """Save current agent configuration to file."""
         try:
-            config_data = {
-                agent_id: {
-                    "enabled": agent.enabled,
-                    "priority": agent.priority
-                }
-                for agent_id, agent in self.agents.items()
-            }
-            with open(self.config_file, 'w') as f:
-                json.dump(config_data, f, indent=2)
+            serialized = self._serialize_config()
+            # Skip the write when the changes cancelled out, e.g. an agent toggled twice
+            if serialized != self._saved_config:
+                # Swap the file in atomically
+                tmp_file = f"{self.config_file}.tmp"
+                with open(tmp_file, 'w') as f:
+                    f.write(serialized)
+                os.replace(tmp_file, self.config_file)
+                self._saved_config = serialized
+            self._dirty = False
         except Exception as e:
             self.console.print(f"[red]Error saving config: {e}[/red]")
     
+    def flush(self) -> None:
+        """Write pending configuration changes to the config file."""
+        if self._dirty:
+            self._save_config()
+    
     def display_agent_table(self) -> None:
         """Display a table of all available agents and their status."""
+        from rich.table import Table
+        
         table = Table(title="Available Agents")
         table.add_column("ID", style="cyan")
         table.add_column("Name", style="green")
@@ -119,13 +175,8 @@ class AgentSelector:
         table.add_column("Enabled", style="yellow")
         table.add_column("Priority", style="magenta")
         
-        # Sort agents by priority
-        sorted_agents = sorted(
-            self.agents.items(), 
-            key=lambda x: (x[1].priority, x[0])
-        )
-        
-        for agent_id, agent in sorted_agents:
+        for agent_id in self._get_sorted_ids():
+            agent = self.agents[agent_id]
             table.add_row(
                 agent_id,
                 agent.name,
@@ -140,6 +191,8 @@ class AgentSelector:
         """
         Toggle the enabled status of an agent.
         
+        The change is kept in memory until flush() is called.
+        
         Args:
             agent_id: The ID of the agent to toggle
             
@@ -153,7 +206,8 @@ class AgentSelector:
                 return False
                 
             self.agents[agent_id].enabled = not self.agents[agent_id].enabled
-            self._save_config()
+            self._invalidate_cache()
+            self._dirty = True
             return True
         return False
     
@@ -161,6 +215,8 @@ class AgentSelector:
         """
         Set the priority of an agent.
         
+        The change is kept in memory until flush() is called.
+        
         Args:
             agent_id: The ID of the agent
             priority: The new priority value (higher numbers = higher priority)
@@ -170,20 +226,36 @@ class AgentSelector:
         """
         if agent_id in self.agents:
             self.agents[agent_id].priority = priority
-            self._save_config()
+            self._invalidate_cache()
+            self._dirty = True
             return True
         return False
     
     def get_enabled_agents(self) -> Dict[str, AgentConfig]:
-        """Get a dictionary of all enabled agents."""
-        return {
-            agent_id: agent 
-            for agent_id, agent in self.agents.items() 
-            if agent.enabled
-        }
+        """
+        Get a dictionary of all enabled agents in priority order.
+        
+        The dictionary is cached until the configuration changes, so callers
+        should treat it as read-only.
+        """
+        if self._enabled_cache is None:
+            self._enabled_cache = {
+                agent_id: self.agents[agent_id]
+                for agent_id in self._get_sorted_ids()
+                if self.agents[agent_id].enabled
+            }
+            self._enabled_ids = frozenset(self._enabled_cache)
+        return self._enabled_cache
+    
+    def is_enabled(self, agent_id: str) -> bool:
+        """Check whether an agent is enabled using the cached enabled set."""
+        self.get_enabled_agents()
+        return agent_id in self._enabled_ids
     
     def interactive_selection(self) -> None:
         """Run an interactive selection process for agents."""
+        from rich.prompt import Prompt
+        
         self.console.print("[bold green]Agent Selection[/bold green]")
         self.console.print("Select which agents to include in your product evaluation.")
         
@@ -220,6 +292,11 @@ class AgentSelector:
                 self.console.print("[green]Configuration saved. Exiting...[/green]")
                 break
     
+    def clear_llm_cache(self) -> None:
+        """Clear cached LLM responses so the next evaluation queries the model again."""
+        from utils.llm import clear_llm_cache
+        clear_llm_cache()
+    
     def get_agent_functions(self, agent_functions: Dict[str, Callable]) -> Dict[str, Callable]:
         """
         Get the agent functions for enabled agents.
@@ -235,4 +312,43 @@ class AgentSelector:
             agent_id: agent_functions[agent_id]
             for agent_id in enabled_agents
             if agent_id in agent_functions
-        } 
\ No newline at end of file
+        }
+    
+    def run_all(self, state: Any, agent_functions: Dict[str, Callable]) -> Dict[str, Any]:
+        """
+        Run all enabled agents concurrently and collect their results.
+        
+        Agents are submitted in priority order to a thread pool. Each agent makes
+        independent blocking LLM calls, so the batch takes roughly as long as the
+        slowest agent. This relies on call_llm being thread-safe.
+        
+        Args:
+            state: The agent state passed to every agent function
+            agent_functions: Dictionary mapping agent IDs to their functions
+            
+        Returns:
+            Dict[str, Any]: Dictionary mapping agent IDs to their results (None if the agent failed)
+        """
+        # Enabled functions already come back in priority order
+        enabled_functions = self.get_agent_functions(agent_functions)
+        if not enabled_functions:
+            return {}
+        
+        ordered_ids = list(enabled_functions)
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(ordered_ids)) as executor:
+            futures = {
+                executor.submit(enabled_functions[agent_id], state): agent_id
+                for agent_id in ordered_ids
+            }
+            for future in as_completed(futures):
+                agent_id = futures[future]
+                try:
+                    results[agent_id] = future.result()
+                except Exception as e:
+                    self.console.print(f"[red]Error running {agent_id} agent: {e}[/red]")
+                    results[agent_id] = None
+        
+        # Preserve priority order in the returned mapping
+        return {agent_id: results[agent_id] for agent_id in ordered_ids}
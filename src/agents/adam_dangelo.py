@@ -1,17 +1,21 @@
 from graph.state import AgentState, show_agent_reasoning
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
-import json
+from pydantic import BaseModel, ConfigDict
+import asyncio
 import logging
+from typing import Dict, Tuple
 from typing_extensions import Literal
-from utils.llm import call_llm
+from utils.llm import acall_llm, register_cache_clear_hook
+from utils.json_extract import compact_json, parse_llm_json, with_defaults
 from utils.progress import progress
 
 # Configure logging
 logger = logging.getLogger('ai-product-evaluator')
 
 class AdamDAngeloSignal(BaseModel):
+    # Extra keys from the LLM are dropped; signals are read-only once built
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     platform_potential: float  # 0-1 score for platform potential
     ai_infrastructure: float  # 0-1 score for AI infrastructure
     social_impact: float  # 0-1 score for social impact
@@ -20,28 +24,66 @@ class AdamDAngeloSignal(BaseModel):
     platform_challenges: list[str]
 
 
-def adam_dangelo_agent(state: AgentState):
+# Fallback values used when the LLM response cannot be parsed
+_DANGELO_DEFAULTS = {
+    "platform_potential": 0.5,
+    "ai_infrastructure": 0.5,
+    "social_impact": 0.5,
+    "reasoning": "Unable to generate detailed reasoning.",
+    "key_features": ["Default feature"],
+    "platform_challenges": ["Default challenge"]
+}
+
+
+# Most recent signal keyed by its serialized inputs, so re-runs with unchanged inputs skip the LLM
+_last_run: Dict[str, AdamDAngeloSignal] = {}
+register_cache_clear_hook(_last_run.clear)
+
+
+async def adam_dangelo_agent_async(state: AgentState):
     """Analyzes product ideas using Adam D'Angelo's expertise in AI infrastructure and social platforms."""
     data = state["data"]
     product_idea = data["product_idea"]
-    technical_context = data.get("technical_context", {})
-    social_context = data.get("social_context", {})
 
-    # Collect analysis for LLM reasoning
-    analysis_data = {
-        "platform_analysis": analyze_platform_potential(product_idea, social_context),
-        "infrastructure_analysis": analyze_ai_infrastructure(product_idea, technical_context),
-        "social_analysis": analyze_social_impact(product_idea),
-        "scaling_potential": analyze_scaling_potential(product_idea, technical_context)
-    }
+    # Serialize each shared context once rather than in every sub-analysis
+    technical_json = compact_json(data.get("technical_context", {}))
+    social_json = compact_json(data.get("social_context", {}))
+
+    # Re-renders often evaluate the same inputs again
+    run_key = compact_json([product_idea, technical_json, social_json])
+    if run_key in _last_run:
+        return _last_run[run_key]
+
+    # Run the independent sub-analyses concurrently
+    analysis_keys = (
+        "platform_analysis",
+        "infrastructure_analysis",
+        "social_analysis",
+        "scaling_potential"
+    )
+    analysis_results = await asyncio.gather(
+        analyze_platform_potential(product_idea, social_json),
+        analyze_ai_infrastructure(product_idea, technical_json),
+        analyze_social_impact(product_idea),
+        analyze_scaling_potential(product_idea, technical_json)
+    )
+    analysis_data = dict(zip(analysis_keys, analysis_results))
+
+    signal, validated = await generate_dangelo_output(product_idea, analysis_data)
+    # Fallbacks are not remembered so the next run retries
+    if validated:
+        _last_run.clear()
+        _last_run[run_key] = signal
+    return signal
+
 
-    return generate_dangelo_output(product_idea, analysis_data)
+def adam_dangelo_agent(state: AgentState):
+    """Synchronous entry point for callers outside an event loop."""
+    return asyncio.run(adam_dangelo_agent_async(state))
 
 
-def analyze_platform_potential(product_idea: str, social_context: dict) -> dict:
-    """Analyzes platform potential and social dynamics."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze platform potential for: {product_idea}
+_PLATFORM_POTENTIAL_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Analyze platform potential for: {product_idea}
         Consider:
         1. Network effects
         2. User engagement
@@ -49,17 +91,23 @@ def analyze_platform_potential(product_idea: str, social_context: dict) -> dict:
         4. Platform stickiness
         5. Growth potential
         
-        Context: {json.dumps(social_context)}
+        Context: {context}
         """)
-    ])
+])
+
+
+async def analyze_platform_potential(product_idea: str, context_json: str) -> dict:
+    """Analyzes platform potential and social dynamics."""
+    messages = _PLATFORM_POTENTIAL_TEMPLATE.format_messages(
+        product_idea=product_idea,
+        context=context_json
+    )
     
-    return call_llm(prompt)
+    return await acall_llm(messages)
 
 
-def analyze_ai_infrastructure(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes AI infrastructure and technical requirements."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate AI infrastructure for: {product_idea}
+_AI_INFRASTRUCTURE_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Evaluate AI infrastructure for: {product_idea}
         Consider:
         1. AI/ML architecture
         2. Data pipeline
@@ -67,17 +115,23 @@ def analyze_ai_infrastructure(product_idea: str, technical_context: dict) -> dic
         4. Performance optimization
         5. Infrastructure scaling
         
-        Context: {json.dumps(technical_context)}
+        Context: {context}
         """)
-    ])
+])
+
+
+async def analyze_ai_infrastructure(product_idea: str, context_json: str) -> dict:
+    """Analyzes AI infrastructure and technical requirements."""
+    messages = _AI_INFRASTRUCTURE_TEMPLATE.format_messages(
+        product_idea=product_idea,
+        context=context_json
+    )
     
-    return call_llm(prompt)
+    return await acall_llm(messages)
 
 
-def analyze_social_impact(product_idea: str) -> dict:
-    """Analyzes social impact and community aspects."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate social impact for: {product_idea}
+_SOCIAL_IMPACT_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Evaluate social impact for: {product_idea}
         Consider:
         1. Community value
         2. Social dynamics
@@ -85,15 +139,20 @@ def analyze_social_impact(product_idea: str) -> dict:
         4. Privacy considerations
         5. Ethical implications
         """)
-    ])
+])
+
+
+async def analyze_social_impact(product_idea: str) -> dict:
+    """Analyzes social impact and community aspects."""
+    messages = _SOCIAL_IMPACT_TEMPLATE.format_messages(
+        product_idea=product_idea
+    )
     
-    return call_llm(prompt)
+    return await acall_llm(messages)
 
 
-def analyze_scaling_potential(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes scaling potential and technical requirements."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze scaling potential for: {product_idea}
+_SCALING_POTENTIAL_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Analyze scaling potential for: {product_idea}
         Consider:
         1. Infrastructure scaling
         2. Performance at scale
@@ -101,28 +160,25 @@ def analyze_scaling_potential(product_idea: str, technical_context: dict) -> dic
         4. Technical limitations
         5. Maintenance requirements
         
-        Context: {json.dumps(technical_context)}
+        Context: {context}
         """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def generate_dangelo_output(product_idea: str, analysis_data: dict) -> AdamDAngeloSignal:
-    """Generates final output using Adam D'Angelo's perspective."""
-    output_format = {
-        "platform_potential": "float between 0 and 1",
-        "ai_infrastructure": "float between 0 and 1",
-        "social_impact": "float between 0 and 1",
-        "reasoning": "string with detailed reasoning",
-        "key_features": "list of strings with key features",
-        "platform_challenges": "list of strings with platform challenges"
-    }
+])
+
+
+async def analyze_scaling_potential(product_idea: str, context_json: str) -> dict:
+    """Analyzes scaling potential and technical requirements."""
+    messages = _SCALING_POTENTIAL_TEMPLATE.format_messages(
+        product_idea=product_idea,
+        context=context_json
+    )
     
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""As Adam D'Angelo, evaluate this product idea: {product_idea}
+    return await acall_llm(messages)
+
+
+_OUTPUT_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """As Adam D'Angelo, evaluate this product idea: {product_idea}
         
-        Analysis data: {json.dumps(analysis_data)}
+        Analysis data: {analysis_data}
         
         Provide:
         1. Platform potential score (0-1)
@@ -144,69 +200,53 @@ def generate_dangelo_output(product_idea: str, analysis_data: dict) -> AdamDAnge
         
         Make sure your response is a valid JSON object that can be parsed directly.
         """)
-    ])
+])
+
+# Structure hint passed to call_llm, rendered to a string once
+_DANGELO_OUTPUT_FORMAT = str({
+    "platform_potential": "float between 0 and 1",
+    "ai_infrastructure": "float between 0 and 1",
+    "social_impact": "float between 0 and 1",
+    "reasoning": "string with detailed reasoning",
+    "key_features": "list of strings with key features",
+    "platform_challenges": "list of strings with platform challenges"
+})
+
+
+async def generate_dangelo_output(product_idea: str, analysis_data: dict) -> Tuple[AdamDAngeloSignal, bool]:
+    """Generates final output using Adam D'Angelo's perspective, and whether it came from a parsed response."""
+    messages = _OUTPUT_TEMPLATE.format_messages(
+        product_idea=product_idea,
+        analysis_data=compact_json(analysis_data)
+    )
     
     try:
         logger.info("Calling LLM for Adam D'Angelo evaluation")
-        response = call_llm(prompt, output_format=str(output_format))
-        logger.info(f"Raw response from LLM: {response}")
+        response = await acall_llm(messages, output_format=_DANGELO_OUTPUT_FORMAT)
+        logger.debug("Raw response from LLM: %s", response)
         
         # If response is a string, try to parse it as JSON
         if isinstance(response, str):
-            try:
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    parsed_response = json.loads(json_str)
-                else:
-                    logger.warning("No JSON found in response, creating default")
-                    parsed_response = {
-                        "platform_potential": 0.5,
-                        "ai_infrastructure": 0.5,
-                        "social_impact": 0.5,
-                        "reasoning": "Unable to generate detailed reasoning.",
-                        "key_features": ["Default feature"],
-                        "platform_challenges": ["Default challenge"]
-                    }
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON from response: {e}")
-                parsed_response = {
-                    "platform_potential": 0.5,
-                    "ai_infrastructure": 0.5,
-                    "social_impact": 0.5,
-                    "reasoning": "Unable to generate detailed reasoning.",
-                    "key_features": ["Default feature"],
-                    "platform_challenges": ["Default challenge"]
-                }
+            parsed_response = parse_llm_json(response, {})
         else:
             parsed_response = response
+        # Nothing could be parsed, so the signal is all defaults
+        validated = bool(parsed_response)
         
         # Ensure all required fields are present
-        if "platform_potential" not in parsed_response:
-            parsed_response["platform_potential"] = 0.5
-        if "ai_infrastructure" not in parsed_response:
-            parsed_response["ai_infrastructure"] = 0.5
-        if "social_impact" not in parsed_response:
-            parsed_response["social_impact"] = 0.5
-        if "reasoning" not in parsed_response:
-            parsed_response["reasoning"] = "Unable to generate detailed reasoning."
-        if "key_features" not in parsed_response:
-            parsed_response["key_features"] = ["Default feature"]
-        if "platform_challenges" not in parsed_response:
-            parsed_response["platform_challenges"] = ["Default challenge"]
+        parsed_response = with_defaults(parsed_response, _DANGELO_DEFAULTS)
         
-        logger.info(f"Parsed response: {parsed_response}")
-        return AdamDAngeloSignal(**parsed_response)
+        logger.debug("Parsed response: %s", parsed_response)
+        return AdamDAngeloSignal(**parsed_response), validated
     
     except Exception as e:
-        logger.error(f"Error generating Adam D'Angelo output: {e}", exc_info=True)
-        return AdamDAngeloSignal(
+        logger.error("Error generating Adam D'Angelo output: %s", e, exc_info=True)
+        # The fallback values are constants, so skip validation
+        return AdamDAngeloSignal.model_construct(
             platform_potential=0.5,
             ai_infrastructure=0.5,
             social_impact=0.5,
             reasoning="Error occurred during evaluation.",
             key_features=["Default feature"],
             platform_challenges=["Default challenge"]
-        ) 
\ No newline at end of file
+        ), False 
\ No newline at end of file
@@ -1,17 +1,21 @@
 from graph.state import AgentState, show_agent_reasoning
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
-import json
+from pydantic import BaseModel, ConfigDict
+import asyncio
 import logging
+from typing import Dict, Tuple
 from typing_extensions import Literal
-from utils.llm import call_llm
+from utils.llm import acall_llm, register_cache_clear_hook
+from utils.json_extract import compact_json, parse_llm_json, with_defaults
 from utils.progress import progress
 
 # Configure logging
 logger = logging.getLogger('ai-product-evaluator')
 
 class ClementDelangueSignal(BaseModel):
+    # Extra keys from the LLM are dropped; signals are read-only once built
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     ai_innovation_score: float  # 0-1 score for AI/ML innovation
     practical_application: float  # 0-1 score for practical application
     technical_feasibility: float  # 0-1 score for technical feasibility
@@ -20,28 +24,66 @@ class ClementDelangueSignal(BaseModel):
     implementation_challenges: list[str]
 
 
-def clement_delangue_agent(state: AgentState):
+# Fallback values used when the LLM response cannot be parsed
+_DELANGUE_DEFAULTS = {
+    "ai_innovation_score": 0.5,
+    "practical_application": 0.5,
+    "technical_feasibility": 0.5,
+    "reasoning": "Unable to generate detailed reasoning.",
+    "key_ai_features": ["Default feature"],
+    "implementation_challenges": ["Default challenge"]
+}
+
+
+# Most recent signal keyed by its serialized inputs, so re-runs with unchanged inputs skip the LLM
+_last_run: Dict[str, ClementDelangueSignal] = {}
+register_cache_clear_hook(_last_run.clear)
+
+
+async def clement_delangue_agent_async(state: AgentState):
     """Analyzes product ideas using Clement Delangue's AI/ML expertise and practical approach."""
     data = state["data"]
     product_idea = data["product_idea"]
-    technical_context = data.get("technical_context", {})
-    ai_context = data.get("ai_context", {})
 
-    # Collect analysis for LLM reasoning
-    analysis_data = {
-        "ai_analysis": analyze_ai_innovation(product_idea, ai_context),
-        "practical_analysis": analyze_practical_application(product_idea, technical_context),
-        "technical_analysis": analyze_technical_feasibility(product_idea),
-        "implementation_potential": analyze_implementation_potential(product_idea, technical_context)
-    }
+    # Serialize each shared context once rather than in every sub-analysis
+    technical_json = compact_json(data.get("technical_context", {}))
+    ai_json = compact_json(data.get("ai_context", {}))
+
+    # Re-renders often evaluate the same inputs again
+    run_key = compact_json([product_idea, technical_json, ai_json])
+    if run_key in _last_run:
+        return _last_run[run_key]
+
+    # Run the independent sub-analyses concurrently
+    analysis_keys = (
+        "ai_analysis",
+        "practical_analysis",
+        "technical_analysis",
+        "implementation_potential"
+    )
+    analysis_results = await asyncio.gather(
+        analyze_ai_innovation(product_idea, ai_json),
+        analyze_practical_application(product_idea, technical_json),
+        analyze_technical_feasibility(product_idea),
+        analyze_implementation_potential(product_idea, technical_json)
+    )
+    analysis_data = dict(zip(analysis_keys, analysis_results))
+
+    signal, validated = await generate_delangue_output(product_idea, analysis_data)
+    # Fallbacks are not remembered so the next run retries
+    if validated:
+        _last_run.clear()
+        _last_run[run_key] = signal
+    return signal
+
 
-    return generate_delangue_output(product_idea, analysis_data)
+def clement_delangue_agent(state: AgentState):
+    """Synchronous entry point for callers outside an event loop."""
+    return asyncio.run(clement_delangue_agent_async(state))
 
 
-def analyze_ai_innovation(product_idea: str, ai_context: dict) -> dict:
-    """Analyzes AI/ML innovation potential."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze AI/ML innovation potential for: {product_idea}
+_AI_INNOVATION_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Analyze AI/ML innovation potential for: {product_idea}
         Consider:
         1. Novel AI/ML approaches
         2. State-of-the-art techniques
@@ -49,17 +91,23 @@ def analyze_ai_innovation(product_idea: str, ai_context: dict) -> dict:
         4. Data requirements
         5. AI/ML competitive advantages
         
-        Context: {json.dumps(ai_context)}
+        Context: {context}
         """)
-    ])
+])
+
+
+async def analyze_ai_innovation(product_idea: str, context_json: str) -> dict:
+    """Analyzes AI/ML innovation potential."""
+    messages = _AI_INNOVATION_TEMPLATE.format_messages(
+        product_idea=product_idea,
+        context=context_json
+    )
     
-    return call_llm(prompt)
+    return await acall_llm(messages)
 
 
-def analyze_practical_application(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes practical application and real-world impact."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate practical application for: {product_idea}
+_PRACTICAL_APPLICATION_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Evaluate practical application for: {product_idea}
         Consider:
         1. Real-world use cases
         2. User value proposition
@@ -67,17 +115,23 @@ def analyze_practical_application(product_idea: str, technical_context: dict) ->
         4. Scalability
         5. Integration potential
         
-        Context: {json.dumps(technical_context)}
+        Context: {context}
         """)
-    ])
+])
+
+
+async def analyze_practical_application(product_idea: str, context_json: str) -> dict:
+    """Analyzes practical application and real-world impact."""
+    messages = _PRACTICAL_APPLICATION_TEMPLATE.format_messages(
+        product_idea=product_idea,
+        context=context_json
+    )
     
-    return call_llm(prompt)
+    return await acall_llm(messages)
 
 
-def analyze_technical_feasibility(product_idea: str) -> dict:
-    """Analyzes technical feasibility and implementation requirements."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate technical feasibility for: {product_idea}
+_TECHNICAL_FEASIBILITY_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Evaluate technical feasibility for: {product_idea}
         Consider:
         1. AI/ML infrastructure needs
         2. Data pipeline requirements
@@ -85,15 +139,20 @@ def analyze_technical_feasibility(product_idea: str) -> dict:
         4. Performance considerations
         5. Maintenance requirements
         """)
-    ])
+])
+
+
+async def analyze_technical_feasibility(product_idea: str) -> dict:
+    """Analyzes technical feasibility and implementation requirements."""
+    messages = _TECHNICAL_FEASIBILITY_TEMPLATE.format_messages(
+        product_idea=product_idea
+    )
     
-    return call_llm(prompt)
+    return await acall_llm(messages)
 
 
-def analyze_implementation_potential(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes implementation potential and technical roadmap."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze implementation potential for: {product_idea}
+_IMPLEMENTATION_POTENTIAL_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Analyze implementation potential for: {product_idea}
         Consider:
         1. Development timeline
         2. Resource requirements
@@ -101,28 +160,25 @@ def analyze_implementation_potential(product_idea: str, technical_context: dict)
         4. Integration challenges
         5. Scaling considerations
         
-        Context: {json.dumps(technical_context)}
+        Context: {context}
         """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def generate_delangue_output(product_idea: str, analysis_data: dict) -> ClementDelangueSignal:
-    """Generates final output using Clement Delangue's perspective."""
-    output_format = {
-        "ai_innovation_score": "float between 0 and 1",
-        "practical_application": "float between 0 and 1",
-        "technical_feasibility": "float between 0 and 1",
-        "reasoning": "string with detailed reasoning",
-        "key_ai_features": "list of strings with key AI features",
-        "implementation_challenges": "list of strings with implementation challenges"
-    }
+])
+
+
+async def analyze_implementation_potential(product_idea: str, context_json: str) -> dict:
+    """Analyzes implementation potential and technical roadmap."""
+    messages = _IMPLEMENTATION_POTENTIAL_TEMPLATE.format_messages(
+        product_idea=product_idea,
+        context=context_json
+    )
     
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""As Clement Delangue, evaluate this product idea: {product_idea}
+    return await acall_llm(messages)
+
+
+_OUTPUT_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """As Clement Delangue, evaluate this product idea: {product_idea}
         
-        Analysis data: {json.dumps(analysis_data)}
+        Analysis data: {analysis_data}
         
         Provide:
         1. AI/ML innovation score (0-1)
@@ -144,69 +200,53 @@ def generate_delangue_output(product_idea: str, analysis_data: dict) -> ClementD
         
         Make sure your response is a valid JSON object that can be parsed directly.
         """)
-    ])
+])
+
+# Structure hint passed to call_llm, rendered to a string once
+_DELANGUE_OUTPUT_FORMAT = str({
+    "ai_innovation_score": "float between 0 and 1",
+    "practical_application": "float between 0 and 1",
+    "technical_feasibility": "float between 0 and 1",
+    "reasoning": "string with detailed reasoning",
+    "key_ai_features": "list of strings with key AI features",
+    "implementation_challenges": "list of strings with implementation challenges"
+})
+
+
+async def generate_delangue_output(product_idea: str, analysis_data: dict) -> Tuple[ClementDelangueSignal, bool]:
+    """Generates final output using Clement Delangue's perspective, and whether it came from a parsed response."""
+    messages = _OUTPUT_TEMPLATE.format_messages(
+        product_idea=product_idea,
+        analysis_data=compact_json(analysis_data)
+    )
     
     try:
         logger.info("Calling LLM for Clement Delangue evaluation")
-        response = call_llm(prompt, output_format=str(output_format))
-        logger.info(f"Raw response from LLM: {response}")
+        response = await acall_llm(messages, output_format=_DELANGUE_OUTPUT_FORMAT)
+        logger.debug("Raw response from LLM: %s", response)
         
         # If response is a string, try to parse it as JSON
         if isinstance(response, str):
-            try:
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    parsed_response = json.loads(json_str)
-                else:
-                    logger.warning("No JSON found in response, creating default")
-                    parsed_response = {
-                        "ai_innovation_score": 0.5,
-                        "practical_application": 0.5,
-                        "technical_feasibility": 0.5,
-                        "reasoning": "Unable to generate detailed reasoning.",
-                        "key_ai_features": ["Default feature"],
-                        "implementation_challenges": ["Default challenge"]
-                    }
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON from response: {e}")
-                parsed_response = {
-                    "ai_innovation_score": 0.5,
-                    "practical_application": 0.5,
-                    "technical_feasibility": 0.5,
-                    "reasoning": "Unable to generate detailed reasoning.",
-                    "key_ai_features": ["Default feature"],
-                    "implementation_challenges": ["Default challenge"]
-                }
+            parsed_response = parse_llm_json(response, {})
         else:
             parsed_response = response
+        # Nothing could be parsed, so the signal is all defaults
+        validated = bool(parsed_response)
         
         # Ensure all required fields are present
-        if "ai_innovation_score" not in parsed_response:
-            parsed_response["ai_innovation_score"] = 0.5
-        if "practical_application" not in parsed_response:
-            parsed_response["practical_application"] = 0.5
-        if "technical_feasibility" not in parsed_response:
-            parsed_response["technical_feasibility"] = 0.5
-        if "reasoning" not in parsed_response:
-            parsed_response["reasoning"] = "Unable to generate detailed reasoning."
-        if "key_ai_features" not in parsed_response:
-            parsed_response["key_ai_features"] = ["Default feature"]
-        if "implementation_challenges" not in parsed_response:
-            parsed_response["implementation_challenges"] = ["Default challenge"]
+        parsed_response = with_defaults(parsed_response, _DELANGUE_DEFAULTS)
         
-        logger.info(f"Parsed response: {parsed_response}")
-        return ClementDelangueSignal(**parsed_response)
+        logger.debug("Parsed response: %s", parsed_response)
+        return ClementDelangueSignal(**parsed_response), validated
     
     except Exception as e:
-        logger.error(f"Error generating Clement Delangue output: {e}", exc_info=True)
-        return ClementDelangueSignal(
+        logger.error("Error generating Clement Delangue output: %s", e, exc_info=True)
+        # The fallback values are constants, so skip validation
+        return ClementDelangueSignal.model_construct(
             ai_innovation_score=0.5,
             practical_application=0.5,
             technical_feasibility=0.5,
             reasoning="Error occurred during evaluation.",
             key_ai_features=["Default feature"],
             implementation_challenges=["Default challenge"]
-        ) 
\ No newline at end of file
+        ), False 
\ No newline at end of file
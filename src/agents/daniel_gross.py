@@ -1,212 +1,137 @@
-from graph.state import AgentState, show_agent_reasoning
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
-import json
-import logging
-from typing_extensions import Literal
-from utils.llm import call_llm
-from utils.progress import progress
-
-# Configure logging
-logger = logging.getLogger('ai-product-evaluator')
+from graph.state import AgentState
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, ConfigDict
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+from utils.llm import register_cache_clear_hook
+from utils.json_extract import compact_json
+from utils.agent_finalize import finalize_signal, parse_signal
 
 class DanielGrossSignal(BaseModel):
-    startup_potential: float  # 0-1 score for startup potential
-    ai_infrastructure: float  # 0-1 score for AI infrastructure
-    market_fit: float  # 0-1 score for market fit
-    reasoning: str
-    key_advantages: list[str]
-    startup_challenges: list[str]
+    # Signals are read-only once built
+    model_config = ConfigDict(frozen=True)
 
+    startup_potential: float = 0.5  # 0-1 score for startup potential
+    ai_infrastructure: float = 0.5  # 0-1 score for AI infrastructure
+    market_fit: float = 0.5  # 0-1 score for market fit
+    reasoning: str = "Unable to generate detailed reasoning."
+    key_advantages: list[str] = ["Default advantage"]
+    startup_challenges: list[str] = ["Default challenge"]
 
-def daniel_gross_agent(state: AgentState):
+
+# Frozen, so the error fallback is built once and shared
+_ERROR_SIGNAL = DanielGrossSignal(reasoning="Error occurred during evaluation.")
+
+# Recent signals keyed by their rendered inputs, so re-runs with unchanged inputs skip the LLM
+_RECENT_RUNS_SIZE = 256
+_recent_runs: "OrderedDict[str, DanielGrossSignal]" = OrderedDict()
+register_cache_clear_hook(_recent_runs.clear)
+
+
+async def daniel_gross_agent_async(state: AgentState):
     """Analyzes product ideas using Daniel Gross's expertise in AI infrastructure and startup development."""
+    prompt = build_gross_prompt(state)
+    signal = recall_gross_run(prompt)
+    if signal is None:
+        signal = await generate_gross_output(prompt)
+        remember_gross_run(prompt, signal)
+    return signal
+
+
+def daniel_gross_agent(state: AgentState):
+    """Synchronous entry point for callers outside an event loop."""
+    return asyncio.run(daniel_gross_agent_async(state))
+
+
+# Static instructions go first so providers can reuse the cached prompt prefix across ideas.
+# The sub-analyses are part of the same response, so each evaluation is one provider call.
+_GROSS_STATIC_PREFIX = """As Daniel Gross, evaluate the product idea below using the context provided.
+
+First work through these analyses, each as a short paragraph:
+- startup_analysis: market opportunity, competitive advantages, growth potential, resource requirements and exit potential, using the market context
+- infrastructure_analysis: AI/ML architecture, data pipeline, model deployment, performance optimization and infrastructure scaling, using the technical context
+- market_analysis: customer needs, market size, competition, pricing strategy and customer acquisition
+- scaling_potential: infrastructure scaling, performance at scale, cost efficiency, technical limitations and maintenance requirements, using the technical context
+
+Then, based on those analyses, provide:
+1. Startup potential score (0-1)
+2. AI infrastructure score (0-1)
+3. Market fit score (0-1)
+4. Detailed reasoning
+5. Key advantages
+6. Startup challenges
+
+Format your response as a valid JSON object with the following structure:
+{
+    "startup_analysis": "<startup analysis as a string>",
+    "infrastructure_analysis": "<infrastructure analysis as a string>",
+    "market_analysis": "<market analysis as a string>",
+    "scaling_potential": "<scaling potential as a string>",
+    "startup_potential": <float between 0 and 1>,
+    "ai_infrastructure": <float between 0 and 1>,
+    "market_fit": <float between 0 and 1>,
+    "reasoning": "<detailed reasoning as a string>",
+    "key_advantages": ["<advantage 1>", "<advantage 2>", ...],
+    "startup_challenges": ["<challenge 1>", "<challenge 2>", ...]
+}
+
+Make sure your response is a valid JSON object that can be parsed directly."""
+
+
+GROSS_OUTPUT_FORMAT = str({
+    "startup_analysis": "string with the startup analysis",
+    "infrastructure_analysis": "string with the infrastructure analysis",
+    "market_analysis": "string with the market analysis",
+    "scaling_potential": "string with the scaling potential",
+    "startup_potential": "float between 0 and 1",
+    "ai_infrastructure": "float between 0 and 1",
+    "market_fit": "float between 0 and 1",
+    "reasoning": "string with detailed reasoning",
+    "key_advantages": "list of strings with key advantages",
+    "startup_challenges": "list of strings with startup challenges"
+})
+
+
+def build_gross_prompt(state: AgentState) -> list:
+    """Builds the single evaluation prompt from the agent state."""
     data = state["data"]
     product_idea = data["product_idea"]
-    technical_context = data.get("technical_context", {})
-    market_context = data.get("market_context", {})
-
-    # Collect analysis for LLM reasoning
-    analysis_data = {
-        "startup_analysis": analyze_startup_potential(product_idea, market_context),
-        "infrastructure_analysis": analyze_ai_infrastructure(product_idea, technical_context),
-        "market_analysis": analyze_market_fit(product_idea),
-        "scaling_potential": analyze_scaling_potential(product_idea, technical_context)
-    }
-
-    return generate_gross_output(product_idea, analysis_data)
-
-
-def analyze_startup_potential(product_idea: str, market_context: dict) -> dict:
-    """Analyzes startup potential and market opportunity."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze startup potential for: {product_idea}
-        Consider:
-        1. Market opportunity
-        2. Competitive advantages
-        3. Growth potential
-        4. Resource requirements
-        5. Exit potential
-        
-        Context: {json.dumps(market_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_ai_infrastructure(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes AI infrastructure and technical requirements."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate AI infrastructure for: {product_idea}
-        Consider:
-        1. AI/ML architecture
-        2. Data pipeline
-        3. Model deployment
-        4. Performance optimization
-        5. Infrastructure scaling
-        
-        Context: {json.dumps(technical_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_market_fit(product_idea: str) -> dict:
-    """Analyzes market fit and customer needs."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate market fit for: {product_idea}
-        Consider:
-        1. Customer needs
-        2. Market size
-        3. Competition
-        4. Pricing strategy
-        5. Customer acquisition
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_scaling_potential(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes scaling potential and technical requirements."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze scaling potential for: {product_idea}
-        Consider:
-        1. Infrastructure scaling
-        2. Performance at scale
-        3. Cost efficiency
-        4. Technical limitations
-        5. Maintenance requirements
-        
-        Context: {json.dumps(technical_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def generate_gross_output(product_idea: str, analysis_data: dict) -> DanielGrossSignal:
+
+    # Serialize each context once for the prompt
+    market_json = compact_json(data.get("market_context", {}))
+    technical_json = compact_json(data.get("technical_context", {}))
+
+    return [
+        SystemMessage(content=_GROSS_STATIC_PREFIX),
+        HumanMessage(content=f"Product idea: {product_idea}\n\nMarket context: {market_json}\n\nTechnical context: {technical_json}")
+    ]
+
+
+async def generate_gross_output(prompt: list) -> DanielGrossSignal:
     """Generates final output using Daniel Gross's perspective."""
-    output_format = {
-        "startup_potential": "float between 0 and 1",
-        "ai_infrastructure": "float between 0 and 1",
-        "market_fit": "float between 0 and 1",
-        "reasoning": "string with detailed reasoning",
-        "key_advantages": "list of strings with key advantages",
-        "startup_challenges": "list of strings with startup challenges"
-    }
-    
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""As Daniel Gross, evaluate this product idea: {product_idea}
-        
-        Analysis data: {json.dumps(analysis_data)}
-        
-        Provide:
-        1. Startup potential score (0-1)
-        2. AI infrastructure score (0-1)
-        3. Market fit score (0-1)
-        4. Detailed reasoning
-        5. Key advantages
-        6. Startup challenges
-        
-        Format your response as a valid JSON object with the following structure:
-        {{
-            "startup_potential": <float between 0 and 1>,
-            "ai_infrastructure": <float between 0 and 1>,
-            "market_fit": <float between 0 and 1>,
-            "reasoning": "<detailed reasoning as a string>",
-            "key_advantages": ["<advantage 1>", "<advantage 2>", ...],
-            "startup_challenges": ["<challenge 1>", "<challenge 2>", ...]
-        }}
-        
-        Make sure your response is a valid JSON object that can be parsed directly.
-        """)
-    ])
-    
-    try:
-        logger.info("Calling LLM for Daniel Gross evaluation")
-        response = call_llm(prompt, output_format=str(output_format))
-        logger.info(f"Raw response from LLM: {response}")
-        
-        # If response is a string, try to parse it as JSON
-        if isinstance(response, str):
-            try:
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    parsed_response = json.loads(json_str)
-                else:
-                    logger.warning("No JSON found in response, creating default")
-                    parsed_response = {
-                        "startup_potential": 0.5,
-                        "ai_infrastructure": 0.5,
-                        "market_fit": 0.5,
-                        "reasoning": "Unable to generate detailed reasoning.",
-                        "key_advantages": ["Default advantage"],
-                        "startup_challenges": ["Default challenge"]
-                    }
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON from response: {e}")
-                parsed_response = {
-                    "startup_potential": 0.5,
-                    "ai_infrastructure": 0.5,
-                    "market_fit": 0.5,
-                    "reasoning": "Unable to generate detailed reasoning.",
-                    "key_advantages": ["Default advantage"],
-                    "startup_challenges": ["Default challenge"]
-                }
-        else:
-            parsed_response = response
-        
-        # Ensure all required fields are present
-        if "startup_potential" not in parsed_response:
-            parsed_response["startup_potential"] = 0.5
-        if "ai_infrastructure" not in parsed_response:
-            parsed_response["ai_infrastructure"] = 0.5
-        if "market_fit" not in parsed_response:
-            parsed_response["market_fit"] = 0.5
-        if "reasoning" not in parsed_response:
-            parsed_response["reasoning"] = "Unable to generate detailed reasoning."
-        if "key_advantages" not in parsed_response:
-            parsed_response["key_advantages"] = ["Default advantage"]
-        if "startup_challenges" not in parsed_response:
-            parsed_response["startup_challenges"] = ["Default challenge"]
-        
-        logger.info(f"Parsed response: {parsed_response}")
-        return DanielGrossSignal(**parsed_response)
-    
-    except Exception as e:
-        logger.error(f"Error generating Daniel Gross output: {e}", exc_info=True)
-        return DanielGrossSignal(
-            startup_potential=0.5,
-            ai_infrastructure=0.5,
-            market_fit=0.5,
-            reasoning="Error occurred during evaluation.",
-            key_advantages=["Default advantage"],
-            startup_challenges=["Default challenge"]
-        ) 
\ No newline at end of file
+    return await finalize_signal(prompt, GROSS_OUTPUT_FORMAT, DanielGrossSignal, _ERROR_SIGNAL, "Daniel Gross")
+
+
+def parse_gross_response(response) -> DanielGrossSignal:
+    """Validates a raw LLM response into a signal; missing fields take the model defaults."""
+    return parse_signal(response, DanielGrossSignal, _ERROR_SIGNAL, "Daniel Gross")
+
+
+def recall_gross_run(prompt: list) -> Optional[DanielGrossSignal]:
+    """Returns the signal remembered for an evaluation prompt, or None."""
+    # The input message holds the product idea and every context, so it identifies the run
+    run_key = prompt[-1].content
+    signal = _recent_runs.get(run_key)
+    if signal is not None:
+        _recent_runs.move_to_end(run_key)
+    return signal
+
+
+def remember_gross_run(prompt: list, signal: DanielGrossSignal) -> None:
+    """Remembers the signal of an evaluation prompt; failures are not remembered so the next run retries."""
+    if signal is _ERROR_SIGNAL:
+        return
+    _recent_runs[prompt[-1].content] = signal
+    if len(_recent_runs) > _RECENT_RUNS_SIZE:
+        _recent_runs.popitem(last=False)
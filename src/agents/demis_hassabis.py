@@ -1,218 +1,137 @@
-from graph.state import AgentState, show_agent_reasoning
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
-import json
-import logging
-from typing_extensions import Literal
-from utils.llm import call_llm
-from utils.progress import progress
-
-# Configure logging
-logger = logging.getLogger('ai-product-evaluator')
+from graph.state import AgentState
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, ConfigDict
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+from utils.llm import register_cache_clear_hook
+from utils.json_extract import compact_json
+from utils.agent_finalize import finalize_signal, parse_signal
 
 class DemisHassabisSignal(BaseModel):
-    scientific_breakthrough_potential: float  # 0-1 score for scientific innovation
-    technical_advancement: float  # 0-1 score for technical advancement
-    research_feasibility: float  # 0-1 score for research implementation
-    reasoning: str
-    key_breakthroughs: list[str]
-    research_challenges: list[str]
+    # Signals are read-only once built
+    model_config = ConfigDict(frozen=True)
 
+    scientific_breakthrough_potential: float = 0.5  # 0-1 score for scientific innovation
+    technical_advancement: float = 0.5  # 0-1 score for technical advancement
+    research_feasibility: float = 0.5  # 0-1 score for research implementation
+    reasoning: str = "Unable to generate detailed reasoning."
+    key_breakthroughs: list[str] = ["Default breakthrough"]
+    research_challenges: list[str] = ["Default challenge"]
 
-def demis_hassabis_agent(state: AgentState):
+
+# Frozen, so the error fallback is built once and shared
+_ERROR_SIGNAL = DemisHassabisSignal(reasoning="Error occurred during evaluation.")
+
+# Recent signals keyed by their rendered inputs, so re-runs with unchanged inputs skip the LLM
+_RECENT_RUNS_SIZE = 256
+_recent_runs: "OrderedDict[str, DemisHassabisSignal]" = OrderedDict()
+register_cache_clear_hook(_recent_runs.clear)
+
+
+async def demis_hassabis_agent_async(state: AgentState):
     """Analyzes product ideas using Demis Hassabis's principles and scientific reasoning."""
+    prompt = build_hassabis_prompt(state)
+    signal = recall_hassabis_run(prompt)
+    if signal is None:
+        signal = await generate_hassabis_output(prompt)
+        remember_hassabis_run(prompt, signal)
+    return signal
+
+
+def demis_hassabis_agent(state: AgentState):
+    """Synchronous entry point for callers outside an event loop."""
+    return asyncio.run(demis_hassabis_agent_async(state))
+
+
+# Static instructions go first so providers can reuse the cached prompt prefix across ideas.
+# The sub-analyses are part of the same response, so each evaluation is one provider call.
+_HASSABIS_STATIC_PREFIX = """As Demis Hassabis, evaluate the product idea below using the context provided.
+
+First work through these analyses, each as a short paragraph:
+- scientific_analysis: novel scientific approaches, research gaps and opportunities, potential breakthroughs, scientific impact and research community interest, using the research context
+- technical_analysis: state-of-the-art technologies, innovation potential, technical challenges, required breakthroughs and implementation complexity, using the technical context
+- feasibility_analysis: required research resources, timeline estimates, technical dependencies, research risks and validation requirements
+- breakthrough_potential: novel approaches, scientific impact, industry applications, research community interest and long-term implications, using the research context
+
+Then, based on those analyses, provide:
+1. Scientific breakthrough potential score (0-1)
+2. Technical advancement score (0-1)
+3. Research feasibility score (0-1)
+4. Detailed reasoning
+5. Key breakthroughs
+6. Research challenges
+
+Format your response as a valid JSON object with the following structure:
+{
+    "scientific_analysis": "<scientific analysis as a string>",
+    "technical_analysis": "<technical analysis as a string>",
+    "feasibility_analysis": "<feasibility analysis as a string>",
+    "breakthrough_potential": "<breakthrough potential as a string>",
+    "scientific_breakthrough_potential": <float between 0 and 1>,
+    "technical_advancement": <float between 0 and 1>,
+    "research_feasibility": <float between 0 and 1>,
+    "reasoning": "<detailed reasoning as a string>",
+    "key_breakthroughs": ["<breakthrough 1>", "<breakthrough 2>", ...],
+    "research_challenges": ["<challenge 1>", "<challenge 2>", ...]
+}
+
+Make sure your response is a valid JSON object that can be parsed directly."""
+
+
+HASSABIS_OUTPUT_FORMAT = str({
+    "scientific_analysis": "string with the scientific analysis",
+    "technical_analysis": "string with the technical analysis",
+    "feasibility_analysis": "string with the feasibility analysis",
+    "breakthrough_potential": "string with the breakthrough potential",
+    "scientific_breakthrough_potential": "float between 0 and 1",
+    "technical_advancement": "float between 0 and 1",
+    "research_feasibility": "float between 0 and 1",
+    "reasoning": "string with detailed reasoning",
+    "key_breakthroughs": "list of strings with key breakthroughs",
+    "research_challenges": "list of strings with research challenges"
+})
+
+
+def build_hassabis_prompt(state: AgentState) -> list:
+    """Builds the single evaluation prompt from the agent state."""
     data = state["data"]
     product_idea = data["product_idea"]
-    technical_context = data.get("technical_context", {})
-    research_context = data.get("research_context", {})
-
-    # Collect analysis for LLM reasoning
-    analysis_data = {
-        "scientific_analysis": analyze_scientific_potential(product_idea, research_context),
-        "technical_analysis": analyze_technical_advancement(product_idea, technical_context),
-        "research_feasibility": analyze_research_feasibility(product_idea),
-        "breakthrough_potential": analyze_breakthrough_potential(product_idea, research_context)
-    }
-
-    return generate_hassabis_output(product_idea, analysis_data)
-
-
-def analyze_scientific_potential(product_idea: str, research_context: dict) -> dict:
-    """Analyzes scientific potential and innovation opportunities."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze the scientific potential for: {product_idea}
-        Consider:
-        1. Novel scientific approaches
-        2. Research gaps and opportunities
-        3. Potential breakthroughs
-        4. Scientific impact
-        5. Research community interest
-        
-        Context: {json.dumps(research_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_technical_advancement(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes technical advancement and innovation potential."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate technical advancement for: {product_idea}
-        Consider:
-        1. State-of-the-art technologies
-        2. Innovation potential
-        3. Technical challenges
-        4. Required breakthroughs
-        5. Implementation complexity
-        
-        Context: {json.dumps(technical_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_research_feasibility(product_idea: str) -> dict:
-    """Analyzes research feasibility and implementation potential."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate research feasibility for: {product_idea}
-        Consider:
-        1. Required research resources
-        2. Timeline estimates
-        3. Technical dependencies
-        4. Research risks
-        5. Validation requirements
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_breakthrough_potential(product_idea: str, research_context: dict) -> dict:
-    """Analyzes potential for scientific breakthroughs and innovations."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze breakthrough potential for: {product_idea}
-        Consider:
-        1. Novel approaches
-        2. Scientific impact
-        3. Industry applications
-        4. Research community interest
-        5. Long-term implications
-        
-        Context: {json.dumps(research_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def generate_hassabis_output(product_idea: str, analysis_data: dict) -> DemisHassabisSignal:
+
+    # Serialize each context once for the prompt
+    research_json = compact_json(data.get("research_context", {}))
+    technical_json = compact_json(data.get("technical_context", {}))
+
+    return [
+        SystemMessage(content=_HASSABIS_STATIC_PREFIX),
+        HumanMessage(content=f"Product idea: {product_idea}\n\nResearch context: {research_json}\n\nTechnical context: {technical_json}")
+    ]
+
+
+async def generate_hassabis_output(prompt: list) -> DemisHassabisSignal:
     """Generates final output using Demis Hassabis's perspective."""
-    # Define the expected output format
-    output_format = {
-        "scientific_breakthrough_potential": "float between 0 and 1",
-        "technical_advancement": "float between 0 and 1",
-        "research_feasibility": "float between 0 and 1",
-        "reasoning": "string with detailed reasoning",
-        "key_breakthroughs": "list of strings with key breakthroughs",
-        "research_challenges": "list of strings with research challenges"
-    }
-    
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""As Demis Hassabis, evaluate this product idea: {product_idea}
-        
-        Analysis data: {json.dumps(analysis_data)}
-        
-        Provide:
-        1. Scientific breakthrough potential score (0-1)
-        2. Technical advancement score (0-1)
-        3. Research feasibility score (0-1)
-        4. Detailed reasoning
-        5. Key breakthroughs
-        6. Research challenges
-        
-        Format your response as a valid JSON object with the following structure:
-        {{
-            "scientific_breakthrough_potential": <float between 0 and 1>,
-            "technical_advancement": <float between 0 and 1>,
-            "research_feasibility": <float between 0 and 1>,
-            "reasoning": "<detailed reasoning as a string>",
-            "key_breakthroughs": ["<breakthrough 1>", "<breakthrough 2>", ...],
-            "research_challenges": ["<challenge 1>", "<challenge 2>", ...]
-        }}
-        
-        Make sure your response is a valid JSON object that can be parsed directly.
-        """)
-    ])
-    
-    try:
-        logger.info("Calling LLM for Demis Hassabis evaluation")
-        response = call_llm(prompt, output_format=str(output_format))
-        logger.info(f"Raw response from LLM: {response}")
-        
-        # If response is a string, try to parse it as JSON
-        if isinstance(response, str):
-            try:
-                # Try to extract JSON from the response
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    parsed_response = json.loads(json_str)
-                else:
-                    # If no JSON found, create a default response
-                    logger.warning("No JSON found in response, creating default")
-                    parsed_response = {
-                        "scientific_breakthrough_potential": 0.5,
-                        "technical_advancement": 0.5,
-                        "research_feasibility": 0.5,
-                        "reasoning": "Unable to generate detailed reasoning.",
-                        "key_breakthroughs": ["Default breakthrough"],
-                        "research_challenges": ["Default challenge"]
-                    }
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON from response: {e}")
-                # Create a default response
-                parsed_response = {
-                    "scientific_breakthrough_potential": 0.5,
-                    "technical_advancement": 0.5,
-                    "research_feasibility": 0.5,
-                    "reasoning": "Unable to generate detailed reasoning.",
-                    "key_breakthroughs": ["Default breakthrough"],
-                    "research_challenges": ["Default challenge"]
-                }
-        else:
-            # Response is already a dict
-            parsed_response = response
-        
-        # Ensure all required fields are present
-        if "scientific_breakthrough_potential" not in parsed_response:
-            parsed_response["scientific_breakthrough_potential"] = 0.5
-        if "technical_advancement" not in parsed_response:
-            parsed_response["technical_advancement"] = 0.5
-        if "research_feasibility" not in parsed_response:
-            parsed_response["research_feasibility"] = 0.5
-        if "reasoning" not in parsed_response:
-            parsed_response["reasoning"] = "Unable to generate detailed reasoning."
-        if "key_breakthroughs" not in parsed_response:
-            parsed_response["key_breakthroughs"] = ["Default breakthrough"]
-        if "research_challenges" not in parsed_response:
-            parsed_response["research_challenges"] = ["Default challenge"]
-        
-        logger.info(f"Parsed response: {parsed_response}")
-        return DemisHassabisSignal(**parsed_response)
-    
-    except Exception as e:
-        logger.error(f"Error generating Demis Hassabis output: {e}", exc_info=True)
-        # Return a default response
-        return DemisHassabisSignal(
-            scientific_breakthrough_potential=0.5,
-            technical_advancement=0.5,
-            research_feasibility=0.5,
-            reasoning="Error occurred during evaluation.",
-            key_breakthroughs=["Default breakthrough"],
-            research_challenges=["Default challenge"]
-        ) 
\ No newline at end of file
+    return await finalize_signal(prompt, HASSABIS_OUTPUT_FORMAT, DemisHassabisSignal, _ERROR_SIGNAL, "Demis Hassabis")
+
+
+def parse_hassabis_response(response) -> DemisHassabisSignal:
+    """Validates a raw LLM response into a signal; missing fields take the model defaults."""
+    return parse_signal(response, DemisHassabisSignal, _ERROR_SIGNAL, "Demis Hassabis")
+
+
+def recall_hassabis_run(prompt: list) -> Optional[DemisHassabisSignal]:
+    """Returns the signal remembered for an evaluation prompt, or None."""
+    # The input message holds the product idea and every context, so it identifies the run
+    run_key = prompt[-1].content
+    signal = _recent_runs.get(run_key)
+    if signal is not None:
+        _recent_runs.move_to_end(run_key)
+    return signal
+
+
+def remember_hassabis_run(prompt: list, signal: DemisHassabisSignal) -> None:
+    """Remembers the signal of an evaluation prompt; failures are not remembered so the next run retries."""
+    if signal is _ERROR_SIGNAL:
+        return
+    _recent_runs[prompt[-1].content] = signal
+    if len(_recent_runs) > _RECENT_RUNS_SIZE:
+        _recent_runs.popitem(last=False)
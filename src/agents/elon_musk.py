@@ -1,212 +1,137 @@
-from graph.state import AgentState, show_agent_reasoning
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
-import json
-import logging
-from typing_extensions import Literal
-from utils.llm import call_llm
-from utils.progress import progress
-
-# Configure logging
-logger = logging.getLogger('ai-product-evaluator')
+from graph.state import AgentState
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, ConfigDict
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+from utils.llm import register_cache_clear_hook
+from utils.json_extract import compact_json
+from utils.agent_finalize import finalize_signal, parse_signal
 
 class ElonMuskSignal(BaseModel):
-    opportunity_score: float  # 0-1 score for opportunity
-    market_potential: float  # 0-1 score for market size
-    technical_feasibility: float  # 0-1 score for technical implementation
-    reasoning: str
-    key_insights: list[str]
-    potential_risks: list[str]
+    # Signals are read-only once built
+    model_config = ConfigDict(frozen=True)
 
+    opportunity_score: float = 0.5  # 0-1 score for opportunity
+    market_potential: float = 0.5  # 0-1 score for market size
+    technical_feasibility: float = 0.5  # 0-1 score for technical implementation
+    reasoning: str = "Unable to generate detailed reasoning."
+    key_insights: list[str] = ["Default insight"]
+    potential_risks: list[str] = ["Default risk"]
 
-def elon_musk_agent(state: AgentState):
+
+# Frozen, so the error fallback is built once and shared
+_ERROR_SIGNAL = ElonMuskSignal(reasoning="Error occurred during evaluation.")
+
+# Recent signals keyed by their rendered inputs, so re-runs with unchanged inputs skip the LLM
+_RECENT_RUNS_SIZE = 256
+_recent_runs: "OrderedDict[str, ElonMuskSignal]" = OrderedDict()
+register_cache_clear_hook(_recent_runs.clear)
+
+
+async def elon_musk_agent_async(state: AgentState):
     """Analyzes product ideas using Elon Musk's first principles thinking and innovation approach."""
+    prompt = build_musk_prompt(state)
+    signal = recall_musk_run(prompt)
+    if signal is None:
+        signal = await generate_musk_output(prompt)
+        remember_musk_run(prompt, signal)
+    return signal
+
+
+def elon_musk_agent(state: AgentState):
+    """Synchronous entry point for callers outside an event loop."""
+    return asyncio.run(elon_musk_agent_async(state))
+
+
+# Static instructions go first so providers can reuse the cached prompt prefix across ideas.
+# The sub-analyses are part of the same response, so each evaluation is one provider call.
+_MUSK_STATIC_PREFIX = """As Elon Musk, evaluate the product idea below using the context provided.
+
+First work through these analyses, each as a short paragraph:
+- first_principles: fundamental truths and assumptions, core problems being solved, novel approaches, potential for radical innovation and how complex problems break down into simpler ones, using the technical context
+- innovation_analysis: market disruption potential, technological advantages, competitive moat, scalability and network effects, using the market context
+- execution_analysis: resource requirements, timeline to market, technical dependencies, manufacturing challenges and operational complexity
+- disruption_potential: market transformation potential, industry impact, competitive advantages, market size and growth, and long-term vision, using the market context
+
+Then, based on those analyses, provide:
+1. Opportunity score (0-1)
+2. Market potential score (0-1)
+3. Technical feasibility score (0-1)
+4. Detailed reasoning
+5. Key insights
+6. Potential risks
+
+Format your response as a valid JSON object with the following structure:
+{
+    "first_principles": "<first principles as a string>",
+    "innovation_analysis": "<innovation analysis as a string>",
+    "execution_analysis": "<execution analysis as a string>",
+    "disruption_potential": "<disruption potential as a string>",
+    "opportunity_score": <float between 0 and 1>,
+    "market_potential": <float between 0 and 1>,
+    "technical_feasibility": <float between 0 and 1>,
+    "reasoning": "<detailed reasoning as a string>",
+    "key_insights": ["<insight 1>", "<insight 2>", ...],
+    "potential_risks": ["<risk 1>", "<risk 2>", ...]
+}
+
+Make sure your response is a valid JSON object that can be parsed directly."""
+
+
+MUSK_OUTPUT_FORMAT = str({
+    "first_principles": "string with the first principles",
+    "innovation_analysis": "string with the innovation analysis",
+    "execution_analysis": "string with the execution analysis",
+    "disruption_potential": "string with the disruption potential",
+    "opportunity_score": "float between 0 and 1",
+    "market_potential": "float between 0 and 1",
+    "technical_feasibility": "float between 0 and 1",
+    "reasoning": "string with detailed reasoning",
+    "key_insights": "list of strings with key insights",
+    "potential_risks": "list of strings with potential risks"
+})
+
+
+def build_musk_prompt(state: AgentState) -> list:
+    """Builds the single evaluation prompt from the agent state."""
     data = state["data"]
     product_idea = data["product_idea"]
-    technical_context = data.get("technical_context", {})
-    market_context = data.get("market_context", {})
-
-    # Collect analysis for LLM reasoning
-    analysis_data = {
-        "first_principles": analyze_first_principles(product_idea, technical_context),
-        "innovation_analysis": analyze_innovation_potential(product_idea, market_context),
-        "execution_analysis": analyze_execution_feasibility(product_idea),
-        "disruption_potential": analyze_disruption_potential(product_idea, market_context)
-    }
-
-    return generate_musk_output(product_idea, analysis_data)
-
-
-def analyze_first_principles(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes the product from first principles perspective."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze this product idea using first principles thinking: {product_idea}
-        Consider:
-        1. Fundamental truths and assumptions
-        2. Core problems being solved
-        3. Novel approaches to solving these problems
-        4. Potential for radical innovation
-        5. Breaking down complex problems into simpler ones
-        
-        Context: {json.dumps(technical_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_innovation_potential(product_idea: str, market_context: dict) -> dict:
-    """Analyzes innovation potential and market disruption."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate innovation potential for: {product_idea}
-        Consider:
-        1. Market disruption potential
-        2. Technological advantages
-        3. Competitive moat
-        4. Scalability
-        5. Network effects
-        
-        Context: {json.dumps(market_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_execution_feasibility(product_idea: str) -> dict:
-    """Analyzes execution feasibility and implementation strategy."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate execution feasibility for: {product_idea}
-        Consider:
-        1. Resource requirements
-        2. Timeline to market
-        3. Technical dependencies
-        4. Manufacturing challenges
-        5. Operational complexity
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_disruption_potential(product_idea: str, market_context: dict) -> dict:
-    """Analyzes potential for market disruption and transformation."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze disruption potential for: {product_idea}
-        Consider:
-        1. Market transformation potential
-        2. Industry impact
-        3. Competitive advantages
-        4. Market size and growth
-        5. Long-term vision
-        
-        Context: {json.dumps(market_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def generate_musk_output(product_idea: str, analysis_data: dict) -> ElonMuskSignal:
+
+    # Serialize each context once for the prompt
+    market_json = compact_json(data.get("market_context", {}))
+    technical_json = compact_json(data.get("technical_context", {}))
+
+    return [
+        SystemMessage(content=_MUSK_STATIC_PREFIX),
+        HumanMessage(content=f"Product idea: {product_idea}\n\nMarket context: {market_json}\n\nTechnical context: {technical_json}")
+    ]
+
+
+async def generate_musk_output(prompt: list) -> ElonMuskSignal:
     """Generates final output using Elon Musk's perspective."""
-    output_format = {
-        "first_principles_score": "float between 0 and 1",
-        "innovation_potential": "float between 0 and 1",
-        "execution_feasibility": "float between 0 and 1",
-        "reasoning": "string with detailed reasoning",
-        "key_innovations": "list of strings with key innovations",
-        "technical_challenges": "list of strings with technical challenges"
-    }
-    
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""As Elon Musk, evaluate this product idea: {product_idea}
-        
-        Analysis data: {json.dumps(analysis_data)}
-        
-        Provide:
-        1. First principles thinking score (0-1)
-        2. Innovation potential score (0-1)
-        3. Execution feasibility score (0-1)
-        4. Detailed reasoning
-        5. Key innovations
-        6. Technical challenges
-        
-        Format your response as a valid JSON object with the following structure:
-        {{
-            "first_principles_score": <float between 0 and 1>,
-            "innovation_potential": <float between 0 and 1>,
-            "execution_feasibility": <float between 0 and 1>,
-            "reasoning": "<detailed reasoning as a string>",
-            "key_innovations": ["<innovation 1>", "<innovation 2>", ...],
-            "technical_challenges": ["<challenge 1>", "<challenge 2>", ...]
-        }}
-        
-        Make sure your response is a valid JSON object that can be parsed directly.
-        """)
-    ])
-    
-    try:
-        logger.info("Calling LLM for Elon Musk evaluation")
-        response = call_llm(prompt, output_format=str(output_format))
-        logger.info(f"Raw response from LLM: {response}")
-        
-        # If response is a string, try to parse it as JSON
-        if isinstance(response, str):
-            try:
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    parsed_response = json.loads(json_str)
-                else:
-                    logger.warning("No JSON found in response, creating default")
-                    parsed_response = {
-                        "first_principles_score": 0.5,
-                        "innovation_potential": 0.5,
-                        "execution_feasibility": 0.5,
-                        "reasoning": "Unable to generate detailed reasoning.",
-                        "key_innovations": ["Default innovation"],
-                        "technical_challenges": ["Default challenge"]
-                    }
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON from response: {e}")
-                parsed_response = {
-                    "first_principles_score": 0.5,
-                    "innovation_potential": 0.5,
-                    "execution_feasibility": 0.5,
-                    "reasoning": "Unable to generate detailed reasoning.",
-                    "key_innovations": ["Default innovation"],
-                    "technical_challenges": ["Default challenge"]
-                }
-        else:
-            parsed_response = response
-        
-        # Ensure all required fields are present
-        if "first_principles_score" not in parsed_response:
-            parsed_response["first_principles_score"] = 0.5
-        if "innovation_potential" not in parsed_response:
-            parsed_response["innovation_potential"] = 0.5
-        if "execution_feasibility" not in parsed_response:
-            parsed_response["execution_feasibility"] = 0.5
-        if "reasoning" not in parsed_response:
-            parsed_response["reasoning"] = "Unable to generate detailed reasoning."
-        if "key_innovations" not in parsed_response:
-            parsed_response["key_innovations"] = ["Default innovation"]
-        if "technical_challenges" not in parsed_response:
-            parsed_response["technical_challenges"] = ["Default challenge"]
-        
-        logger.info(f"Parsed response: {parsed_response}")
-        return ElonMuskSignal(**parsed_response)
-    
-    except Exception as e:
-        logger.error(f"Error generating Elon Musk output: {e}", exc_info=True)
-        return ElonMuskSignal(
-            first_principles_score=0.5,
-            innovation_potential=0.5,
-            execution_feasibility=0.5,
-            reasoning="Error occurred during evaluation.",
-            key_innovations=["Default innovation"],
-            technical_challenges=["Default challenge"]
-        ) 
\ No newline at end of file
+    return await finalize_signal(prompt, MUSK_OUTPUT_FORMAT, ElonMuskSignal, _ERROR_SIGNAL, "Elon Musk")
+
+
+def parse_musk_response(response) -> ElonMuskSignal:
+    """Validates a raw LLM response into a signal; missing fields take the model defaults."""
+    return parse_signal(response, ElonMuskSignal, _ERROR_SIGNAL, "Elon Musk")
+
+
+def recall_musk_run(prompt: list) -> Optional[ElonMuskSignal]:
+    """Returns the signal remembered for an evaluation prompt, or None."""
+    # The input message holds the product idea and every context, so it identifies the run
+    run_key = prompt[-1].content
+    signal = _recent_runs.get(run_key)
+    if signal is not None:
+        _recent_runs.move_to_end(run_key)
+    return signal
+
+
+def remember_musk_run(prompt: list, signal: ElonMuskSignal) -> None:
+    """Remembers the signal of an evaluation prompt; failures are not remembered so the next run retries."""
+    if signal is _ERROR_SIGNAL:
+        return
+    _recent_runs[prompt[-1].content] = signal
+    if len(_recent_runs) > _RECENT_RUNS_SIZE:
+        _recent_runs.popitem(last=False)
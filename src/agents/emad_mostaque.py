@@ -1,17 +1,21 @@
 from graph.state import AgentState, show_agent_reasoning
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
-import json
+from pydantic import BaseModel, ConfigDict
+import asyncio
 import logging
+from collections import OrderedDict
 from typing_extensions import Literal
-from utils.llm import call_llm
+from utils.llm import acall_llm_streamed, register_cache_clear_hook
+from utils.json_extract import aparse_llm_json, compact_json, schema_json, with_defaults
 from utils.progress import progress
 
 # Configure logging
 logger = logging.getLogger('ai-product-evaluator')
 
 class EmadMostaqueSignal(BaseModel):
+    # Signals are read-only once built
+    model_config = ConfigDict(frozen=True)
+
     infrastructure_score: float  # 0-1 score for AI infrastructure
     open_source_potential: float  # 0-1 score for open source potential
     community_impact: float  # 0-1 score for community impact
@@ -20,193 +24,130 @@ class EmadMostaqueSignal(BaseModel):
     community_challenges: list[str]
 
 
-def emad_mostaque_agent(state: AgentState):
+# Fallback values used when the LLM response cannot be parsed
+_MOSTAQUE_DEFAULTS = {
+    "infrastructure_score": 0.5,
+    "open_source_potential": 0.5,
+    "community_impact": 0.5,
+    "reasoning": "Unable to generate detailed reasoning.",
+    "key_infrastructure": ["Default component"],
+    "community_challenges": ["Default challenge"]
+}
+
+# Frozen, so the error fallback is built once and shared
+_ERROR_SIGNAL = EmadMostaqueSignal(**{**_MOSTAQUE_DEFAULTS, "reasoning": "Error occurred during evaluation."})
+
+# Recent signals keyed by their evaluation prompt, so repeated evaluations reuse the
+# validated signal instead of calling the LLM and validating again
+_RECENT_SIGNALS_SIZE = 256
+_recent_signals: "OrderedDict[str, EmadMostaqueSignal]" = OrderedDict()
+register_cache_clear_hook(_recent_signals.clear)
+
+# JSON schema of the signal, sent as the output format so providers can constrain the response to it
+_MOSTAQUE_OUTPUT_SCHEMA = schema_json(EmadMostaqueSignal)
+
+# Output format of the combined sub-analysis call
+MOSTAQUE_ANALYSIS_FORMAT = str({
+    "infrastructure_analysis": "string with the analysis",
+    "open_source_analysis": "string with the analysis",
+    "community_analysis": "string with the analysis",
+    "scaling_potential": "string with the analysis"
+})
+
+# Prompts are built once and only filled in per call
+_ANALYSIS_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Analyze this product idea: {product_idea}
+Cover each of the following:
+1. infrastructure_analysis - Infrastructure potential: AI infrastructure requirements, scalability needs, resource optimization, technical architecture and infrastructure challenges (use the technical context)
+2. open_source_analysis - Open source potential: community engagement potential, open source licensing, contribution opportunities, documentation needs and community governance (use the community context)
+3. community_analysis - Community impact: developer adoption potential, community value proposition, knowledge sharing opportunities, collaboration potential and long-term community growth
+4. scaling_potential - Scaling potential: infrastructure scaling needs, performance optimization, resource management, cost considerations and technical limitations (use the technical context)
+
+Technical context: {technical_json}
+Community context: {community_json}
+""")
+])
+
+_EVALUATION_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """As Emad Mostaque, evaluate this product idea: {product_idea}
+
+Analysis data: {analysis_json}
+
+Give each score as a float between 0 and 1, with detailed reasoning.
+""")
+])
+
+
+async def emad_mostaque_agent_async(state: AgentState):
     """Analyzes product ideas using Emad Mostaque's expertise in AI infrastructure and open source."""
+    # A single call covers all four sub-analyses
+    response = await acall_llm_streamed(build_mostaque_analysis_prompt(state), output_format=MOSTAQUE_ANALYSIS_FORMAT)
+    return await finish_mostaque_evaluation(state, response)
+
+
+def emad_mostaque_agent(state: AgentState):
+    """Synchronous entry point for callers outside an event loop."""
+    return asyncio.run(emad_mostaque_agent_async(state))
+
+
+def build_mostaque_analysis_prompt(state: AgentState) -> list:
+    """Builds the prompt that runs all four sub-analyses using Mostaque's expertise."""
     data = state["data"]
-    product_idea = data["product_idea"]
-    technical_context = data.get("technical_context", {})
-    community_context = data.get("community_context", {})
-
-    # Collect analysis for LLM reasoning
-    analysis_data = {
-        "infrastructure_analysis": analyze_infrastructure_potential(product_idea, technical_context),
-        "open_source_analysis": analyze_open_source_potential(product_idea, community_context),
-        "community_analysis": analyze_community_impact(product_idea),
-        "scaling_potential": analyze_scaling_potential(product_idea, technical_context)
-    }
-
-    return generate_mostaque_output(product_idea, analysis_data)
-
-
-def analyze_infrastructure_potential(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes AI infrastructure potential and requirements."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze infrastructure potential for: {product_idea}
-        Consider:
-        1. AI infrastructure requirements
-        2. Scalability needs
-        3. Resource optimization
-        4. Technical architecture
-        5. Infrastructure challenges
-        
-        Context: {json.dumps(technical_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_open_source_potential(product_idea: str, community_context: dict) -> dict:
-    """Analyzes open source potential and community aspects."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate open source potential for: {product_idea}
-        Consider:
-        1. Community engagement potential
-        2. Open source licensing
-        3. Contribution opportunities
-        4. Documentation needs
-        5. Community governance
-        
-        Context: {json.dumps(community_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_community_impact(product_idea: str) -> dict:
-    """Analyzes potential impact on the AI community."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate community impact for: {product_idea}
-        Consider:
-        1. Developer adoption potential
-        2. Community value proposition
-        3. Knowledge sharing opportunities
-        4. Collaboration potential
-        5. Long-term community growth
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_scaling_potential(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes scaling potential and infrastructure requirements."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze scaling potential for: {product_idea}
-        Consider:
-        1. Infrastructure scaling needs
-        2. Performance optimization
-        3. Resource management
-        4. Cost considerations
-        5. Technical limitations
-        
-        Context: {json.dumps(technical_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
+    return _ANALYSIS_TEMPLATE.format_messages(
+        product_idea=data["product_idea"],
+        technical_json=compact_json(data.get("technical_context", {})),
+        community_json=compact_json(data.get("community_context", {}))
+    )
+
 
+async def finish_mostaque_evaluation(state: AgentState, analysis_response) -> EmadMostaqueSignal:
+    """Completes the evaluation from the raw LLM response to the analysis prompt."""
+    if isinstance(analysis_response, str):
+        # Keep unstructured text so the evaluation still sees the analysis
+        analysis_data = await aparse_llm_json(analysis_response, {"analysis": analysis_response})
+    else:
+        analysis_data = analysis_response or {}
+    return await generate_mostaque_output(state["data"]["product_idea"], analysis_data)
 
-def generate_mostaque_output(product_idea: str, analysis_data: dict) -> EmadMostaqueSignal:
+
+async def generate_mostaque_output(product_idea: str, analysis_data: dict) -> EmadMostaqueSignal:
     """Generates final output using Emad Mostaque's perspective."""
-    output_format = {
-        "infrastructure_score": "float between 0 and 1",
-        "open_source_potential": "float between 0 and 1",
-        "community_impact": "float between 0 and 1",
-        "reasoning": "string with detailed reasoning",
-        "key_infrastructure": "list of strings with key infrastructure components",
-        "community_challenges": "list of strings with community challenges"
-    }
+    analysis_json = compact_json(analysis_data)
+    prompt = _EVALUATION_TEMPLATE.format_messages(product_idea=product_idea, analysis_json=analysis_json)
     
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""As Emad Mostaque, evaluate this product idea: {product_idea}
-        
-        Analysis data: {json.dumps(analysis_data)}
-        
-        Provide:
-        1. Infrastructure score (0-1)
-        2. Open source potential score (0-1)
-        3. Community impact score (0-1)
-        4. Detailed reasoning
-        5. Key infrastructure components
-        6. Community challenges
-        
-        Format your response as a valid JSON object with the following structure:
-        {{
-            "infrastructure_score": <float between 0 and 1>,
-            "open_source_potential": <float between 0 and 1>,
-            "community_impact": <float between 0 and 1>,
-            "reasoning": "<detailed reasoning as a string>",
-            "key_infrastructure": ["<component 1>", "<component 2>", ...],
-            "community_challenges": ["<challenge 1>", "<challenge 2>", ...]
-        }}
-        
-        Make sure your response is a valid JSON object that can be parsed directly.
-        """)
-    ])
+    # The prompt holds the product idea and every analysis, so it identifies the result
+    run_key = prompt[-1].content
+    signal = _recent_signals.get(run_key)
+    if signal is not None:
+        _recent_signals.move_to_end(run_key)
+        return signal
     
     try:
         logger.info("Calling LLM for Emad Mostaque evaluation")
-        response = call_llm(prompt, output_format=str(output_format))
-        logger.info(f"Raw response from LLM: {response}")
+        response = await acall_llm_streamed(prompt, output_format=_MOSTAQUE_OUTPUT_SCHEMA)
+        logger.debug("Raw response from LLM: %s", response)
         
         # If response is a string, try to parse it as JSON
         if isinstance(response, str):
-            try:
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    parsed_response = json.loads(json_str)
-                else:
-                    logger.warning("No JSON found in response, creating default")
-                    parsed_response = {
-                        "infrastructure_score": 0.5,
-                        "open_source_potential": 0.5,
-                        "community_impact": 0.5,
-                        "reasoning": "Unable to generate detailed reasoning.",
-                        "key_infrastructure": ["Default component"],
-                        "community_challenges": ["Default challenge"]
-                    }
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON from response: {e}")
-                parsed_response = {
-                    "infrastructure_score": 0.5,
-                    "open_source_potential": 0.5,
-                    "community_impact": 0.5,
-                    "reasoning": "Unable to generate detailed reasoning.",
-                    "key_infrastructure": ["Default component"],
-                    "community_challenges": ["Default challenge"]
-                }
+            parsed_response = await aparse_llm_json(response, {})
         else:
             parsed_response = response
+        # Nothing could be parsed, so the signal would be all defaults
+        validated = bool(parsed_response)
         
         # Ensure all required fields are present
-        if "infrastructure_score" not in parsed_response:
-            parsed_response["infrastructure_score"] = 0.5
-        if "open_source_potential" not in parsed_response:
-            parsed_response["open_source_potential"] = 0.5
-        if "community_impact" not in parsed_response:
-            parsed_response["community_impact"] = 0.5
-        if "reasoning" not in parsed_response:
-            parsed_response["reasoning"] = "Unable to generate detailed reasoning."
-        if "key_infrastructure" not in parsed_response:
-            parsed_response["key_infrastructure"] = ["Default component"]
-        if "community_challenges" not in parsed_response:
-            parsed_response["community_challenges"] = ["Default challenge"]
+        parsed_response = with_defaults(parsed_response, _MOSTAQUE_DEFAULTS)
         
-        logger.info(f"Parsed response: {parsed_response}")
-        return EmadMostaqueSignal(**parsed_response)
+        logger.debug("Parsed response: %s", parsed_response)
+        signal = EmadMostaqueSignal(**parsed_response)
+        # Fallbacks are not remembered so the next run retries
+        if validated:
+            _recent_signals[run_key] = signal
+            if len(_recent_signals) > _RECENT_SIGNALS_SIZE:
+                _recent_signals.popitem(last=False)
+        return signal
     
     except Exception as e:
-        logger.error(f"Error generating Emad Mostaque output: {e}", exc_info=True)
-        return EmadMostaqueSignal(
-            infrastructure_score=0.5,
-            open_source_potential=0.5,
-            community_impact=0.5,
-            reasoning="Error occurred during evaluation.",
-            key_infrastructure=["Default component"],
-            community_challenges=["Default challenge"]
-        ) 
\ No newline at end of file
+        logger.error("Error generating Emad Mostaque output: %s", e, exc_info=True)
+        # Failures are not remembered so the next run retries
+        return _ERROR_SIGNAL 
\ No newline at end of file
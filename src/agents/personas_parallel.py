@@ -0,0 +1,361 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from graph.state import AgentState
+from langchain_core.messages import HumanMessage, SystemMessage
+from utils.json_extract import aparse_llm_json
+from utils.llm import acall_llm_batch, acall_llm_streamed
+from agents.daniel_gross import (
+    GROSS_OUTPUT_FORMAT,
+    build_gross_prompt,
+    daniel_gross_agent_async,
+    parse_gross_response,
+    recall_gross_run,
+    remember_gross_run
+)
+from agents.demis_hassabis import (
+    HASSABIS_OUTPUT_FORMAT,
+    build_hassabis_prompt,
+    demis_hassabis_agent_async,
+    parse_hassabis_response,
+    recall_hassabis_run,
+    remember_hassabis_run
+)
+from agents.elon_musk import (
+    MUSK_OUTPUT_FORMAT,
+    build_musk_prompt,
+    elon_musk_agent_async,
+    parse_musk_response,
+    recall_musk_run,
+    remember_musk_run
+)
+from agents.adam_dangelo import adam_dangelo_agent_async
+from agents.clement_delangue import clement_delangue_agent_async
+from agents.sebastian_thrun import (
+    THRUN_ANALYSIS_FORMAT,
+    build_thrun_analysis_prompt,
+    finish_thrun_evaluation,
+    sebastian_thrun_agent_async
+)
+from agents.sam_altman import (
+    ALTMAN_ANALYSIS_FORMAT,
+    build_altman_analysis_prompt,
+    finish_altman_evaluation,
+    sam_altman_agent_async
+)
+from agents.emad_mostaque import (
+    MOSTAQUE_ANALYSIS_FORMAT,
+    build_mostaque_analysis_prompt,
+    emad_mostaque_agent_async,
+    finish_mostaque_evaluation
+)
+
+# Configure logging
+logger = logging.getLogger('ai-product-evaluator')
+
+# Persona agents that evaluate the product independently of each other
+PERSONA_AGENTS = {
+    "Sam Altman": sam_altman_agent_async,
+    "Demis Hassabis": demis_hassabis_agent_async,
+    "Elon Musk": elon_musk_agent_async,
+    "Adam D'Angelo": adam_dangelo_agent_async,
+    "Daniel Gross": daniel_gross_agent_async,
+    "Sebastian Thrun": sebastian_thrun_agent_async,
+    "Emad Mostaque": emad_mostaque_agent_async,
+    "Clement Delangue": clement_delangue_agent_async,
+}
+
+# Personas that evaluate in a single LLM call, so their prompts can be sent as one batch.
+# Maps each name to its prompt builder, output format and response parser.
+BATCHED_PERSONAS = {
+    "Demis Hassabis": (build_hassabis_prompt, HASSABIS_OUTPUT_FORMAT, parse_hassabis_response),
+    "Elon Musk": (build_musk_prompt, MUSK_OUTPUT_FORMAT, parse_musk_response),
+    "Daniel Gross": (build_gross_prompt, GROSS_OUTPUT_FORMAT, parse_gross_response),
+}
+
+# Looks up and stores the recent signals of each single-call persona by evaluation prompt,
+# so the batched paths skip the LLM for re-runs with unchanged inputs
+BATCHED_MEMOS = {
+    "Demis Hassabis": (recall_hassabis_run, remember_hassabis_run),
+    "Elon Musk": (recall_musk_run, remember_musk_run),
+    "Daniel Gross": (recall_gross_run, remember_gross_run),
+}
+
+# Personas that evaluate in an analysis call followed by an evaluation call. Maps each
+# name to its analysis prompt builder, analysis output format and the coroutine that
+# finishes the evaluation from the analysis response.
+TWO_STAGE_PERSONAS = {
+    "Sam Altman": (build_altman_analysis_prompt, ALTMAN_ANALYSIS_FORMAT, finish_altman_evaluation),
+    "Emad Mostaque": (build_mostaque_analysis_prompt, MOSTAQUE_ANALYSIS_FORMAT, finish_mostaque_evaluation),
+    "Sebastian Thrun": (build_thrun_analysis_prompt, THRUN_ANALYSIS_FORMAT, finish_thrun_evaluation),
+}
+
+# Leads the combined prompt that answers the first call of several personas at once
+_COMBINED_INSTRUCTIONS = (
+    "Each section below gives a persona's instructions and the product idea to work on. "
+    "Answer every section as that persona, independently of the others. Respond with one "
+    "JSON object keyed by the persona name of each section, holding that persona's answer."
+)
+
+
+async def _run_batched_personas(state: AgentState, names: List[str]) -> List[Any]:
+    """Send the prompts of single-call personas as one batch and parse each response."""
+    if not names:
+        return []
+
+    specs = [BATCHED_PERSONAS[name] for name in names]
+    prompts = [build_prompt(state) for build_prompt, _, _ in specs]
+    results = [BATCHED_MEMOS[name][0](prompt) for name, prompt in zip(names, prompts)]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    responses = await acall_llm_batch(
+        [prompts[i] for i in pending],
+        [specs[i][1] for i in pending],
+        streamed=True
+    )
+    for i, response in zip(pending, responses):
+        results[i] = specs[i][2](response)
+        BATCHED_MEMOS[names[i]][1](prompts[i], results[i])
+    return results
+
+
+async def run_all_personas(state: AgentState, agent_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Run the persona agents concurrently on the same state.
+
+    Single-call personas are sent together through one LLM batch while the
+    remaining personas run alongside it. A failing persona is logged and
+    reported as None without cancelling the others. The results are also merged
+    into state["agent_insights"] for agents that run afterwards.
+
+    Args:
+        state: The agent state passed to every persona
+        agent_names: Names of the personas to run. If None, runs all of them.
+
+    Returns:
+        Dict[str, Any]: Dictionary mapping persona names to their signals (None if the persona failed)
+    """
+    names = [name for name in (agent_names or PERSONA_AGENTS) if name in PERSONA_AGENTS]
+    batched_names = [name for name in names if name in BATCHED_PERSONAS]
+    other_names = [name for name in names if name not in BATCHED_PERSONAS]
+
+    batched_outcome, *other_outcomes = await asyncio.gather(
+        _run_batched_personas(state, batched_names),
+        *(PERSONA_AGENTS[name](state) for name in other_names),
+        return_exceptions=True
+    )
+    if isinstance(batched_outcome, Exception):
+        batched_outcome = [batched_outcome] * len(batched_names)
+    outcomes = dict(zip(batched_names, batched_outcome))
+    outcomes.update(zip(other_names, other_outcomes))
+
+    results = {}
+    for name in names:
+        outcome = outcomes[name]
+        if isinstance(outcome, Exception):
+            logger.error("Error running %s agent: %s", name, outcome)
+            results[name] = None
+        else:
+            results[name] = outcome
+
+    _merge_insights(state, results)
+    return results
+
+
+async def run_personas_combined(state: AgentState, agent_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Run the persona agents with the first LLM call of every batchable persona in one combined prompt.
+
+    The prompts of the selected single-call personas and the analysis prompts of
+    the two-stage personas are joined into one request that asks for a JSON object
+    keyed by persona name, so they share one round trip instead of one call each.
+    Single-call personas parse their entry directly, while two-stage personas finish
+    their evaluation from it concurrently. The remaining personas run alongside as
+    in run_all_personas. With fewer than two batchable personas selected this is
+    the same as run_all_personas.
+
+    Args:
+        state: The agent state passed to every persona
+        agent_names: Names of the personas to run. If None, runs all of them.
+
+    Returns:
+        Dict[str, Any]: Dictionary mapping persona names to their signals (None if the persona failed)
+    """
+    names = [name for name in (agent_names or PERSONA_AGENTS) if name in PERSONA_AGENTS]
+    combined_names = [name for name in names if name in BATCHED_PERSONAS or name in TWO_STAGE_PERSONAS]
+    if len(combined_names) < 2:
+        return await run_all_personas(state, names)
+
+    other_names = [name for name in names if name not in combined_names]
+    combined_outcome, *other_outcomes = await asyncio.gather(
+        _run_combined_prompt(state, combined_names),
+        *(PERSONA_AGENTS[name](state) for name in other_names),
+        return_exceptions=True
+    )
+    if isinstance(combined_outcome, Exception):
+        combined_outcome = dict.fromkeys(combined_names, combined_outcome)
+    outcomes = dict(combined_outcome)
+    outcomes.update(zip(other_names, other_outcomes))
+
+    results = {}
+    for name in names:
+        outcome = outcomes[name]
+        if isinstance(outcome, Exception):
+            logger.error("Error running %s agent: %s", name, outcome)
+            results[name] = None
+        else:
+            results[name] = outcome
+
+    _merge_insights(state, results)
+    return results
+
+
+async def _run_combined_prompt(state: AgentState, names: List[str]) -> Dict[str, Any]:
+    """Ask for every persona's first call in one prompt, then parse or finish each answer."""
+    prompts = {name: (BATCHED_PERSONAS.get(name) or TWO_STAGE_PERSONAS[name])[0](state) for name in names}
+    # Single-call personas with a remembered signal for their prompt are left out of the request
+    recalled = {}
+    for name in names:
+        if name in BATCHED_MEMOS:
+            signal = BATCHED_MEMOS[name][0](prompts[name])
+            if signal is not None:
+                recalled[name] = signal
+    specs = {
+        name: BATCHED_PERSONAS.get(name) or TWO_STAGE_PERSONAS[name]
+        for name in names if name not in recalled
+    }
+    if not specs:
+        return recalled
+
+    sections = []
+    for name in specs:
+        persona_prompt = "\n\n".join(message.content for message in prompts[name])
+        sections.append(f"### {name}\n{persona_prompt}")
+    prompt = [
+        SystemMessage(content=_COMBINED_INSTRUCTIONS),
+        HumanMessage(content="\n\n".join(sections))
+    ]
+    output_format = "{" + ", ".join(f"{name!r}: {output_format}" for name, (_, output_format, _) in specs.items()) + "}"
+
+    response = await acall_llm_streamed(prompt, output_format=output_format)
+    if isinstance(response, str):
+        response = await aparse_llm_json(response, {})
+    if not isinstance(response, dict):
+        # e.g. None from an empty stream, so every persona falls back to its own error handling
+        response = {}
+
+    async def finish_answer(name: str, finish) -> Any:
+        if name in BATCHED_PERSONAS:
+            signal = finish(response.get(name))
+            BATCHED_MEMOS[name][1](prompts[name], signal)
+            return signal
+        return await finish(state, response.get(name))
+
+    outcomes = await asyncio.gather(
+        *(finish_answer(name, finish) for name, (_, _, finish) in specs.items()),
+        return_exceptions=True
+    )
+    recalled.update(zip(specs, outcomes))
+    return recalled
+
+
+async def run_personas_many(
+    states: List[AgentState],
+    agent_names: Optional[List[str]] = None,
+    provider_batch: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Run the persona agents for several states, batching LLM calls across all of them.
+    
+    The single-call persona prompts and the first-stage prompts of two-stage personas
+    for every state are sent as one LLM batch. The two-stage personas then finish
+    concurrently, alongside the remaining personas. Failures are reported as None
+    as in run_all_personas, and each state's results are merged into its
+    state["agent_insights"].
+    
+    Args:
+        states: The agent states to evaluate, one per product idea
+        agent_names: Names of the personas to run. If None, runs all of them.
+        provider_batch: Whether to submit the batched first calls as an OpenAI Batch API job
+        
+    Returns:
+        List[Dict[str, Any]]: For each state, a dictionary mapping persona names to their signals
+    """
+    names = [name for name in (agent_names or PERSONA_AGENTS) if name in PERSONA_AGENTS]
+    first_call_names = [name for name in names if name in BATCHED_PERSONAS or name in TWO_STAGE_PERSONAS]
+    other_names = [name for name in names if name not in first_call_names]
+    
+    first_calls = [(index, name) for index in range(len(states)) for name in first_call_names]
+    other_calls = [(index, name) for index in range(len(states)) for name in other_names]
+    
+    first_outcomes, *other_outcomes = await asyncio.gather(
+        _run_first_calls(states, first_calls, provider_batch),
+        *(PERSONA_AGENTS[name](states[index]) for index, name in other_calls),
+        return_exceptions=True
+    )
+    if isinstance(first_outcomes, Exception):
+        first_outcomes = [first_outcomes] * len(first_calls)
+    
+    outcomes = {}
+    for (index, name), outcome in zip(first_calls + other_calls, list(first_outcomes) + other_outcomes):
+        if isinstance(outcome, Exception):
+            logger.error("Error running %s agent: %s", name, outcome)
+            outcome = None
+        outcomes[index, name] = outcome
+    
+    all_results = []
+    for index, state in enumerate(states):
+        results = {name: outcomes[index, name] for name in names}
+        _merge_insights(state, results)
+        all_results.append(results)
+    return all_results
+
+
+async def _run_first_calls(states: List[AgentState], calls: List[Tuple[int, str]], provider_batch: bool = False) -> List[Any]:
+    """Send the first LLM call of every (state index, persona) pair as one batch and finish each persona."""
+    if not calls:
+        return []
+    
+    specs = [BATCHED_PERSONAS.get(name) or TWO_STAGE_PERSONAS[name] for _, name in calls]
+    prompts = [build_prompt(states[index]) for (index, _), (build_prompt, _, _) in zip(calls, specs)]
+    # Single-call personas with a remembered signal for their prompt are left out of the batch
+    outcomes = [
+        BATCHED_MEMOS[name][0](prompt) if name in BATCHED_MEMOS else None
+        for (_, name), prompt in zip(calls, prompts)
+    ]
+    pending = [i for i, outcome in enumerate(outcomes) if outcome is None]
+    if not pending:
+        return outcomes
+    
+    responses = await acall_llm_batch(
+        [prompts[i] for i in pending],
+        [specs[i][1] for i in pending],
+        streamed=True,
+        provider_batch=provider_batch
+    )
+    
+    async def finish_call(i: int, response) -> Any:
+        index, name = calls[i]
+        finish = specs[i][2]
+        if name in BATCHED_PERSONAS:
+            signal = finish(response)
+            BATCHED_MEMOS[name][1](prompts[i], signal)
+            return signal
+        return await finish(states[index], response)
+    
+    finished = await asyncio.gather(
+        *(finish_call(i, response) for i, response in zip(pending, responses)),
+        return_exceptions=True
+    )
+    for i, outcome in zip(pending, finished):
+        outcomes[i] = outcome
+    return outcomes
+
+
+def _merge_insights(state: AgentState, results: Dict[str, Any]) -> None:
+    """Merge persona results into state["agent_insights"] for agents that run afterwards."""
+    insights = state["agent_insights"] or {}
+    insights.update(results)
+    state["agent_insights"] = insights
@@ -1,9 +1,11 @@
+from itertools import chain
 from typing import List, Dict, Any
 from pydantic import BaseModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from graph.state import AgentState
 from utils.llm import call_llm
+from utils.json_extract import extract_json_from_response
 import json
 
 
@@ -28,15 +30,44 @@ class ProjectRecommendation(BaseModel):
     alternative_suggestions: List[str]  # Alternative suggestions if not pursuing
 
 
+# Signal attributes collected by _collect_insights_data, mapped to where they are recorded
+_SCORE_ATTRS = {
+    "opportunity_score": "opportunity",
+    "market_potential": "market",
+    "technical_feasibility": "technical"
+}
+_INSIGHT_ATTRS = ("key_insights", "key_breakthroughs", "key_features")
+_RISK_ATTRS = ("potential_risks", "research_challenges")
+_EXPERTISE_ATTRS = (
+    ("technical_advancement", "technical"),
+    ("ai_infrastructure", "ai"),
+    ("platform_potential", "platform")
+)
+
+_MISSING = object()
+
+# Fields a recommendation response must contain
+_REQUIRED_FIELDS = frozenset({
+    "pursue_project", "confidence_score", "key_factors",
+    "resource_requirements", "timeline", "next_steps",
+    "alternative_suggestions"
+})
+_TIMELINE_FIELDS = frozenset({
+    "phase1", "phase2", "phase3", "phase4",
+    "total_duration", "key_milestones"
+})
+
+
 def project_advisor_agent(state: AgentState) -> ProjectRecommendation:
     """
     Analyzes all agent insights and user background to provide a final recommendation
     on whether to pursue the project and a proposed timeline.
     """
-    # Extract data from state
-    product_idea = state.data.get("product_idea", "")
-    user_background = state.data.get("user_background", {})
-    agent_insights = state.data.get("agent_insights", {})
+    # Extract data from state; the persona results are merged in beside the product data
+    data = state["data"] or {}
+    product_idea = data.get("product_idea", "")
+    user_background = data.get("user_background", {})
+    agent_insights = state["agent_insights"] or {}
     
     # Collect all insights and scores
     insights_data = _collect_insights_data(agent_insights)
@@ -53,49 +84,29 @@ def project_advisor_agent(state: AgentState) -> ProjectRecommendation:
 
 def _collect_insights_data(agent_insights: Dict[str, Any]) -> Dict[str, Any]:
     """Collects and organizes insights from all agents."""
-    insights_data = {
-        "scores": {},
-        "insights": [],
-        "risks": [],
-        "expertise_areas": set()
-    }
+    signals = [insights for insights in agent_insights.values() if insights]
     
-    # Process each agent's insights
-    for agent_name, insights in agent_insights.items():
-        if not insights:
-            continue
-            
-        # Add scores
-        if hasattr(insights, "opportunity_score"):
-            insights_data["scores"]["opportunity"] = insights.opportunity_score
-        if hasattr(insights, "market_potential"):
-            insights_data["scores"]["market"] = insights.market_potential
-        if hasattr(insights, "technical_feasibility"):
-            insights_data["scores"]["technical"] = insights.technical_feasibility
-            
-        # Add insights
-        if hasattr(insights, "key_insights"):
-            insights_data["insights"].extend(insights.key_insights)
-        if hasattr(insights, "key_breakthroughs"):
-            insights_data["insights"].extend(insights.key_breakthroughs)
-        if hasattr(insights, "key_features"):
-            insights_data["insights"].extend(insights.key_features)
-            
-        # Add risks
-        if hasattr(insights, "potential_risks"):
-            insights_data["risks"].extend(insights.potential_risks)
-        if hasattr(insights, "research_challenges"):
-            insights_data["risks"].extend(insights.research_challenges)
-            
-        # Add expertise areas
-        if hasattr(insights, "technical_advancement"):
-            insights_data["expertise_areas"].add("technical")
-        if hasattr(insights, "ai_infrastructure"):
-            insights_data["expertise_areas"].add("ai")
-        if hasattr(insights, "platform_potential"):
-            insights_data["expertise_areas"].add("platform")
-            
-    return insights_data
+    # Add scores, later agents taking precedence
+    scores = {}
+    for signal in signals:
+        for attr, score_name in _SCORE_ATTRS.items():
+            value = getattr(signal, attr, _MISSING)
+            if value is not _MISSING:
+                scores[score_name] = value
+    
+    return {
+        "scores": scores,
+        "insights": list(chain.from_iterable(
+            getattr(signal, attr) for signal in signals for attr in _INSIGHT_ATTRS if hasattr(signal, attr)
+        )),
+        "risks": list(chain.from_iterable(
+            getattr(signal, attr) for signal in signals for attr in _RISK_ATTRS if hasattr(signal, attr)
+        )),
+        # Fixed order, so the prompt renders the same areas identically
+        "expertise_areas": tuple(
+            area for attr, area in _EXPERTISE_ATTRS if any(hasattr(signal, attr) for signal in signals)
+        )
+    }
 
 
 def _generate_recommendation(
@@ -111,22 +122,22 @@ def _generate_recommendation(
         Consider the user's background, market potential, technical feasibility, and resource requirements.
         
         You must respond with a valid JSON object that exactly matches this structure:
-        {
+        {{
             "pursue_project": boolean,
             "confidence_score": float (0-1),
             "key_factors": [string],
             "resource_requirements": [string],
-            "timeline": {
+            "timeline": {{
                 "phase1": string,
                 "phase2": string,
                 "phase3": string,
                 "phase4": string,
                 "total_duration": string,
                 "key_milestones": [string]
-            },
+            }},
             "next_steps": [string],
             "alternative_suggestions": [string]
-        }
+        }}
         
         Guidelines:
         1. If recommending to pursue (pursue_project=true):
@@ -162,32 +173,27 @@ Remember to respond with a valid JSON object matching the exact structure specif
         scores=json.dumps(insights_data["scores"], indent=2),
         insights=json.dumps(insights_data["insights"], indent=2),
         risks=json.dumps(insights_data["risks"], indent=2),
-        expertise=json.dumps(list(insights_data["expertise_areas"]), indent=2)
+        expertise=json.dumps(insights_data["expertise_areas"], indent=2)
     )
     
     # Get LLM response
     response = call_llm(formatted_prompt)
     
     try:
-        response = response.split("```")[1]        
-        # Parse the response into a ProjectRecommendation object
-        recommendation_data = json.dumps(response)
+        # Parse the JSON in the response, fenced or not, skipping blocks that do not decode
+        if isinstance(response, dict):
+            recommendation_data = response
+        else:
+            recommendation_data = extract_json_from_response(response)
+        if not isinstance(recommendation_data, dict):
+            raise ValueError("No JSON object found in recommendation")
         
         # Validate required fields
-        required_fields = {
-            "pursue_project", "confidence_score", "key_factors",
-            "resource_requirements", "timeline", "next_steps",
-            "alternative_suggestions"
-        }
-        if not all(field in recommendation_data for field in required_fields):
+        if not _REQUIRED_FIELDS <= recommendation_data.keys():
             raise ValueError("Missing required fields in recommendation")
             
         # Validate timeline fields
-        timeline_fields = {
-            "phase1", "phase2", "phase3", "phase4",
-            "total_duration", "key_milestones"
-        }
-        if not all(field in recommendation_data["timeline"] for field in timeline_fields):
+        if not _TIMELINE_FIELDS <= recommendation_data["timeline"].keys():
             raise ValueError("Missing required fields in timeline")
             
         return ProjectRecommendation(**recommendation_data)
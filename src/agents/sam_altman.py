@@ -1,17 +1,21 @@
 from graph.state import AgentState, show_agent_reasoning
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
-import json
+from pydantic import BaseModel, ConfigDict
+import asyncio
 import logging
+from collections import OrderedDict
 from typing_extensions import Literal
-from utils.llm import call_llm
+from utils.llm import acall_llm_streamed, register_cache_clear_hook
+from utils.json_extract import aparse_llm_json, compact_json, schema_json, with_defaults
 from utils.progress import progress
 
 # Configure logging
 logger = logging.getLogger('ai-product-evaluator')
 
 class SamAltmanSignal(BaseModel):
+    # Signals are read-only once built
+    model_config = ConfigDict(frozen=True)
+
     opportunity_score: float  # 0-1 score for opportunity
     market_potential: float  # 0-1 score for market size
     technical_feasibility: float  # 0-1 score for technical implementation
@@ -20,199 +24,131 @@ class SamAltmanSignal(BaseModel):
     potential_risks: list[str]
 
 
-def sam_altman_agent(state: AgentState):
+# Fallback values used when the LLM response cannot be parsed
+_ALTMAN_DEFAULTS = {
+    "opportunity_score": 0.5,
+    "market_potential": 0.5,
+    "technical_feasibility": 0.5,
+    "reasoning": "Unable to generate detailed reasoning.",
+    "key_insights": ["Default insight"],
+    "potential_risks": ["Default risk"]
+}
+
+# Frozen, so the error fallback is built once and shared
+_ERROR_SIGNAL = SamAltmanSignal(**{**_ALTMAN_DEFAULTS, "reasoning": "Error occurred during evaluation."})
+
+# Recent signals keyed by their evaluation prompt, so repeated evaluations reuse the
+# validated signal instead of calling the LLM and validating again
+_RECENT_SIGNALS_SIZE = 256
+_recent_signals: "OrderedDict[str, SamAltmanSignal]" = OrderedDict()
+register_cache_clear_hook(_recent_signals.clear)
+
+# JSON schema of the signal, sent as the output format so providers can constrain the response to it
+_ALTMAN_OUTPUT_SCHEMA = schema_json(SamAltmanSignal)
+
+# Output format of the combined sub-analysis call
+ALTMAN_ANALYSIS_FORMAT = str({
+    "market_analysis": "string with the analysis",
+    "technical_analysis": "string with the analysis",
+    "scaling_potential": "string with the analysis",
+    "competitive_analysis": "string with the analysis"
+})
+
+# Prompts are built once and only filled in per call
+_ANALYSIS_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Analyze this product idea: {product_idea}
+Cover each of the following:
+1. market_analysis - Market opportunity: total addressable market, market growth rate, customer pain points, willingness to pay and market timing (use the market context)
+2. technical_analysis - Technical feasibility: required technologies, development complexity, resource requirements, technical risks and time to market (use the technical context)
+3. scaling_potential - Scaling potential: network effects, viral potential, customer acquisition costs, revenue model scalability and operational scalability
+4. competitive_analysis - Competitive landscape: existing competitors, potential competitors, competitive advantages, entry barriers and defensibility (use the market context)
+
+Market context: {market_json}
+Technical context: {technical_json}
+""")
+])
+
+_EVALUATION_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """As Sam Altman, evaluate this product idea: {product_idea}
+
+Analysis data: {analysis_json}
+
+Give each score as a float between 0 and 1, with detailed reasoning.
+""")
+])
+
+
+async def sam_altman_agent_async(state: AgentState):
     """Analyzes product ideas using Sam Altman's principles and LLM reasoning."""
+    # A single call covers all four sub-analyses
+    response = await acall_llm_streamed(build_altman_analysis_prompt(state), output_format=ALTMAN_ANALYSIS_FORMAT)
+    return await finish_altman_evaluation(state, response)
+
+
+def sam_altman_agent(state: AgentState):
+    """Synchronous entry point for callers outside an event loop."""
+    return asyncio.run(sam_altman_agent_async(state))
+
+
+def build_altman_analysis_prompt(state: AgentState) -> list:
+    """Builds the prompt that runs all four sub-analyses using Altman's principles."""
     data = state["data"]
-    product_idea = data["product_idea"]
-    market_context = data.get("market_context", {})
-    technical_context = data.get("technical_context", {})
-
-    # Collect analysis for LLM reasoning
-    analysis_data = {
-        "market_analysis": analyze_market_opportunity(product_idea, market_context),
-        "technical_analysis": analyze_technical_feasibility(product_idea, technical_context),
-        "scaling_potential": analyze_scaling_potential(product_idea),
-        "competitive_analysis": analyze_competitive_landscape(product_idea, market_context)
-    }
-    logger.info(f"Analysis data: {analysis_data}")
-    return generate_altman_output(product_idea, analysis_data)
-
-
-def analyze_market_opportunity(product_idea: str, market_context: dict) -> dict:
-    """Analyzes market opportunity using Altman's principles."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze the market opportunity for: {product_idea}
-        Consider:
-        1. Total addressable market
-        2. Market growth rate
-        3. Customer pain points
-        4. Willingness to pay
-        5. Market timing
-        
-        Context: {json.dumps(market_context)}
-        """)
-    ])
-    logger.info(f"Prompt: {prompt}")
-    return call_llm(prompt)
-
-
-def analyze_technical_feasibility(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes technical feasibility of the product idea."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate technical feasibility for: {product_idea}
-        Consider:
-        1. Required technologies
-        2. Development complexity
-        3. Resource requirements
-        4. Technical risks
-        5. Time to market
-        
-        Context: {json.dumps(technical_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_scaling_potential(product_idea: str) -> dict:
-    """Analyzes scaling potential using Altman's growth principles."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate scaling potential for: {product_idea}
-        Consider:
-        1. Network effects
-        2. Viral potential
-        3. Customer acquisition costs
-        4. Revenue model scalability
-        5. Operational scalability
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_competitive_landscape(product_idea: str, market_context: dict) -> dict:
-    """Analyzes competitive landscape and moat potential."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze competitive landscape for: {product_idea}
-        Consider:
-        1. Existing competitors
-        2. Potential competitors
-        3. Competitive advantages
-        4. Entry barriers
-        5. Defensibility
-        
-        Context: {json.dumps(market_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
+    return _ANALYSIS_TEMPLATE.format_messages(
+        product_idea=data["product_idea"],
+        market_json=compact_json(data.get("market_context", {})),
+        technical_json=compact_json(data.get("technical_context", {}))
+    )
+
 
+async def finish_altman_evaluation(state: AgentState, analysis_response) -> SamAltmanSignal:
+    """Completes the evaluation from the raw LLM response to the analysis prompt."""
+    if isinstance(analysis_response, str):
+        # Keep unstructured text so the evaluation still sees the analysis
+        analysis_data = await aparse_llm_json(analysis_response, {"analysis": analysis_response})
+    else:
+        analysis_data = analysis_response or {}
+    logger.debug("Analysis data: %s", analysis_data)
+    return await generate_altman_output(state["data"]["product_idea"], analysis_data)
 
-def generate_altman_output(product_idea: str, analysis_data: dict) -> SamAltmanSignal:
+
+async def generate_altman_output(product_idea: str, analysis_data: dict) -> SamAltmanSignal:
     """Generates final output using Sam Altman's perspective."""
-    # Define the expected output format
-    output_format = {
-        "opportunity_score": "float between 0 and 1",
-        "market_potential": "float between 0 and 1",
-        "technical_feasibility": "float between 0 and 1",
-        "reasoning": "string with detailed reasoning",
-        "key_insights": "list of strings with key insights",
-        "potential_risks": "list of strings with potential risks"
-    }
+    analysis_json = compact_json(analysis_data)
+    prompt = _EVALUATION_TEMPLATE.format_messages(product_idea=product_idea, analysis_json=analysis_json)
     
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""As Sam Altman, evaluate this product idea: {product_idea}
-        
-        Analysis data: {json.dumps(analysis_data)}
-        
-        Provide:
-        1. Opportunity score (0-1)
-        2. Market potential score (0-1)
-        3. Technical feasibility score (0-1)
-        4. Detailed reasoning
-        5. Key insights
-        6. Potential risks
-        
-        Format your response as a valid JSON object with the following structure:
-        {{
-            "opportunity_score": <float between 0 and 1>,
-            "market_potential": <float between 0 and 1>,
-            "technical_feasibility": <float between 0 and 1>,
-            "reasoning": "<detailed reasoning as a string>",
-            "key_insights": ["<insight 1>", "<insight 2>", ...],
-            "potential_risks": ["<risk 1>", "<risk 2>", ...]
-        }}
-        
-        Make sure your response is a valid JSON object that can be parsed directly.
-        """)
-    ])
+    # The prompt holds the product idea and every analysis, so it identifies the result
+    run_key = prompt[-1].content
+    signal = _recent_signals.get(run_key)
+    if signal is not None:
+        _recent_signals.move_to_end(run_key)
+        return signal
     
     try:
         logger.info("Calling LLM for Sam Altman evaluation")
-        response = call_llm(prompt, output_format=str(output_format))
-        logger.info(f"Raw response from LLM: {response}")
+        response = await acall_llm_streamed(prompt, output_format=_ALTMAN_OUTPUT_SCHEMA)
+        logger.debug("Raw response from LLM: %s", response)
         
         # If response is a string, try to parse it as JSON
         if isinstance(response, str):
-            try:
-                # Try to extract JSON from the response
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    parsed_response = json.loads(json_str)
-                else:
-                    # If no JSON found, create a default response
-                    logger.warning("No JSON found in response, creating default")
-                    parsed_response = {
-                        "opportunity_score": 0.5,
-                        "market_potential": 0.5,
-                        "technical_feasibility": 0.5,
-                        "reasoning": "Unable to generate detailed reasoning.",
-                        "key_insights": ["Default insight"],
-                        "potential_risks": ["Default risk"]
-                    }
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON from response: {e}")
-                # Create a default response
-                parsed_response = {
-                    "opportunity_score": 0.5,
-                    "market_potential": 0.5,
-                    "technical_feasibility": 0.5,
-                    "reasoning": "Unable to generate detailed reasoning.",
-                    "key_insights": ["Default insight"],
-                    "potential_risks": ["Default risk"]
-                }
+            parsed_response = await aparse_llm_json(response, {})
         else:
-            # Response is already a dict
             parsed_response = response
+        # Nothing could be parsed, so the signal would be all defaults
+        validated = bool(parsed_response)
         
         # Ensure all required fields are present
-        if "opportunity_score" not in parsed_response:
-            parsed_response["opportunity_score"] = 0.5
-        if "market_potential" not in parsed_response:
-            parsed_response["market_potential"] = 0.5
-        if "technical_feasibility" not in parsed_response:
-            parsed_response["technical_feasibility"] = 0.5
-        if "reasoning" not in parsed_response:
-            parsed_response["reasoning"] = "Unable to generate detailed reasoning."
-        if "key_insights" not in parsed_response:
-            parsed_response["key_insights"] = ["Default insight"]
-        if "potential_risks" not in parsed_response:
-            parsed_response["potential_risks"] = ["Default risk"]
+        parsed_response = with_defaults(parsed_response, _ALTMAN_DEFAULTS)
         
-        logger.info(f"Parsed response: {parsed_response}")
-        return SamAltmanSignal(**parsed_response)
+        logger.debug("Parsed response: %s", parsed_response)
+        signal = SamAltmanSignal(**parsed_response)
+        # Fallbacks are not remembered so the next run retries
+        if validated:
+            _recent_signals[run_key] = signal
+            if len(_recent_signals) > _RECENT_SIGNALS_SIZE:
+                _recent_signals.popitem(last=False)
+        return signal
     
     except Exception as e:
-        logger.error(f"Error generating Sam Altman output: {e}", exc_info=True)
-        # Return a default response
-        return SamAltmanSignal(
-            opportunity_score=0.5,
-            market_potential=0.5,
-            technical_feasibility=0.5,
-            reasoning="Error occurred during evaluation.",
-            key_insights=["Default insight"],
-            potential_risks=["Default risk"]
-        ) 
\ No newline at end of file
+        logger.error("Error generating Sam Altman output: %s", e, exc_info=True)
+        # Failures are not remembered so the next run retries
+        return _ERROR_SIGNAL
\ No newline at end of file
@@ -1,212 +1,153 @@
 from graph.state import AgentState, show_agent_reasoning
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
-import json
+from pydantic import BaseModel, ConfigDict
+import asyncio
 import logging
+from collections import OrderedDict
 from typing_extensions import Literal
-from utils.llm import call_llm
+from utils.json_extract import aparse_llm_json, compact_json, parse_llm_model, schema_json
+from utils.llm import acall_llm, register_cache_clear_hook
 from utils.progress import progress
 
 # Configure logging
 logger = logging.getLogger('ai-product-evaluator')
 
 class SebastianThrunSignal(BaseModel):
-    autonomous_systems_score: float  # 0-1 score for autonomous systems
-    educational_impact: float  # 0-1 score for educational impact
-    innovation_potential: float  # 0-1 score for innovation potential
-    reasoning: str
-    key_innovations: list[str]
-    technical_challenges: list[str]
+    # Signals are read-only once built
+    model_config = ConfigDict(frozen=True)
+
+    autonomous_systems_score: float = 0.5  # 0-1 score for autonomous systems
+    educational_impact: float = 0.5  # 0-1 score for educational impact
+    innovation_potential: float = 0.5  # 0-1 score for innovation potential
+    reasoning: str = "Unable to generate detailed reasoning."
+    key_innovations: list[str] = ["Default innovation"]
+    technical_challenges: list[str] = ["Default challenge"]
+
+
+# Frozen, so the error fallback is built once and shared
+_ERROR_SIGNAL = SebastianThrunSignal(reasoning="Error occurred during evaluation.")
+
+# Recent signals keyed by their evaluation prompt, so repeated evaluations reuse the
+# validated signal instead of calling the LLM and validating again
+_RECENT_SIGNALS_SIZE = 256
+_recent_signals: "OrderedDict[str, SebastianThrunSignal]" = OrderedDict()
+register_cache_clear_hook(_recent_signals.clear)
+
+
+# JSON schema of the signal, sent as the output format so providers can constrain the response to it
+_THRUN_OUTPUT_SCHEMA = schema_json(SebastianThrunSignal)
+
+# Output format of the combined sub-analysis call
+THRUN_ANALYSIS_FORMAT = str({
+    "autonomous_analysis": "string with the analysis",
+    "educational_analysis": "string with the analysis",
+    "innovation_analysis": "string with the analysis",
+    "implementation_potential": "string with the analysis"
+})
+
+# Prompts are built once and only filled in per call
+_ANALYSIS_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Analyze this product idea: {product_idea}
+Cover each of the following:
+1. autonomous_analysis - Autonomous systems potential: autonomous capabilities, safety and reliability, decision-making systems, sensor integration and system architecture (use the technical context)
+2. educational_analysis - Educational impact: learning outcomes, educational innovation, student engagement, accessibility and scalability of education (use the educational context)
+3. innovation_analysis - Innovation potential: technological breakthroughs, market disruption, competitive advantages, future applications and industry impact
+4. implementation_potential - Implementation potential: technical feasibility, resource requirements, development timeline, integration challenges and maintenance needs (use the technical context)
+
+Technical context: {technical_json}
+Educational context: {educational_json}
+""")
+])
+
+_EVALUATION_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """As Sebastian Thrun, evaluate this product idea: {product_idea}
+
+Analysis data: {analysis_json}
+
+Provide:
+1. Autonomous systems score (0-1)
+2. Educational impact score (0-1)
+3. Innovation potential score (0-1)
+4. Detailed reasoning
+5. Key innovations
+6. Technical challenges
+""")
+])
+
+
+async def sebastian_thrun_agent_async(state: AgentState):
+    """Analyzes product ideas using Sebastian Thrun's expertise in autonomous systems and education."""
+    # A single call covers all four sub-analyses
+    response = await acall_llm(build_thrun_analysis_prompt(state), output_format=THRUN_ANALYSIS_FORMAT)
+    return await finish_thrun_evaluation(state, response)
 
 
 def sebastian_thrun_agent(state: AgentState):
-    """Analyzes product ideas using Sebastian Thrun's expertise in autonomous systems and education."""
+    """Synchronous entry point for callers outside an event loop."""
+    return asyncio.run(sebastian_thrun_agent_async(state))
+
+
+def build_thrun_analysis_prompt(state: AgentState) -> list:
+    """Builds the prompt that runs all four sub-analyses using Thrun's expertise."""
     data = state["data"]
-    product_idea = data["product_idea"]
-    technical_context = data.get("technical_context", {})
-    educational_context = data.get("educational_context", {})
-
-    # Collect analysis for LLM reasoning
-    analysis_data = {
-        "autonomous_analysis": analyze_autonomous_systems(product_idea, technical_context),
-        "educational_analysis": analyze_educational_impact(product_idea, educational_context),
-        "innovation_analysis": analyze_innovation_potential(product_idea),
-        "implementation_potential": analyze_implementation_potential(product_idea, technical_context)
-    }
-
-    return generate_thrun_output(product_idea, analysis_data)
-
-
-def analyze_autonomous_systems(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes autonomous systems potential and requirements."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze autonomous systems potential for: {product_idea}
-        Consider:
-        1. Autonomous capabilities
-        2. Safety and reliability
-        3. Decision-making systems
-        4. Sensor integration
-        5. System architecture
-        
-        Context: {json.dumps(technical_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_educational_impact(product_idea: str, educational_context: dict) -> dict:
-    """Analyzes educational impact and learning potential."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate educational impact for: {product_idea}
-        Consider:
-        1. Learning outcomes
-        2. Educational innovation
-        3. Student engagement
-        4. Accessibility
-        5. Scalability of education
-        
-        Context: {json.dumps(educational_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_innovation_potential(product_idea: str) -> dict:
-    """Analyzes innovation potential and technological advancement."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Evaluate innovation potential for: {product_idea}
-        Consider:
-        1. Technological breakthroughs
-        2. Market disruption
-        3. Competitive advantages
-        4. Future applications
-        5. Industry impact
-        """)
-    ])
-    
-    return call_llm(prompt)
-
-
-def analyze_implementation_potential(product_idea: str, technical_context: dict) -> dict:
-    """Analyzes implementation potential and technical requirements."""
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""Analyze implementation potential for: {product_idea}
-        Consider:
-        1. Technical feasibility
-        2. Resource requirements
-        3. Development timeline
-        4. Integration challenges
-        5. Maintenance needs
-        
-        Context: {json.dumps(technical_context)}
-        """)
-    ])
-    
-    return call_llm(prompt)
+    return _ANALYSIS_TEMPLATE.format_messages(
+        product_idea=data["product_idea"],
+        technical_json=compact_json(data.get("technical_context", {})),
+        educational_json=compact_json(data.get("educational_context", {}))
+    )
+
+
+async def finish_thrun_evaluation(state: AgentState, analysis_response) -> SebastianThrunSignal:
+    """Completes the evaluation from the raw LLM response to the analysis prompt."""
+    if isinstance(analysis_response, str):
+        # Keep unstructured text so the evaluation still sees the analysis
+        analysis_data = await aparse_llm_json(analysis_response, {"analysis": analysis_response})
+    else:
+        analysis_data = analysis_response or {}
+    return await generate_thrun_output(state["data"]["product_idea"], analysis_data)
 
 
-def generate_thrun_output(product_idea: str, analysis_data: dict) -> SebastianThrunSignal:
+async def generate_thrun_output(product_idea: str, analysis_data: dict) -> SebastianThrunSignal:
     """Generates final output using Sebastian Thrun's perspective."""
-    output_format = {
-        "autonomous_systems_score": "float between 0 and 1",
-        "educational_impact": "float between 0 and 1",
-        "innovation_potential": "float between 0 and 1",
-        "reasoning": "string with detailed reasoning",
-        "key_innovations": "list of strings with key innovations",
-        "technical_challenges": "list of strings with technical challenges"
-    }
+    # Nothing to evaluate when the analysis call failed or came back empty
+    if not isinstance(analysis_data, dict) or not any(analysis_data.values()):
+        logger.warning("Sebastian Thrun analysis is empty, skipping the evaluation call")
+        return _ERROR_SIGNAL
     
-    prompt = ChatPromptTemplate.from_messages([
-        HumanMessage(content=f"""As Sebastian Thrun, evaluate this product idea: {product_idea}
-        
-        Analysis data: {json.dumps(analysis_data)}
-        
-        Provide:
-        1. Autonomous systems score (0-1)
-        2. Educational impact score (0-1)
-        3. Innovation potential score (0-1)
-        4. Detailed reasoning
-        5. Key innovations
-        6. Technical challenges
-        
-        Format your response as a valid JSON object with the following structure:
-        {{
-            "autonomous_systems_score": <float between 0 and 1>,
-            "educational_impact": <float between 0 and 1>,
-            "innovation_potential": <float between 0 and 1>,
-            "reasoning": "<detailed reasoning as a string>",
-            "key_innovations": ["<innovation 1>", "<innovation 2>", ...],
-            "technical_challenges": ["<challenge 1>", "<challenge 2>", ...]
-        }}
-        
-        Make sure your response is a valid JSON object that can be parsed directly.
-        """)
-    ])
+    analysis_json = compact_json(analysis_data)
+    prompt = _EVALUATION_TEMPLATE.format_messages(product_idea=product_idea, analysis_json=analysis_json)
+    
+    # The prompt holds the product idea and every analysis, so it identifies the result
+    run_key = prompt[-1].content
+    signal = _recent_signals.get(run_key)
+    if signal is not None:
+        _recent_signals.move_to_end(run_key)
+        return signal
     
     try:
         logger.info("Calling LLM for Sebastian Thrun evaluation")
-        response = call_llm(prompt, output_format=str(output_format))
-        logger.info(f"Raw response from LLM: {response}")
+        response = await acall_llm(prompt, output_format=_THRUN_OUTPUT_SCHEMA)
+        logger.debug("Raw response from LLM: %s", response)
         
-        # If response is a string, try to parse it as JSON
+        # Plain-text replies, e.g. from Ollama models without schema support, are searched for a valid signal
         if isinstance(response, str):
-            try:
-                json_start = response.find("{")
-                json_end = response.rfind("}") + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    parsed_response = json.loads(json_str)
-                else:
-                    logger.warning("No JSON found in response, creating default")
-                    parsed_response = {
-                        "autonomous_systems_score": 0.5,
-                        "educational_impact": 0.5,
-                        "innovation_potential": 0.5,
-                        "reasoning": "Unable to generate detailed reasoning.",
-                        "key_innovations": ["Default innovation"],
-                        "technical_challenges": ["Default challenge"]
-                    }
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON from response: {e}")
-                parsed_response = {
-                    "autonomous_systems_score": 0.5,
-                    "educational_impact": 0.5,
-                    "innovation_potential": 0.5,
-                    "reasoning": "Unable to generate detailed reasoning.",
-                    "key_innovations": ["Default innovation"],
-                    "technical_challenges": ["Default challenge"]
-                }
+            signal = parse_llm_model(response, SebastianThrunSignal)
+            if signal is None:
+                raise ValueError("No valid signal found in response")
         else:
-            parsed_response = response
-        
-        # Ensure all required fields are present
-        if "autonomous_systems_score" not in parsed_response:
-            parsed_response["autonomous_systems_score"] = 0.5
-        if "educational_impact" not in parsed_response:
-            parsed_response["educational_impact"] = 0.5
-        if "innovation_potential" not in parsed_response:
-            parsed_response["innovation_potential"] = 0.5
-        if "reasoning" not in parsed_response:
-            parsed_response["reasoning"] = "Unable to generate detailed reasoning."
-        if "key_innovations" not in parsed_response:
-            parsed_response["key_innovations"] = ["Default innovation"]
-        if "technical_challenges" not in parsed_response:
-            parsed_response["technical_challenges"] = ["Default challenge"]
+            # Missing fields take the model defaults
+            signal = SebastianThrunSignal.model_validate(response)
+            # With field defaults any object validates, so reject ones that set none of the fields
+            if not signal.model_fields_set:
+                raise ValueError("No signal fields found in response")
         
-        logger.info(f"Parsed response: {parsed_response}")
-        return SebastianThrunSignal(**parsed_response)
+        logger.debug("Parsed response: %s", signal)
+        _recent_signals[run_key] = signal
+        if len(_recent_signals) > _RECENT_SIGNALS_SIZE:
+            _recent_signals.popitem(last=False)
+        return signal
     
     except Exception as e:
-        logger.error(f"Error generating Sebastian Thrun output: {e}", exc_info=True)
-        return SebastianThrunSignal(
-            autonomous_systems_score=0.5,
-            educational_impact=0.5,
-            innovation_potential=0.5,
-            reasoning="Error occurred during evaluation.",
-            key_innovations=["Default innovation"],
-            technical_challenges=["Default challenge"]
-        ) 
\ No newline at end of file
+        logger.error("Error generating Sebastian Thrun output: %s", e, exc_info=True)
+        # Failures are not remembered so the next run retries
+        return _ERROR_SIGNAL
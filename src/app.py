@@ -2,10 +2,13 @@ import streamlit as st
 import os
 import json
 import logging
+import threading
 import time
+import config
 from orchestrator import ProductOrchestrator
 from dotenv import load_dotenv
 from utils.ollama_utils import get_available_models
+from utils.llm import llm_cache_stats
 
 # Configure logging
 logging.basicConfig(
@@ -30,15 +33,35 @@ st.set_page_config(
 )
 logger.info("Streamlit page config set")
 
-# Initialize orchestrator
-@st.cache_resource
+# Initialize orchestrator; no spinner, since it is usually built by the warmup thread
+@st.cache_resource(show_spinner=False)
 def get_orchestrator():
     logger.info("Initializing ProductOrchestrator")
     start_time = time.time()
     orchestrator = ProductOrchestrator()
-    logger.info(f"ProductOrchestrator initialized in {time.time() - start_time:.2f} seconds")
+    logger.info("ProductOrchestrator initialized in %.2f seconds", time.time() - start_time)
     return orchestrator
 
+# Reruns happen on every widget change, so the Ollama server is asked for its models at most every 30 seconds
+@st.cache_data(ttl=30, show_spinner=False)
+def list_ollama_models():
+    return get_available_models()
+
+def warmup():
+    """Build the orchestrator and, when Ollama is configured, fetch its model list."""
+    get_orchestrator()
+    if config.USE_OLLAMA:
+        list_ollama_models()
+
+@st.cache_resource(show_spinner=False)
+def start_warmup() -> threading.Thread:
+    """Run the warmup in the background once per server, so the first render and evaluation do not wait for it."""
+    thread = threading.Thread(target=warmup, name="app-warmup", daemon=True)
+    thread.start()
+    return thread
+
+start_warmup()
+
 # Define available agents
 AVAILABLE_AGENTS = {
     "Sam Altman": "Focus on AI/ML opportunities and startup scaling",
@@ -65,71 +88,47 @@ def main():
     with st.sidebar:
         st.header("Settings")
         
-        # Agent selection
-        st.subheader("Select Agents")
-        st.markdown("Choose which agents will evaluate your product:")
-        selected_agents = st.multiselect(
-            "Available Agents",
-            options=list(AVAILABLE_AGENTS.keys()),
-            default=["Sam Altman", "Project Advisor"],
-            help="Select one or more agents to evaluate your product"
-        )
-        
-        if not selected_agents:
-            st.warning("Please select at least one agent to evaluate your product.")
-            return
-        
-        # Display selected agents and their expertise
-        st.markdown("### Selected Agents' Expertise")
-        for agent in selected_agents:
-            st.markdown(f"**{agent}**: {AVAILABLE_AGENTS[agent]}")
-        
-        st.divider()
-        
-        # Model settings
-        st.subheader("Model Settings")
-        
-        # Choose between OpenAI and Ollama
+        # Choose between OpenAI and Ollama outside the form, so the model and temperature
+        # widgets below always belong to the provider that is being applied
         model_provider = st.radio(
             "Select Model Provider",
             ["OpenAI", "Ollama"],
-            index=0 if os.getenv("USE_OLLAMA", "false").lower() != "true" else 1
+            index=1 if config.USE_OLLAMA else 0
         )
-        logger.info(f"Selected model provider: {model_provider}")
         
-        if model_provider == "OpenAI":
-            # OpenAI settings
-            if not os.getenv("OPENAI_API_KEY"):
-                logger.warning("OPENAI_API_KEY not found in environment variables")
-                st.error("⚠️ OPENAI_API_KEY not found in environment variables.")
-                st.info("Create a .env file with your OpenAI API key: OPENAI_API_KEY=your_key_here")
-                return
-            
-            model_name = st.selectbox(
-                "OpenAI Model",
-                ["gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo"],
-                index=0
-            )
-            
-            temperature = st.slider(
-                "Temperature",
-                min_value=0.0,
-                max_value=1.0,
-                value=float(os.getenv("OPENAI_TEMPERATURE", "0.7")),
-                step=0.1
+        # Widgets inside the form only rerun the app when the settings are applied
+        with st.form("settings"):
+            # Agent selection
+            st.subheader("Select Agents")
+            st.markdown("Choose which agents will evaluate your product:")
+            selected_agents = st.multiselect(
+                "Available Agents",
+                options=list(AVAILABLE_AGENTS.keys()),
+                default=["Sam Altman", "Project Advisor"],
+                help="Select one or more agents to evaluate your product"
             )
             
-            # Update environment variables
-            os.environ["USE_OLLAMA"] = "false"
-            os.environ["OPENAI_MODEL"] = model_name
-            os.environ["OPENAI_TEMPERATURE"] = str(temperature)
-            logger.info(f"OpenAI settings updated: model={model_name}, temperature={temperature}")
+            # Model settings
+            st.subheader("Model Settings")
             
-        else:
-            # Ollama settings
-            try:
+            if model_provider == "OpenAI":
+                model_name = st.selectbox(
+                    "OpenAI Model",
+                    ["gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo"],
+                    index=0
+                )
+                
+                temperature = st.slider(
+                    "Temperature",
+                    min_value=0.0,
+                    max_value=1.0,
+                    value=config.OPENAI_TEMPERATURE,
+                    step=0.1
+                )
+            else:
+                # Ollama settings
                 logger.info("Fetching available Ollama models")
-                available_models = get_available_models()
+                available_models = list_ollama_models()
                 if not available_models:
                     logger.warning("No Ollama models found")
                     st.warning("No Ollama models found. Please make sure Ollama is running.")
@@ -148,17 +147,48 @@ def main():
                     value=0.7,
                     step=0.1
                 )
-                
-                # Update environment variables
+            
+            submitted = st.form_submit_button("Apply settings")
+        
+        if not selected_agents:
+            st.warning("Please select at least one agent to evaluate your product.")
+            return
+        
+        # Display selected agents and their expertise
+        st.markdown("### Selected Agents' Expertise")
+        for agent in selected_agents:
+            st.markdown(f"**{agent}**: {AVAILABLE_AGENTS[agent]}")
+        
+        st.divider()
+        
+        # Cached LLM responses make repeated evaluations instant; allow resetting them
+        if st.button("Clear LLM Cache", help="Discard cached LLM responses so the next evaluation queries the model again"):
+            get_orchestrator().agent_selector.clear_llm_cache()
+            logger.info("LLM response cache cleared")
+            st.success("LLM cache cleared.")
+        cache_stats = llm_cache_stats()
+        st.caption(f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        
+        if model_provider == "OpenAI" and not config.OPENAI_API_KEY:
+            logger.warning("OPENAI_API_KEY not found in environment variables")
+            st.error("⚠️ OPENAI_API_KEY not found in environment variables.")
+            st.info("Create a .env file with your OpenAI API key: OPENAI_API_KEY=your_key_here")
+            return
+        
+        # Update environment variables only when applied settings differ from the last ones written
+        llm_settings = (model_provider, model_name, temperature)
+        if submitted and st.session_state.get("llm_settings") != llm_settings:
+            st.session_state["llm_settings"] = llm_settings
+            logger.info("Selected model provider: %s", model_provider)
+            if model_provider == "OpenAI":
+                os.environ["USE_OLLAMA"] = "false"
+                os.environ["OPENAI_MODEL"] = model_name
+                os.environ["OPENAI_TEMPERATURE"] = str(temperature)
+                logger.info("OpenAI settings updated: model=%s, temperature=%s", model_name, temperature)
+            else:
                 os.environ["USE_OLLAMA"] = "true"
                 os.environ["OLLAMA_MODEL"] = model_name
-                logger.info(f"Ollama settings updated: model={model_name}, temperature={temperature}")
-                
-            except Exception as e:
-                logger.error(f"Error connecting to Ollama: {e}", exc_info=True)
-                st.error(f"Error connecting to Ollama: {e}")
-                st.info("Make sure Ollama is running on your machine.")
-                return
+                logger.info("Ollama settings updated: model=%s, temperature=%s", model_name, temperature)
     
     # Product idea input
     product_idea = st.text_area(
@@ -208,7 +238,9 @@ def main():
             if technical_context:
                 context["technical_context"] = {"description": technical_context}
             
-            logger.info(f"Evaluation context prepared: {json.dumps(context)}")
+            # Serializing the context is only worth it when the record is emitted
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Evaluation context prepared: %s", json.dumps(context))
             
             # Get evaluation
             try:
@@ -220,13 +252,60 @@ def main():
                     selected_agents=selected_agents,
                     **context
                 )
-                logger.info(f"Evaluation completed in {time.time() - start_time:.2f} seconds")
+                logger.info("Evaluation completed in %.2f seconds", time.time() - start_time)
                 
                 # Display results
                 display_results(evaluation)
             except Exception as e:
-                logger.error(f"Error during evaluation: {e}", exc_info=True)
+                logger.error("Error during evaluation: %s", e, exc_info=True)
                 st.error(f"An error occurred during evaluation: {e}")
+    
+    # Batch evaluation of several ideas with the same agents and context
+    with st.expander("Evaluate Multiple Ideas"):
+        batch_ideas = st.text_area(
+            "Product ideas (one per line):",
+            height=150,
+            placeholder="Enter one product idea per line..."
+        )
+        
+        evaluate_all = st.button("Evaluate All Ideas")
+    
+    # Results render outside the expander since they contain expanders themselves
+    if evaluate_all:
+        ideas = [idea.strip() for idea in batch_ideas.splitlines() if idea.strip()]
+        if not ideas:
+            st.warning("Please enter at least one product idea to evaluate.")
+            return
+        
+        if not selected_agents:
+            st.warning("Please select at least one agent to evaluate your product.")
+            return
+        
+        context = {}
+        if market_context:
+            context["market_context"] = {"description": market_context}
+        if technical_context:
+            context["technical_context"] = {"description": technical_context}
+        
+        logger.info("Starting batch evaluation of %d product ideas", len(ideas))
+        start_time = time.time()
+        
+        with st.spinner(f"Evaluating {len(ideas)} product ideas..."):
+            evaluations = get_orchestrator().evaluate_many(
+                ideas,
+                selected_agents=selected_agents,
+                **context
+            )
+        logger.info("Batch evaluation completed in %.2f seconds", time.time() - start_time)
+        
+        tabs = st.tabs([f"Idea {i}" for i in range(1, len(ideas) + 1)])
+        for tab, idea, evaluation in zip(tabs, ideas, evaluations):
+            with tab:
+                st.markdown(f"**{idea}**")
+                if evaluation is None:
+                    st.error("An error occurred while evaluating this idea.")
+                else:
+                    display_results(evaluation)
 
 def display_results(evaluation):
     """Display evaluation results in a structured format."""
@@ -0,0 +1,29 @@
+"""Environment-derived settings, read once at import time"""
+
+import os
+from dotenv import load_dotenv
+
+# Load environment variables before reading any settings
+load_dotenv()
+
+# OpenAI configuration
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+
+# Ollama configuration
+USE_OLLAMA = os.getenv("USE_OLLAMA", "false").lower() == "true"
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1")
+OLLAMA_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api")
+
+# LLM request tuning
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RPM = float(os.getenv("LLM_MAX_RPM", "0"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_DETERMINISTIC_ONLY = os.getenv("LLM_CACHE_DETERMINISTIC_ONLY", "false").lower() == "true"
+LLM_CACHE_NORMALIZE_WHITESPACE = os.getenv("LLM_CACHE_NORMALIZE_WHITESPACE", "false").lower() == "true"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")
+LLM_DISK_CACHE_TTL = float(os.getenv("LLM_DISK_CACHE_TTL", "86400"))
+LLM_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0"))
+LLM_EMBEDDING_MODEL = os.getenv("LLM_EMBEDDING_MODEL", "text-embedding-3-small")
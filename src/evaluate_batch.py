@@ -0,0 +1,67 @@
+"""
+Evaluate a file of product ideas from the command line.
+
+Usage:
+    python src/evaluate_batch.py ideas.txt --agents "Sam Altman,Elon Musk" --output evaluations.json
+
+With --provider-batch the persona calls are submitted as one OpenAI Batch API
+job, which costs less but can take up to 24 hours to complete.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+# Load environment variables before the LLM clients are configured
+load_dotenv()
+
+
+def main():
+    """Evaluate every product idea in a file and write the evaluations as JSON."""
+    parser = argparse.ArgumentParser(description="Evaluate product ideas in batch")
+    parser.add_argument("ideas_file", help="Text file with one product idea per line")
+    parser.add_argument("--agents", type=str, help="Comma-separated agent names to use (default: all agents)")
+    parser.add_argument("--output", type=str, help="File to write the evaluations to (default: stdout)")
+    parser.add_argument("--max-concurrent", type=int, default=8, help="Maximum number of ideas evaluated at the same time")
+    parser.add_argument("--provider-batch", action="store_true", help="Submit persona calls through the OpenAI Batch API")
+    args = parser.parse_args()
+
+    # Agent and LLM errors are logged as warnings, so show them on stderr
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+
+    with open(args.ideas_file, encoding="utf-8") as f:
+        product_ideas = [line.strip() for line in f if line.strip()]
+    if not product_ideas:
+        print(f"No product ideas found in {args.ideas_file}")
+        sys.exit(1)
+
+    selected_agents = [name.strip() for name in args.agents.split(",")] if args.agents else None
+
+    # Imported after argument parsing, so --help and usage errors skip loading the agents and LLM clients
+    from orchestrator import ProductOrchestrator
+    orchestrator = ProductOrchestrator()
+    evaluations = orchestrator.evaluate_many(
+        product_ideas,
+        selected_agents=selected_agents,
+        max_concurrent=args.max_concurrent,
+        provider_batch=args.provider_batch
+    )
+
+    results = [
+        {"product_idea": idea, "evaluation": evaluation.model_dump() if evaluation else None}
+        for idea, evaluation in zip(product_ideas, evaluations)
+    ]
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Wrote {len(results)} evaluations to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 from typing import Dict, Any, Optional
 import json
+from utils.json_extract import compact_json
 
 class AgentState:
     """Simple state container for agent data."""
     
+    # Fixed attributes, so instances skip a per-instance __dict__
+    __slots__ = ("data", "reasoning")
+    
     def __init__(self, data: Dict[str, Any]):
         self.data = data
         self.reasoning = []
@@ -26,7 +30,14 @@ class AgentState:
         return self.reasoning
     
     def to_json(self) -> str:
-        """Convert state to JSON string."""
+        """Convert state to a compact JSON string."""
+        return compact_json({
+            "data": self.data,
+            "reasoning": self.reasoning
+        })
+    
+    def to_json_pretty(self) -> str:
+        """Convert state to an indented JSON string for display."""
         return json.dumps({
             "data": self.data,
             "reasoning": self.reasoning
@@ -1,5 +1,9 @@
-from typing import Dict, List, Any, Optional
-import json
+from typing import Callable, Dict, List, Any, Optional
+import asyncio
+import functools
+import logging
+from itertools import chain
+import numpy as np
 from pydantic import BaseModel
 from graph.state import AgentState
 from agents.sam_altman import sam_altman_agent, SamAltmanSignal
@@ -11,10 +15,126 @@ from agents.sebastian_thrun import sebastian_thrun_agent, SebastianThrunSignal
 from agents.emad_mostaque import emad_mostaque_agent, EmadMostaqueSignal
 from agents.clement_delangue import clement_delangue_agent, ClementDelangueSignal
 from agents.project_advisor import project_advisor_agent, ProjectRecommendation
+from agents.personas_parallel import PERSONA_AGENTS, run_all_personas, run_personas_combined, run_personas_many
 from agent_selector import AgentSelector
+from utils.json_extract import extract_json_from_response
 from utils.llm import call_llm
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage
+
+logger = logging.getLogger('ai-product-evaluator')
+
+
+# Built once; the variables are filled in per evaluation, so braces in the inputs are never parsed
+_RECOMMENDATIONS_TEMPLATE = ChatPromptTemplate.from_messages([
+    ("human", """Based on the following product idea and analysis, provide 5 specific recommendations for moving forward.
+Your response must be a valid JSON object of strings.
+
+Product Idea: {product_idea}
+
+Scores:
+- Overall Score: {overall_score:.2f}
+- Market Potential: {market_potential:.2f}
+- Technical Feasibility: {technical_feasibility:.2f}
+- Innovation Potential: {scientific_breakthrough_potential:.2f}
+
+Key Insights:
+{key_insights}
+
+Potential Risks:
+{potential_risks}
+
+Return a JSON object with a key "recommendations" and an array of 5 strings containing specific, actionable recommendations.
+""")
+])
+
+
+# Output format of the recommendations call
+_RECOMMENDATIONS_FORMAT = str({"recommendations": ["string with a specific, actionable recommendation"]})
+
+# How each persona's signal feeds the combined evaluation, in accumulation order:
+# (agent name, signal class, (signal attribute, score key) pairs, insights attribute, risks attribute)
+_SIGNAL_TABLE = (
+    ("Sam Altman", SamAltmanSignal, (
+        ("opportunity_score", "opportunity_score"),
+        ("market_potential", "market_potential"),
+        ("technical_feasibility", "technical_feasibility")
+    ), "key_insights", "potential_risks"),
+    ("Demis Hassabis", DemisHassabisSignal, (
+        ("scientific_breakthrough_potential", "scientific_breakthrough_potential"),
+        ("technical_advancement", "technical_advancement"),
+        ("research_feasibility", "research_feasibility")
+    ), "key_breakthroughs", "research_challenges"),
+    ("Elon Musk", ElonMuskSignal, (
+        ("opportunity_score", "opportunity_score"),
+        ("market_potential", "market_potential"),
+        ("technical_feasibility", "technical_feasibility")
+    ), "key_insights", "potential_risks"),
+    ("Adam D'Angelo", AdamDAngeloSignal, (
+        ("platform_potential", "platform_potential"),
+        ("ai_infrastructure", "ai_infrastructure"),
+        ("social_impact", "social_impact")
+    ), "key_features", "platform_challenges"),
+    ("Daniel Gross", DanielGrossSignal, (
+        ("startup_potential", "startup_potential"),
+        ("ai_infrastructure", "ai_infrastructure"),
+        ("market_fit", "market_potential")
+    ), "key_advantages", "startup_challenges"),
+    ("Sebastian Thrun", SebastianThrunSignal, (
+        ("autonomous_systems_score", "autonomous_systems_score"),
+        ("educational_impact", "educational_impact"),
+        ("innovation_potential", "innovation_potential")
+    ), "key_innovations", "technical_challenges"),
+    ("Emad Mostaque", EmadMostaqueSignal, (
+        ("infrastructure_score", "ai_infrastructure"),
+        ("community_impact", "social_impact"),
+        ("open_source_potential", "technical_feasibility")
+    ), "key_infrastructure", "community_challenges"),
+    ("Clement Delangue", ClementDelangueSignal, (
+        ("ai_innovation_score", "ai_infrastructure"),
+        ("technical_feasibility", "technical_feasibility"),
+        ("practical_application", "market_potential")
+    ), "key_ai_features", "implementation_challenges"),
+)
+
+# Score keys in column order of the aggregation arrays
+_SCORE_KEYS = (
+    "opportunity_score",
+    "market_potential",
+    "technical_feasibility",
+    "scientific_breakthrough_potential",
+    "technical_advancement",
+    "research_feasibility",
+    "startup_potential",
+    "ai_infrastructure",
+    "platform_potential",
+    "social_impact",
+    "autonomous_systems_score",
+    "educational_impact",
+    "innovation_potential"
+)
+_SCORE_INDEX = {key: index for index, key in enumerate(_SCORE_KEYS)}
+
+# Columns each agent's scores are added to, in the order of its score attributes
+_SCORE_COLUMNS = {
+    agent_name: np.array([_SCORE_INDEX[score_key] for _, score_key in score_attrs])
+    for agent_name, _, score_attrs, _, _ in _SIGNAL_TABLE
+}
+
+# Columns averaged into the overall score
+_KEY_METRIC_COLUMNS = np.array([_SCORE_INDEX[key] for key in (
+    "opportunity_score",
+    "market_potential",
+    "technical_feasibility",
+    "scientific_breakthrough_potential",
+    "ai_infrastructure",
+    "innovation_potential"
+)])
+
+# Signal class each agent's insight must have to be used, checked once per evaluation
+_EXPECTED_TYPES = {
+    **{agent_name: signal_cls for agent_name, signal_cls, *_ in _SIGNAL_TABLE},
+    "Project Advisor": ProjectRecommendation
+}
 
 
 class ProductEvaluation(BaseModel):
@@ -31,6 +151,23 @@ class ProductEvaluation(BaseModel):
     project_recommendation: Optional[ProjectRecommendation] = None  # Final project recommendation
 
 
+@functools.lru_cache(maxsize=64)
+def _signal_entries(agent_names: frozenset) -> tuple:
+    """Returns the _SIGNAL_TABLE entries of a set of agents, so small selections skip the rest of the table."""
+    return tuple(entry for entry in _SIGNAL_TABLE if entry[0] in agent_names)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_selector(config_file: Optional[str]) -> AgentSelector:
+    """
+    Returns the agent selector for a config file, loading it on first use.
+    
+    Orchestrators created with the same config file share one selector, so changes
+    made through configure_agents are seen by all of them.
+    """
+    return AgentSelector(config_file)
+
+
 class ProductOrchestrator:
     """Orchestrates product evaluation across multiple AI agents."""
     
@@ -41,8 +178,8 @@ class ProductOrchestrator:
         Args:
             config_file: Optional path to the agent configuration file
         """
-        # Initialize the agent selector
-        self.agent_selector = AgentSelector(config_file)
+        # Share the agent selector of the config file, so it is only parsed once
+        self.agent_selector = _get_selector(config_file)
         
         # Define all available agent functions
         self.all_agents = {
@@ -62,12 +199,47 @@ class ProductOrchestrator:
         self.agent_selector.interactive_selection()
     
     def evaluate_product(
+        self,
+        product_idea: str,
+        selected_agents: Optional[List[str]] = None,
+        market_context: Optional[Dict] = None,
+        technical_context: Optional[Dict] = None,
+        user_background: Optional[Dict] = None,
+        combine_personas: bool = False
+    ) -> ProductEvaluation:
+        """
+        Evaluates a product idea using selected agents and combines their insights.
+        
+        Synchronous wrapper around evaluate_product_async for callers outside an event loop.
+        
+        Args:
+            product_idea: The product idea to evaluate
+            selected_agents: List of agent names to use for evaluation. If None, uses all agents.
+            market_context: Optional market context information
+            technical_context: Optional technical context information
+            user_background: Optional information about the user's background and experience
+            combine_personas: Send the first LLM call of the batchable personas as one combined prompt instead of one call each
+            
+        Returns:
+            ProductEvaluation: Combined evaluation from all agents
+        """
+        return asyncio.run(self.evaluate_product_async(
+            product_idea,
+            selected_agents,
+            market_context,
+            technical_context,
+            user_background,
+            combine_personas
+        ))
+    
+    async def evaluate_product_async(
         self, 
         product_idea: str, 
         selected_agents: Optional[List[str]] = None,
         market_context: Optional[Dict] = None, 
         technical_context: Optional[Dict] = None,
-        user_background: Optional[Dict] = None
+        user_background: Optional[Dict] = None,
+        combine_personas: bool = False
     ) -> ProductEvaluation:
         """
         Evaluates a product idea using selected agents and combines their insights.
@@ -78,23 +250,42 @@ class ProductOrchestrator:
             market_context: Optional market context information
             technical_context: Optional technical context information
             user_background: Optional information about the user's background and experience
+            combine_personas: Send the first LLM call of the batchable personas as one combined prompt instead of one call each
             
         Returns:
             ProductEvaluation: Combined evaluation from all agents
         """
+        enabled_agents = self._enabled_agents(selected_agents)
+        state = self._build_state(product_idea, market_context, technical_context, user_background)
+        
+        # The persona agents are independent, so run them together on the event loop
+        persona_names = [name for name in enabled_agents if name in PERSONA_AGENTS]
+        run_personas = run_personas_combined if combine_personas else run_all_personas
+        persona_insights = await run_personas(state, persona_names) if persona_names else {}
+        
+        return await self._complete_evaluation(product_idea, state, enabled_agents, persona_insights)
+    
+    def _enabled_agents(self, selected_agents: Optional[List[str]]) -> Dict[str, Callable]:
+        """Returns the agent functions to run, keyed by name, for a selection of agent names."""
         # Get enabled agent functions based on selection
         if selected_agents is None:
             # Use all agents if none specified
-            enabled_agents = self.all_agents
-        else:
-            # Filter agents based on selection
-            enabled_agents = {
-                name: func for name, func in self.all_agents.items()
-                if name in selected_agents
-            }
-        
-        # Prepare state for agents
-        state = AgentState({
+            return self.all_agents
+        # Filter agents based on selection
+        return {
+            name: func for name, func in self.all_agents.items()
+            if name in selected_agents
+        }
+    
+    @staticmethod
+    def _build_state(
+        product_idea: str,
+        market_context: Optional[Dict],
+        technical_context: Optional[Dict],
+        user_background: Optional[Dict]
+    ) -> AgentState:
+        """Prepares the state shared by the agents evaluating a product idea."""
+        return AgentState({
             "data": {
                 "product_idea": product_idea,
                 "market_context": market_context or {},
@@ -102,18 +293,50 @@ class ProductOrchestrator:
                 "user_background": user_background or {}
             }
         })
+    
+    async def _complete_evaluation(
+        self,
+        product_idea: str,
+        state: AgentState,
+        enabled_agents: Dict[str, Callable],
+        persona_insights: Dict[str, Any]
+    ) -> ProductEvaluation:
+        """Runs the non-persona agents after the personas and combines every insight into an evaluation."""
+        agent_insights = dict(persona_insights)
         
-        # Collect insights from enabled agents
-        agent_insights = {}
-        for agent_name, agent_func in enabled_agents.items():
-            try:
-                agent_insights[agent_name] = agent_func(state)
-            except Exception as e:
-                print(f"Error running {agent_name} agent: {e}")
-                agent_insights[agent_name] = None
+        # The remaining enabled agents are still blocking, so run them together in worker threads
+        other_agents = {name: func for name, func in enabled_agents.items() if name not in agent_insights}
+        outcomes = await asyncio.gather(
+            *(asyncio.to_thread(agent_func, state) for agent_func in other_agents.values()),
+            return_exceptions=True
+        )
+        for agent_name, outcome in zip(other_agents, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning("Error running %s agent: %s", agent_name, outcome)
+                outcome = None
+            agent_insights[agent_name] = outcome
+        
+        # Keep the configured agent order for display
+        agent_insights = {name: agent_insights[name] for name in enabled_agents}
+        
+        # With only the Project Advisor there are no scores to combine; its next steps are the recommendations
+        advice = agent_insights.get("Project Advisor")
+        if len(agent_insights) == 1 and isinstance(advice, ProjectRecommendation):
+            return ProductEvaluation(
+                product_idea=product_idea,
+                overall_score=0.0,
+                market_potential=0.0,
+                technical_feasibility=0.0,
+                innovation_potential=0.0,
+                key_insights=[],
+                potential_risks=[],
+                agent_insights=agent_insights,
+                recommendations=list(advice.next_steps),
+                project_recommendation=advice
+            )
         
-        # Combine insights into a unified evaluation
-        evaluation = self._combine_insights(product_idea, agent_insights)
+        # Combine insights into a unified evaluation; this makes a blocking LLM call
+        evaluation = await asyncio.to_thread(self._combine_insights, product_idea, agent_insights)
         
         # Add project recommendation if available
         if "Project Advisor" in agent_insights and agent_insights["Project Advisor"]:
@@ -121,169 +344,113 @@ class ProductOrchestrator:
         
         return evaluation
     
-    def _combine_insights(self, product_idea: str, agent_insights: Dict[str, Any]) -> ProductEvaluation:
-        """Combines insights from all agents into a unified evaluation."""
+    async def evaluate_many_async(
+        self,
+        product_ideas: List[str],
+        selected_agents: Optional[List[str]] = None,
+        market_context: Optional[Dict] = None,
+        technical_context: Optional[Dict] = None,
+        user_background: Optional[Dict] = None,
+        max_concurrent: int = 8,
+        provider_batch: bool = False
+    ) -> List[Optional[ProductEvaluation]]:
+        """
+        Evaluates several product ideas concurrently with the same agents and context.
         
-        # Extract scores from agent insights
-        scores = {
-            "opportunity_score": 0.0,
-            "market_potential": 0.0,
-            "technical_feasibility": 0.0,
-            "scientific_breakthrough_potential": 0.0,
-            "technical_advancement": 0.0,
-            "research_feasibility": 0.0,
-            "startup_potential": 0.0,
-            "ai_infrastructure": 0.0,
-            "platform_potential": 0.0,
-            "social_impact": 0.0,
-            "autonomous_systems_score": 0.0,
-            "educational_impact": 0.0,
-            "innovation_potential": 0.0
-        }
+        Args:
+            product_ideas: The product ideas to evaluate
+            selected_agents: List of agent names to use for evaluation. If None, uses all agents.
+            market_context: Optional market context information
+            technical_context: Optional technical context information
+            user_background: Optional information about the user's background and experience
+            max_concurrent: Maximum number of ideas evaluated at the same time
+            provider_batch: Submit the batched persona calls as an OpenAI Batch API job, which
+                is cheaper but can take hours; meant for offline runs such as evaluate_batch.py
+            
+        Returns:
+            List[Optional[ProductEvaluation]]: Evaluations in input order (None if an idea failed)
+        """
+        enabled_agents = self._enabled_agents(selected_agents)
+        states = [
+            self._build_state(idea, market_context, technical_context, user_background)
+            for idea in product_ideas
+        ]
         
-        # Count valid scores for averaging
-        score_counts = {k: 0 for k in scores.keys()}
+        # Persona LLM calls for every idea are batched together
+        persona_names = [name for name in enabled_agents if name in PERSONA_AGENTS]
+        if persona_names:
+            try:
+                persona_insights = await run_personas_many(states, persona_names, provider_batch)
+            except Exception as e:
+                logger.error("Error running persona agents: %s", e, exc_info=True)
+                persona_insights = [{name: None for name in persona_names} for _ in states]
+        else:
+            persona_insights = [{} for _ in states]
         
-        # Process Sam Altman's insights
-        if isinstance(agent_insights.get("Sam Altman"), SamAltmanSignal):
-            altman = agent_insights["Sam Altman"]
-            scores["opportunity_score"] += altman.opportunity_score
-            scores["market_potential"] += altman.market_potential
-            scores["technical_feasibility"] += altman.technical_feasibility
-            score_counts["opportunity_score"] += 1
-            score_counts["market_potential"] += 1
-            score_counts["technical_feasibility"] += 1
+        semaphore = asyncio.Semaphore(max_concurrent)
         
-        # Process Demis Hassabis's insights
-        if isinstance(agent_insights.get("Demis Hassabis"), DemisHassabisSignal):
-            hassabis = agent_insights["Demis Hassabis"]
-            scores["scientific_breakthrough_potential"] += hassabis.scientific_breakthrough_potential
-            scores["technical_advancement"] += hassabis.technical_advancement
-            scores["research_feasibility"] += hassabis.research_feasibility
-            score_counts["scientific_breakthrough_potential"] += 1
-            score_counts["technical_advancement"] += 1
-            score_counts["research_feasibility"] += 1
+        async def evaluate_one(product_idea: str, state: AgentState, insights: Dict[str, Any]) -> Optional[ProductEvaluation]:
+            async with semaphore:
+                try:
+                    return await self._complete_evaluation(product_idea, state, enabled_agents, insights)
+                except Exception as e:
+                    logger.error("Error evaluating product idea '%s': %s", product_idea, e, exc_info=True)
+                    return None
         
-        # Process Elon Musk's insights
-        if isinstance(agent_insights.get("Elon Musk"), ElonMuskSignal):
-            musk = agent_insights["Elon Musk"]
-            scores["opportunity_score"] += musk.opportunity_score
-            scores["market_potential"] += musk.market_potential
-            scores["technical_feasibility"] += musk.technical_feasibility
-            score_counts["opportunity_score"] += 1
-            score_counts["market_potential"] += 1
-            score_counts["technical_feasibility"] += 1
+        return await asyncio.gather(*(
+            evaluate_one(idea, state, insights)
+            for idea, state, insights in zip(product_ideas, states, persona_insights)
+        ))
+    
+    def evaluate_many(self, product_ideas: List[str], **kwargs) -> List[Optional[ProductEvaluation]]:
+        """Synchronous wrapper around evaluate_many_async for callers outside an event loop."""
+        return asyncio.run(self.evaluate_many_async(product_ideas, **kwargs))
+    
+    def _combine_insights(self, product_idea: str, agent_insights: Dict[str, Any]) -> ProductEvaluation:
+        """Combines insights from all agents into a unified evaluation."""
         
-        # Process Adam D'Angelo's insights
-        if isinstance(agent_insights.get("Adam D'Angelo"), AdamDAngeloSignal):
-            dangelo = agent_insights["Adam D'Angelo"]
-            scores["platform_potential"] += dangelo.platform_potential
-            scores["ai_infrastructure"] += dangelo.ai_infrastructure
-            scores["social_impact"] += dangelo.social_impact
-            score_counts["platform_potential"] += 1
-            score_counts["ai_infrastructure"] += 1
-            score_counts["social_impact"] += 1
+        # Score sums and counts per column of _SCORE_KEYS
+        score_sums = np.zeros(len(_SCORE_KEYS))
+        score_counts = np.zeros(len(_SCORE_KEYS), dtype=np.int32)
         
-        # Process Daniel Gross's insights
-        if isinstance(agent_insights.get("Daniel Gross"), DanielGrossSignal):
-            gross = agent_insights["Daniel Gross"]
-            scores["startup_potential"] += gross.startup_potential
-            scores["ai_infrastructure"] += gross.ai_infrastructure
-            scores["market_potential"] += gross.market_fit
-            score_counts["startup_potential"] += 1
-            score_counts["ai_infrastructure"] += 1
-            score_counts["market_potential"] += 1
-            
-        # Process Sebastian Thrun's insights
-        if isinstance(agent_insights.get("Sebastian Thrun"), SebastianThrunSignal):
-            thrun = agent_insights["Sebastian Thrun"]
-            scores["autonomous_systems_score"] += thrun.autonomous_systems_score
-            scores["educational_impact"] += thrun.educational_impact
-            scores["innovation_potential"] += thrun.innovation_potential
-            score_counts["autonomous_systems_score"] += 1
-            score_counts["educational_impact"] += 1
-            score_counts["innovation_potential"] += 1
-            
-        # Process Emad Mostaque's insights
-        if isinstance(agent_insights.get("Emad Mostaque"), EmadMostaqueSignal):
-            mostaque = agent_insights["Emad Mostaque"]
-            scores["ai_infrastructure"] += mostaque.infrastructure_score
-            scores["social_impact"] += mostaque.community_impact
-            scores["technical_feasibility"] += mostaque.open_source_potential
-            score_counts["ai_infrastructure"] += 1
-            score_counts["social_impact"] += 1
-            score_counts["technical_feasibility"] += 1
-            
-        # Process Clement Delangue's insights
-        if isinstance(agent_insights.get("Clement Delangue"), ClementDelangueSignal):
-            delangue = agent_insights["Clement Delangue"]
-            scores["ai_infrastructure"] += delangue.ai_innovation_score
-            scores["technical_feasibility"] += delangue.technical_feasibility
-            scores["market_potential"] += delangue.practical_application
-            score_counts["ai_infrastructure"] += 1
-            score_counts["technical_feasibility"] += 1
-            score_counts["market_potential"] += 1
+        recommendations = []
         
-        # Calculate averages
-        for key in scores:
-            if score_counts[key] > 0:
-                scores[key] /= score_counts[key]
+        # Keep only the insights of the expected type, so each one is type checked once
+        valid = {
+            agent_name: signal for agent_name, signal in agent_insights.items()
+            if isinstance(signal, _EXPECTED_TYPES.get(agent_name, ()))
+        }
         
-        # Calculate overall score (weighted average of key metrics)
-        key_metrics = [
-            "opportunity_score",
-            "market_potential",
-            "technical_feasibility",
-            "scientific_breakthrough_potential",
-            "ai_infrastructure",
-            "innovation_potential"
-        ]
-        overall_score = sum(scores[metric] for metric in key_metrics) / len(key_metrics)
+        # The valid signals with their table entries, in table order
+        reporting = [(valid[entry[0]], *entry) for entry in _signal_entries(frozenset(valid))]
         
-        # Extract key insights and risks
-        key_insights = []
-        potential_risks = []
-        recommendations = []
+        # Accumulate each agent's scores
+        for signal, agent_name, _, score_attrs, _, _ in reporting:
+            # An agent never feeds the same column twice, so fancy-index addition is safe
+            columns = _SCORE_COLUMNS[agent_name]
+            score_sums[columns] += [getattr(signal, attr) for attr, _ in score_attrs]
+            score_counts[columns] += 1
         
-        # Collect insights from each agent
-        if isinstance(agent_insights.get("Sam Altman"), SamAltmanSignal):
-            key_insights.extend(agent_insights["Sam Altman"].key_insights)
-            potential_risks.extend(agent_insights["Sam Altman"].potential_risks)
+        # Extract key insights and risks, each list built in one pass
+        key_insights = list(chain.from_iterable(
+            getattr(signal, insights_attr) for signal, _, _, _, insights_attr, _ in reporting
+        ))
+        potential_risks = list(chain.from_iterable(
+            getattr(signal, risks_attr) for signal, _, _, _, _, risks_attr in reporting
+        ))
         
-        if isinstance(agent_insights.get("Demis Hassabis"), DemisHassabisSignal):
-            key_insights.extend(agent_insights["Demis Hassabis"].key_breakthroughs)
-            potential_risks.extend(agent_insights["Demis Hassabis"].research_challenges)
-            
-        if isinstance(agent_insights.get("Elon Musk"), ElonMuskSignal):
-            key_insights.extend(agent_insights["Elon Musk"].key_insights)
-            potential_risks.extend(agent_insights["Elon Musk"].potential_risks)
-            
-        if isinstance(agent_insights.get("Adam D'Angelo"), AdamDAngeloSignal):
-            key_insights.extend(agent_insights["Adam D'Angelo"].key_features)
-            potential_risks.extend(agent_insights["Adam D'Angelo"].platform_challenges)
-            
-        if isinstance(agent_insights.get("Daniel Gross"), DanielGrossSignal):
-            key_insights.extend(agent_insights["Daniel Gross"].key_advantages)
-            potential_risks.extend(agent_insights["Daniel Gross"].startup_challenges)
-            
-        if isinstance(agent_insights.get("Sebastian Thrun"), SebastianThrunSignal):
-            key_insights.extend(agent_insights["Sebastian Thrun"].key_innovations)
-            potential_risks.extend(agent_insights["Sebastian Thrun"].technical_challenges)
-            
-        if isinstance(agent_insights.get("Emad Mostaque"), EmadMostaqueSignal):
-            key_insights.extend(agent_insights["Emad Mostaque"].key_infrastructure)
-            potential_risks.extend(agent_insights["Emad Mostaque"].community_challenges)
-            
-        if isinstance(agent_insights.get("Clement Delangue"), ClementDelangueSignal):
-            key_insights.extend(agent_insights["Clement Delangue"].key_ai_features)
-            potential_risks.extend(agent_insights["Clement Delangue"].implementation_challenges)
+        # Average each score over the agents that reported it, leaving unreported ones at 0
+        averages = np.divide(score_sums, score_counts, out=np.zeros_like(score_sums), where=score_counts > 0)
+        scores = dict(zip(_SCORE_KEYS, averages.tolist()))
+        
+        # Calculate overall score (average of key metrics)
+        overall_score = float(averages[_KEY_METRIC_COLUMNS].mean())
         
         # Process Project Advisor's recommendations
-        project_recommendation = None
-        if isinstance(agent_insights.get("Project Advisor"), ProjectRecommendation):
-            project_recommendation = agent_insights["Project Advisor"]
-            # Add Project Advisor's recommendations to the main recommendations list
-            recommendations.extend(project_recommendation.recommendations)
+        project_recommendation = valid.get("Project Advisor")
+        if project_recommendation is not None:
+            # Add Project Advisor's next steps to the main recommendations list
+            recommendations.extend(project_recommendation.next_steps)
         
         # If no recommendations from Project Advisor, generate them using LLM
         if not recommendations:
@@ -310,43 +477,29 @@ class ProductOrchestrator:
     def _generate_recommendations(self, product_idea: str, scores: Dict[str, float], 
                                  key_insights: List[str], potential_risks: List[str]) -> List[str]:
         """Generates recommendations based on the combined insights."""
-        prompt = ChatPromptTemplate.from_messages([
-            HumanMessage(content="""Based on the following product idea and analysis, provide 5 specific recommendations for moving forward.
-Your response must be a valid JSON object of strings.
-
-Product Idea: {product_idea}
-
-Scores:
-- Overall Score: {overall_score:.2f}
-- Market Potential: {market_potential:.2f}
-- Technical Feasibility: {technical_feasibility:.2f}
-- Innovation Potential: {scientific_breakthrough_potential:.2f}
-
-Key Insights:
-{key_insights}
-
-Potential Risks:
-{potential_risks}
-
-Return a JSON object with a key "recommendations" and an array of 5 strings containing specific, actionable recommendations.
-""".format(product_idea=product_idea, overall_score=scores.get('opportunity_score', 0),
-           market_potential=scores.get('market_potential', 0), technical_feasibility=scores.get('technical_feasibility', 0),
-           scientific_breakthrough_potential=scores.get('scientific_breakthrough_potential', 0),
-           key_insights=key_insights, potential_risks=potential_risks))
-        ])
+        prompt = _RECOMMENDATIONS_TEMPLATE.format_messages(
+            product_idea=product_idea,
+            overall_score=scores.get('opportunity_score', 0),
+            market_potential=scores.get('market_potential', 0),
+            technical_feasibility=scores.get('technical_feasibility', 0),
+            scientific_breakthrough_potential=scores.get('scientific_breakthrough_potential', 0),
+            key_insights="\n".join(f"- {insight}" for insight in key_insights),
+            potential_risks="\n".join(f"- {risk}" for risk in potential_risks)
+        )
         
+        response = None
         try:
-            response = call_llm(prompt)
-            response = response.split("```")[1]
-            # Try to parse the response as JSON
-            recommendations = json.dumps(response)
-            if isinstance(recommendations, dict) and "recommendations" in recommendations:
-                return recommendations["recommendations"][:5]  # Ensure we only return up to 5 recommendations
-        except (json.JSONDecodeError, TypeError, ValueError) as e:
-            print(f"Error parsing LLM response as JSON: {e}")
-            print(f"Raw response: {response}")
+            # With an output format the response comes back parsed, unless the model wrapped it in prose
+            response = call_llm(prompt, output_format=_RECOMMENDATIONS_FORMAT)
+            if isinstance(response, str):
+                response = extract_json_from_response(response)
+            if isinstance(response, dict) and isinstance(response.get("recommendations"), list):
+                return response["recommendations"][:5]  # Ensure we only return up to 5 recommendations
+            logger.warning("Unexpected recommendations response: %s", response)
+        except Exception as e:
+            logger.warning("Error generating recommendations: %s", e)
         
-        # Fallback recommendations if JSON parsing fails
+        # Fallback recommendations if the LLM call or parsing fails
         return [
             "Conduct more detailed market research",
             "Develop a minimum viable product (MVP)",
@@ -0,0 +1,72 @@
+"""Shared final step for agents that evaluate in a single structured LLM call"""
+
+import logging
+from typing import Any, TypeVar, Type
+from pydantic import BaseModel, ValidationError
+from utils.llm import acall_llm_streamed
+from utils.json_extract import extract_first_json_object, parse_llm_json
+
+logger = logging.getLogger('ai-product-evaluator')
+
+T = TypeVar('T', bound=BaseModel)
+
+
+async def finalize_signal(prompt: Any, output_format: str, signal_cls: Type[T], error_signal: T, persona: str) -> T:
+    """
+    Call the LLM with an agent's evaluation prompt and validate the response into its signal.
+
+    Args:
+        prompt: The evaluation prompt
+        output_format: Output format specification for the JSON response
+        signal_cls: The signal model to validate into
+        error_signal: Signal returned when the call or validation fails
+        persona: Name of the persona, used in log messages
+
+    Returns:
+        The validated signal, or error_signal on failure
+    """
+    try:
+        logger.info("Calling LLM for %s evaluation", persona)
+        response = await acall_llm_streamed(prompt, output_format=output_format)
+    except Exception as e:
+        logger.error("Error generating %s output: %s", persona, e, exc_info=True)
+        return error_signal
+
+    return parse_signal(response, signal_cls, error_signal, persona)
+
+
+def parse_signal(response: Any, signal_cls: Type[T], error_signal: T, persona: str) -> T:
+    """
+    Validate a raw LLM response into a signal; missing fields take the model defaults.
+
+    Args:
+        response: The LLM response, either text or an already parsed JSON object
+        signal_cls: The signal model to validate into
+        error_signal: Signal returned when validation fails
+        persona: Name of the persona, used in log messages
+
+    Returns:
+        The validated signal, or error_signal on failure or when the response sets none of its fields
+    """
+    logger.debug("Raw response from LLM: %s", response)
+    try:
+        if isinstance(response, str):
+            try:
+                signal = signal_cls.model_validate_json(extract_first_json_object(response) or "{}")
+            except ValidationError:
+                # Fall back to the lenient parser, e.g. for raw newlines inside strings
+                signal = signal_cls.model_validate(parse_llm_json(response, {}))
+        else:
+            signal = signal_cls.model_validate(response)
+
+        # With field defaults any object validates, so a reply that sets none of the fields is a failure
+        if not signal.model_fields_set:
+            logger.warning("No %s fields found in response", persona)
+            return error_signal
+
+        logger.debug("Parsed response: %s", signal)
+        return signal
+
+    except Exception as e:
+        logger.error("Error parsing %s output: %s", persona, e, exc_info=True)
+        return error_signal
@@ -0,0 +1,294 @@
+"""Helpers for serializing prompt data and extracting JSON from LLM responses"""
+
+import asyncio
+import functools
+import json
+import logging
+import re
+from itertools import chain
+from typing import Any, Dict, Iterator, Optional, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger('ai-product-evaluator')
+
+T = TypeVar('T', bound=BaseModel)
+
+# Non-strict decoding accepts raw newlines and tabs inside strings, which LLMs often emit
+_decoder = json.JSONDecoder(strict=False)
+
+# Shared compact encoder, so prompt serialization skips building an encoder per call.
+# Keys are sorted so equal contexts always render the same prompt and share cached responses.
+_compact_encoder = json.JSONEncoder(separators=(",", ":"), sort_keys=True)
+
+# Characters that change brace depth or string state; escapes are matched as a unit
+_structural_chars = re.compile(r'\\.|[{}"]', re.S)
+
+# Fenced ```json blocks, which models often wrap their JSON in
+_fenced_json_pattern = re.compile(r"```json\s*(.*?)```", re.S)
+
+# Fenced blocks, tagged json or untagged, holding an object or array
+_fenced_block_pattern = re.compile(r"```(?:json)?\s*([\[{].*?[\]}])\s*```", re.S)
+
+# Responses longer than this are parsed in a worker thread so the event loop stays responsive
+_THREADED_PARSE_THRESHOLD = 100_000
+
+
+def compact_json(value: Any) -> str:
+    """Serialize a value as canonical JSON, with sorted keys and no whitespace, for inlining into prompts."""
+    return _compact_encoder.encode(value)
+
+
+@functools.lru_cache(maxsize=None)
+def schema_json(model_cls: Any) -> str:
+    """
+    Serialize a pydantic model's JSON schema for prompts, without the titles pydantic adds to every field.
+    
+    Schema generation walks every field, so the result is built once per model class.
+    """
+    schema = model_cls.model_json_schema()
+    schema.pop("title", None)
+    for field_schema in schema.get("properties", {}).values():
+        field_schema.pop("title", None)
+    return compact_json(schema)
+
+
+def parse_llm_json(response: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Parse the first JSON object embedded in an LLM response.
+    
+    Decoding starts at the first "{" and stops at the end of that object, so
+    trailing prose after the JSON is ignored without a separate rfind scan.
+    If that block is not valid JSON, decoding resumes at the next block.
+    
+    Args:
+        response: The raw LLM response text
+        defaults: Values to return when no valid JSON object is found
+        
+    Returns:
+        The parsed JSON object, or a copy of the defaults
+    """
+    json_start = response.find("{")
+    if json_start < 0:
+        logger.warning("No JSON found in response, creating default")
+        return dict(defaults)
+    
+    while True:
+        try:
+            parsed, _ = _decoder.raw_decode(response, json_start)
+            return parsed
+        except ValueError as e:
+            error = e
+        # Skip past a malformed block, e.g. "{placeholder}" in prose, and retry from the next one
+        block = extract_first_json_object(response, json_start)
+        if block is None:
+            break
+        json_start = response.find("{", json_start + len(block))
+        if json_start < 0:
+            break
+    
+    logger.error("Error parsing JSON from response: %s", error)
+    return dict(defaults)
+
+
+async def aparse_llm_json(response: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of parse_llm_json that moves very large responses off the event loop.
+    
+    Args:
+        response: The raw LLM response text
+        defaults: Values to return when no valid JSON object is found
+        
+    Returns:
+        The parsed JSON object, or a copy of the defaults
+    """
+    if len(response) > _THREADED_PARSE_THRESHOLD:
+        return await asyncio.to_thread(parse_llm_json, response, defaults)
+    return parse_llm_json(response, defaults)
+
+
+def parse_llm_model(response: str, model_cls: Type[T]) -> Optional[T]:
+    """
+    Parse an LLM response into a pydantic model, searching prose for the JSON if needed.
+    
+    The whole response is tried first. Failing that, fenced ```json blocks and then
+    balanced {...} blocks are validated in order, so stray braces or an unrelated
+    object earlier in the text do not hide the one matching the model.
+    
+    Args:
+        response: The raw LLM response text
+        model_cls: The pydantic model the JSON must validate against
+        
+    Returns:
+        The first candidate that validates, or None if none does
+    """
+    candidates = chain(
+        (response.strip(),),
+        _fenced_json_pattern.findall(response),
+        _json_blocks(response)
+    )
+    for candidate in candidates:
+        try:
+            model = model_cls.model_validate_json(candidate)
+        except ValidationError:
+            continue
+        # With field defaults any object validates, so skip ones that set none of the fields
+        if model.model_fields_set:
+            return model
+    logger.warning("No JSON in response matches %s", model_cls.__name__)
+    return None
+
+
+def extract_json_from_response(content: str) -> Optional[Any]:
+    """
+    Extract the JSON value from an LLM response, fenced in markdown or embedded in prose.
+    
+    Fenced blocks are tried first, in order, then the first object that decodes,
+    then the first array. Each candidate is decoded in place, so the text is never
+    rescanned from the end for a closing bracket.
+    
+    Args:
+        content: The raw LLM response text
+        
+    Returns:
+        The parsed JSON object or array, or None if the response holds none
+    """
+    for block in _fenced_block_pattern.findall(content):
+        try:
+            return _decoder.decode(block)
+        except ValueError:
+            continue
+    for opening in "{[":
+        begin = content.find(opening)
+        while begin >= 0:
+            try:
+                return _decoder.raw_decode(content, begin)[0]
+            except ValueError:
+                begin = content.find(opening, begin + 1)
+    return None
+
+
+def _json_blocks(text: str) -> Iterator[str]:
+    """Yield every balanced {...} block in text, including ones nested in an earlier block."""
+    begin = text.find("{")
+    while begin >= 0:
+        block = extract_first_json_object(text, begin)
+        if block is not None:
+            yield block
+        begin = text.find("{", begin + 1)
+
+
+def extract_first_json_object(text: str, start: int = 0) -> Optional[str]:
+    """
+    Return the first balanced {...} block in text at or after start.
+    
+    The text is scanned once, hopping between braces and quotes. Braces inside
+    strings are ignored, so nested objects and braces in reasoning text do not
+    end the block early.
+    
+    Args:
+        text: The text to scan
+        start: Offset to start scanning from
+        
+    Returns:
+        The balanced block, or None if no complete block is found
+    """
+    begin = text.find("{", start)
+    if begin < 0:
+        return None
+    
+    depth = 0
+    in_string = False
+    for match in _structural_chars.finditer(text, begin):
+        token = match.group()
+        if token[0] == "\\":
+            continue
+        if token == '"':
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif token == "{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return text[begin:match.end()]
+    return None
+
+
+class JsonObjectStream:
+    """
+    Incrementally find the first balanced {...} block in streamed text.
+    
+    Uses the same string-aware scan as extract_first_json_object, resuming where
+    the previous chunk left off, so a response can be parsed as soon as its JSON
+    object closes instead of after the whole stream has arrived.
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._begin = -1
+        self._depth = 0
+        self._in_string = False
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Add a chunk of streamed text.
+        
+        Blocks that are not valid JSON, e.g. "{placeholder}" in prose, are skipped.
+        
+        Args:
+            chunk: The next piece of the response
+            
+        Returns:
+            The first balanced block that decodes as JSON once it is complete, otherwise None
+        """
+        self.text += chunk
+        while True:
+            if self._begin < 0:
+                self._begin = self.text.find("{", self._pos)
+                if self._begin < 0:
+                    self._pos = len(self.text)
+                    return None
+                self._pos = self._begin
+            
+            block = self._scan()
+            if block is None:
+                return None
+            try:
+                _decoder.decode(block)
+                return block
+            except ValueError:
+                self._begin = -1
+    
+    def _scan(self) -> Optional[str]:
+        """Advance through the buffered text and return the current block once it closes."""
+        last_end = self._pos
+        for match in _structural_chars.finditer(self.text, self._pos):
+            last_end = match.end()
+            token = match.group()
+            if token[0] == "\\":
+                continue
+            if token == '"':
+                self._in_string = not self._in_string
+            elif self._in_string:
+                continue
+            elif token == "{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._pos = last_end
+                    return self.text[self._begin:last_end]
+        
+        # A trailing backslash escapes the first character of the next chunk, so rescan it
+        if self.text.endswith("\\") and last_end < len(self.text):
+            self._pos = len(self.text) - 1
+        else:
+            self._pos = len(self.text)
+        return None
+
+
+def with_defaults(parsed: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in any fields missing from a parsed response with their default values."""
+    return {**defaults, **parsed}
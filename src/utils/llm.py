@@ -1,36 +1,106 @@
 """Helper functions for LLM"""
 
-import json
-from typing import TypeVar, Type, Optional, Any, Dict, List
+import asyncio
+import atexit
+import copy
+import functools
+import logging
+import os
+import re
+import threading
+from typing import TypeVar, Type, Optional, Any, Callable, Dict, Iterator, List
 from pydantic import BaseModel
 from utils.progress import progress
-import os
-from langchain_openai import ChatOpenAI
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from dotenv import load_dotenv
-from utils.ollama_utils import call_ollama, get_available_models
+import config
+from utils.json_extract import JsonObjectStream, extract_json_from_response, schema_json
+from utils.llm_cache import MISS, MemoryCache, ResponseCache, SemanticCache, SQLiteCache, TieredCache, render_prompt
+from utils.ollama_utils import call_ollama, get_available_models, stream_ollama
+from utils.openai_batch import run_chat_batch
+from utils.rate_limit import RateLimiter
 
 T = TypeVar('T', bound=BaseModel)
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger('ai-product-evaluator')
 
 # Get API key and model configuration
-api_key = os.getenv("OPENAI_API_KEY")
-model_name = os.getenv("OPENAI_MODEL", "gpt-4o")
-temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
-use_ollama = os.getenv("USE_OLLAMA", "false").lower() == "true"
-ollama_model = os.getenv("OLLAMA_MODEL", "llama3.1")
+api_key = config.OPENAI_API_KEY
+model_name = config.OPENAI_MODEL
+temperature = config.OPENAI_TEMPERATURE
+use_ollama = config.USE_OLLAMA
+ollama_model = config.OLLAMA_MODEL
+max_concurrency = config.LLM_MAX_CONCURRENCY
+
+# Caps in-flight provider requests across threads and event loops alike, since
+# agents run their sub-analyses concurrently and may do so from several threads.
+_llm_slots = threading.BoundedSemaphore(max_concurrency)
+
+# Spreads requests under the provider's per-minute limit so bursts of agents do not hit 429s
+_rate_limiter = RateLimiter(config.LLM_MAX_RPM)
+
+# Cached responses keyed by a hash of the model settings, rendered prompt and output format
+llm_cache_size = config.LLM_CACHE_SIZE
+llm_cache_ttl = config.LLM_CACHE_TTL
+llm_cache_deterministic_only = config.LLM_CACHE_DETERMINISTIC_ONLY
+_response_backend = MemoryCache(llm_cache_size, llm_cache_ttl)
+if config.LLM_CACHE_DIR:
+    # Persist responses so repeated runs during development skip the provider entirely
+    _response_backend = TieredCache(
+        _response_backend,
+        SQLiteCache(os.path.join(config.LLM_CACHE_DIR, "responses.sqlite3"), config.LLM_DISK_CACHE_TTL)
+    )
+_response_cache = ResponseCache(_response_backend, config.LLM_CACHE_NORMALIZE_WHITESPACE)
+
+# OpenAI chat roles of langchain message types, for requests built outside ChatOpenAI
+_OPENAI_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+# Callbacks that drop caches derived from LLM responses, run by clear_llm_cache
+_cache_clear_hooks: List[Callable[[], None]] = []
 
 # Initialize LLM if using OpenAI
 llm = None
 if not use_ollama and api_key:
+    # Imported only when needed, since the OpenAI client stack dominates import time
+    import httpx
+    from langchain_openai import ChatOpenAI
+    
+    # One pooled client shared by every agent. Idle connections are kept warm long enough
+    # to bridge the gap between an agent's sub-analyses and its final evaluation call.
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_concurrency * 2,
+            max_keepalive_connections=max_concurrency,
+            keepalive_expiry=30.0
+        )
+    )
     llm = ChatOpenAI(
         model=model_name,
         temperature=temperature,
-        api_key=api_key
+        api_key=api_key,
+        http_client=http_client
     )
+    atexit.register(http_client.close)
+    # JSON mode for prompts that ask for structured output, so replies are a bare JSON object
+    json_llm = llm.bind(response_format={"type": "json_object"})
+
+# Optional semantic tier behind the exact cache, so paraphrased prompts reuse a response
+_semantic_cache = None
+if llm is not None and config.LLM_SEMANTIC_CACHE_THRESHOLD > 0:
+    from langchain_openai import OpenAIEmbeddings
+    _embeddings = OpenAIEmbeddings(model=config.LLM_EMBEDDING_MODEL, api_key=api_key, http_client=http_client)
+    _semantic_cache = SemanticCache(_embeddings.embed_query, config.LLM_SEMANTIC_CACHE_THRESHOLD, llm_cache_size)
+
+# Ollama calls with a schema are attempted at most this many times
+_OLLAMA_ATTEMPTS = 2
+
+# Amounts, percentages and bounds such as "under $50" or "at least 3 users"
+_numeric_constraint_pattern = re.compile(
+    r"[$€£]\s*\d|\d\s*%|\b(?:under|over|below|above|within|up to|at least|at most|less than|more than|no more than)\s+\$?\d",
+    re.IGNORECASE
+)
 
 def call_llm(prompt: Any, output_format: Optional[str] = None) -> Any:
     """
@@ -43,27 +113,283 @@ def call_llm(prompt: Any, output_format: Optional[str] = None) -> Any:
     Returns:
         The LLM response, optionally parsed according to the output format
     """
+    cache_keys = _cache_keys(prompt, output_format)
+    use_cache = _cache_enabled()
+    if use_cache:
+        cached, embedding = _cache_lookup(cache_keys, prompt, output_format)
+        if cached is not MISS:
+            return cached
+    
+    with _llm_slots:
+        _rate_limiter.acquire()
+        response = _invoke_llm(prompt, output_format)
+    
+    if response is not None and use_cache:
+        _cache_store(cache_keys, output_format, embedding, response)
+    return response
+
+async def acall_llm(prompt: Any, output_format: Optional[str] = None) -> Any:
+    """
+    Async variant of call_llm that runs the blocking provider call in a worker thread.
+    
+    Args:
+        prompt: The prompt to send to the LLM
+        output_format: Optional output format specification for JSON parsing
+        
+    Returns:
+        The LLM response, optionally parsed according to the output format
+    """
+    return await asyncio.to_thread(call_llm, prompt, output_format)
+
+def call_llm_streamed(prompt: Any, output_format: Optional[str] = None) -> Any:
+    """
+    Stream the LLM response and return as soon as its first JSON object is complete.
+    
+    The stream is closed once the object closes, so trailing text is never waited for.
+    Responses share the cache with call_llm.
+    
+    Args:
+        prompt: The prompt to send to the LLM
+        output_format: Optional output format specification for JSON output
+        
+    Returns:
+        The JSON object text, the full response text if it holds no JSON object,
+        or a cached response
+    """
+    cache_keys = _cache_keys(prompt, output_format)
+    use_cache = _cache_enabled()
+    if use_cache:
+        cached, embedding = _cache_lookup(cache_keys, prompt, output_format)
+        if cached is not MISS:
+            return cached
+    
+    json_stream = JsonObjectStream()
+    response = None
+    with _llm_slots:
+        _rate_limiter.acquire()
+        chunks = _stream_llm(prompt, output_format)
+        try:
+            for chunk in chunks:
+                response = json_stream.feed(chunk)
+                if response is not None:
+                    break
+        finally:
+            chunks.close()
+    
+    if response is None:
+        response = json_stream.text or None
+    if response is not None and use_cache:
+        _cache_store(cache_keys, output_format, embedding, response)
+    return response
+
+async def acall_llm_streamed(prompt: Any, output_format: Optional[str] = None) -> Any:
+    """
+    Async variant of call_llm_streamed that consumes the stream in a worker thread.
+    
+    Args:
+        prompt: The prompt to send to the LLM
+        output_format: Optional output format specification for JSON output
+        
+    Returns:
+        The JSON object text, the full response text if it holds no JSON object,
+        or a cached response
+    """
+    return await asyncio.to_thread(call_llm_streamed, prompt, output_format)
+
+async def acall_llm_batch(
+    prompts: List[Any],
+    output_formats: Optional[List[Optional[str]]] = None,
+    streamed: bool = False,
+    provider_batch: bool = False
+) -> List[Any]:
+    """
+    Call the LLM with several prompts concurrently and collect the responses in order.
+    
+    Identical prompts within the batch are sent to the provider once. Every request
+    goes through call_llm or call_llm_streamed, so the batch shares the response cache and concurrency limit.
+    
+    Args:
+        prompts: The prompts to send to the LLM
+        output_formats: Optional output format specification for each prompt
+        streamed: Whether to go through call_llm_streamed and return JSON text early
+        provider_batch: Whether to submit uncached OpenAI requests as one Batch API job, which
+            is cheaper but can take up to 24 hours. Ignored when using Ollama.
+        
+    Returns:
+        The responses in prompt order, with None for any request that failed
+    """
+    if output_formats is None:
+        output_formats = [None] * len(prompts)
+    
+    batch_keys = []
+    unique_requests = {}
+    for prompt, output_format in zip(prompts, output_formats):
+        key = _cache_keys(prompt, output_format)[0]
+        batch_keys.append(key)
+        unique_requests.setdefault(key, (prompt, output_format))
+    
+    if provider_batch and llm is not None:
+        responses = await asyncio.to_thread(_call_llm_provider_batch, list(unique_requests.values()))
+    else:
+        call = acall_llm_streamed if streamed else acall_llm
+        responses = await asyncio.gather(
+            *(call(prompt, output_format) for prompt, output_format in unique_requests.values()),
+            return_exceptions=True
+        )
+    
+    responses_by_key = {}
+    for key, response in zip(unique_requests, responses):
+        if isinstance(response, Exception):
+            logger.warning("Error in batched LLM call: %s", response)
+            response = None
+        responses_by_key[key] = response
+    # Copy so duplicate prompts do not share a mutable response
+    return [copy.deepcopy(responses_by_key[key]) for key in batch_keys]
+
+def _call_llm_provider_batch(requests: List[tuple]) -> List[Any]:
+    """Answer (prompt, output format) pairs from the cache, sending the rest as one OpenAI batch job."""
+    use_cache = _cache_enabled()
+    responses: List[Any] = [None] * len(requests)
+    bodies = {}
+    pending = {}
+    for index, (prompt, output_format) in enumerate(requests):
+        cache_keys = _cache_keys(prompt, output_format)
+        embedding = None
+        if use_cache:
+            cached, embedding = _cache_lookup(cache_keys, prompt, output_format)
+            if cached is not MISS:
+                responses[index] = cached
+                continue
+        body = {
+            "model": model_name,
+            "temperature": temperature,
+            "messages": [
+                {"role": _OPENAI_ROLES.get(message.type, "user"), "content": message.content}
+                for message in _openai_messages(prompt, output_format)
+            ]
+        }
+        if output_format:
+            body["response_format"] = {"type": "json_object"}
+        bodies[str(index)] = body
+        pending[str(index)] = (index, cache_keys, output_format, embedding)
+    
+    if not bodies:
+        return responses
+    for custom_id, content in run_chat_batch(llm.root_client, bodies).items():
+        index, cache_keys, output_format, embedding = pending[custom_id]
+        if content is None:
+            continue
+        response = _parse_json_content(content) if output_format else content
+        responses[index] = response
+        if use_cache:
+            _cache_store(cache_keys, output_format, embedding, response)
+    return responses
+
+def clear_llm_cache() -> None:
+    """Drop all cached LLM responses and any results derived from them."""
+    _response_cache.clear()
+    if _semantic_cache is not None:
+        _semantic_cache.clear()
+    for hook in _cache_clear_hooks:
+        hook()
+
+def llm_cache_stats() -> Dict[str, int]:
+    """Hit and miss counts of the response cache since it was last cleared."""
+    return {"hits": _response_cache.hits, "misses": _response_cache.misses}
+
+def register_cache_clear_hook(hook: Callable[[], None]) -> None:
+    """Register a callback that clears a cache built on top of LLM responses."""
+    _cache_clear_hooks.append(hook)
+
+def _cache_enabled() -> bool:
+    """Whether responses should be cached under the current settings."""
+    if llm_cache_size <= 0 and not config.LLM_CACHE_DIR:
+        return False
+    # Ollama samples with the model's default temperature, which is never zero
+    return not llm_cache_deterministic_only or (not use_ollama and temperature == 0)
+
+def _model_settings() -> str:
+    """Describe the provider, model and sampling settings that responses depend on."""
+    return f"ollama:{ollama_model}" if use_ollama else f"openai:{model_name}:{temperature}"
+
+def _cache_keys(prompt: Any, output_format: Optional[str] = None) -> tuple:
+    """Build the cache keys from the model settings, prompt and output format."""
+    return _response_cache.keys(_model_settings(), prompt, output_format)
+
+def _cache_lookup(cache_keys: tuple, prompt: Any, output_format: Optional[str] = None) -> tuple:
+    """
+    Look a request up in the exact cache, then in the semantic tier if it is enabled.
+    
+    Returns:
+        The cached response or MISS, and the prompt embedding to store a new
+        response under (None without the semantic tier)
+    """
+    cached = _response_cache.get(cache_keys)
+    if cached is not MISS or _semantic_cache is None or temperature > 0:
+        return cached, None
+    rendered = render_prompt(prompt)
+    if _numeric_constraint_pattern.search(rendered):
+        # Paraphrases with different limits look alike to embeddings but need different answers
+        return cached, None
+    cached, embedding = _semantic_cache.get((_model_settings(), output_format), rendered)
+    if cached is not MISS:
+        # Remember the match under the exact keys so a repeat skips the embedding call
+        _response_cache.put(cache_keys, cached)
+    return cached, embedding
+
+def _cache_store(cache_keys: tuple, output_format: Optional[str], embedding: Any, response: Any) -> None:
+    """Store a response in the exact cache and, given its prompt embedding, in the semantic tier."""
+    _response_cache.put(cache_keys, response)
+    if embedding is not None:
+        _semantic_cache.put((_model_settings(), output_format), embedding, response)
+
+def _as_messages(prompt: Any) -> List[BaseMessage]:
+    """Normalize a template, message list or plain string into a new list of chat messages."""
+    if isinstance(prompt, ChatPromptTemplate):
+        return prompt.format_messages()
+    if isinstance(prompt, list):
+        return list(prompt)
+    return [HumanMessage(content=str(prompt))]
+
+def _openai_messages(prompt: Any, output_format: Optional[str] = None) -> List[BaseMessage]:
+    """Build the chat messages for OpenAI, leading with the JSON format instruction if any."""
+    messages = _as_messages(prompt)
+    if output_format:
+        # Lead with the format instruction as a ready-made message. Passing it through a
+        # template would treat its braces as variables, and keeping static text ahead of
+        # the prompt lets the provider reuse its cached prompt prefix.
+        messages.insert(0, SystemMessage(content=f"Format your response as a valid JSON object with the following structure: {output_format}"))
+    return messages
+
+def _invoke_llm(prompt: Any, output_format: Optional[str] = None) -> Any:
+    """Dispatch a prompt to the configured provider."""
     if use_ollama:
         return call_ollama(prompt, model_name=ollama_model, output_format=output_format)
     elif llm:
+        messages = _openai_messages(prompt, output_format)
         if output_format:
-            # Create a parser for the specified output format
-            parser = JsonOutputParser()
-            
-            # Create a prompt template that includes the output format
-            prompt_template = ChatPromptTemplate.from_messages([
-                prompt.messages[0],
-                ("system", f"Format your response as a valid JSON object with the following structure: {output_format}")
-            ])
-            
-            # Create a chain with the prompt, LLM, and parser
-            chain = prompt_template | llm | parser
-            
-            # Run the chain
-            return chain.invoke({})
+            return _parse_json_content(json_llm.invoke(messages).content)
         else:
             # Just run the prompt with the LLM
-            return llm.invoke(prompt).content
+            return llm.invoke(messages).content
+    else:
+        raise ValueError("No LLM available. Please set OPENAI_API_KEY or USE_OLLAMA=true")
+
+def _parse_json_content(content: str) -> Any:
+    """Parse a JSON mode reply, leaving extraction of JSON wrapped in prose to the caller."""
+    try:
+        return JsonOutputParser().parse(content)
+    except OutputParserException:
+        return content
+
+def _stream_llm(prompt: Any, output_format: Optional[str] = None) -> Iterator[str]:
+    """Stream the response text from the configured provider."""
+    if use_ollama:
+        yield from stream_ollama(prompt, model_name=ollama_model, output_format=output_format)
+    elif llm:
+        streaming_llm = json_llm if output_format else llm
+        for chunk in streaming_llm.stream(_openai_messages(prompt, output_format)):
+            yield chunk.content
     else:
         raise ValueError("No LLM available. Please set OPENAI_API_KEY or USE_OLLAMA=true")
 
@@ -93,29 +419,34 @@ def call_llm_with_model(
     """
     # Use Ollama if specified
     if use_ollama or model_provider.lower() == "ollama":
-        for attempt in range(max_retries):
+        # The schema constrains decoding, so replies are valid JSON and one retry is enough
+        attempts = min(max_retries, _OLLAMA_ATTEMPTS)
+        schema = schema_json(pydantic_model)
+        for attempt in range(attempts):
             try:
                 if agent_name:
-                    progress.update_status(agent_name, None, f"Calling Ollama - attempt {attempt + 1}/{max_retries}")
+                    progress.update_status(agent_name, None, f"Calling Ollama - attempt {attempt + 1}/{attempts}")
                 
-                # Get the model schema
-                schema = pydantic_model.model_json_schema()
-                
-                # Call Ollama with the schema
-                result = call_ollama(prompt, model_name=ollama_model, output_format=str(schema))
+                # Call Ollama with the schema, reporting progress as the response streams in
+                result = call_ollama(
+                    prompt,
+                    model_name=ollama_model,
+                    output_format=schema,
+                    stream_callback=_progress_callback(agent_name) if agent_name else None
+                )
                 
                 if result and isinstance(result, dict):
                     return pydantic_model(**result)
                 
-                if attempt == max_retries - 1 and default_factory:
+                if attempt == attempts - 1 and default_factory:
                     return default_factory()
                 
             except Exception as e:
                 if agent_name:
-                    progress.update_status(agent_name, None, f"Error - retry {attempt + 1}/{max_retries}")
+                    progress.update_status(agent_name, None, f"Error - retry {attempt + 1}/{attempts}")
                 
-                if attempt == max_retries - 1:
-                    print(f"Error in Ollama call after {max_retries} attempts: {e}")
+                if attempt == attempts - 1:
+                    logger.warning("Error in Ollama call after %d attempts: %s", attempts, e)
                     if default_factory:
                         return default_factory()
                     return create_default_response(pydantic_model)
@@ -124,17 +455,15 @@ def call_llm_with_model(
         return create_default_response(pydantic_model)
     
     # Use OpenAI or other providers
-    from llm.models import get_model, get_model_info
+    from llm.models import get_model_info
     
     model_info = get_model_info(model_name)
-    llm = get_model(model_name, model_provider)
     
     # For non-JSON support models, we can use structured output
     if not (model_info and not model_info.has_json_mode()):
-        llm = llm.with_structured_output(
-            pydantic_model,
-            method="json_mode",
-        )
+        llm = _structured_model(model_name, model_provider, pydantic_model)
+    else:
+        llm = _provider_model(model_name, model_provider)
     
     # Call the LLM with retries
     for attempt in range(max_retries):
@@ -155,7 +484,7 @@ def call_llm_with_model(
                 progress.update_status(agent_name, None, f"Error - retry {attempt + 1}/{max_retries}")
             
             if attempt == max_retries - 1:
-                print(f"Error in LLM call after {max_retries} attempts: {e}")
+                logger.warning("Error in LLM call after %d attempts: %s", max_retries, e)
                 # Use default_factory if provided, otherwise create a basic default
                 if default_factory:
                     return default_factory()
@@ -164,17 +493,55 @@ def call_llm_with_model(
     # This should never be reached due to the retry logic above
     return create_default_response(pydantic_model)
 
+@functools.lru_cache(maxsize=32)
+def _provider_model(model_name: str, model_provider: str) -> Any:
+    """Build the chat model of a provider once, so every agent shares its client and connection pool."""
+    from llm.models import get_model
+    return get_model(model_name, model_provider)
+
+@functools.lru_cache(maxsize=32)
+def _structured_model(model_name: str, model_provider: str, pydantic_model: Type[BaseModel]) -> Any:
+    """Wrap a shared chat model to return instances of pydantic_model, once per model class."""
+    return _provider_model(model_name, model_provider).with_structured_output(
+        pydantic_model,
+        method="json_mode",
+    )
+
+def _progress_callback(agent_name: str, step: int = 500) -> Callable[[str], None]:
+    """Build a stream callback that reports the received length every step characters."""
+    received = 0
+    
+    def report(part: str) -> None:
+        nonlocal received
+        reported_steps = received // step
+        received += len(part)
+        if received // step > reported_steps:
+            progress.update_status(agent_name, None, f"Receiving response ({received} chars)")
+    
+    return report
+
 def create_default_response(model_class: Type[T]) -> T:
     """Creates a safe default response based on the model's fields."""
+    # Copied, so list and dict defaults are never shared between responses
+    return model_class(**copy.deepcopy(_default_values(model_class)))
+
+@functools.lru_cache(maxsize=None)
+def _default_values(model_class: Type[BaseModel]) -> Dict[str, Any]:
+    """Build the default field values of a model class once, from its field annotations."""
     default_values = {}
     for field_name, field in model_class.model_fields.items():
+        origin = getattr(field.annotation, "__origin__", None)
         if field.annotation == str:
             default_values[field_name] = "Error in analysis, using default"
+        elif field.annotation == bool:
+            default_values[field_name] = False
         elif field.annotation == float:
             default_values[field_name] = 0.0
         elif field.annotation == int:
             default_values[field_name] = 0
-        elif hasattr(field.annotation, "__origin__") and field.annotation.__origin__ == dict:
+        elif field.annotation == list or origin == list:
+            default_values[field_name] = []
+        elif field.annotation == dict or origin == dict:
             default_values[field_name] = {}
         else:
             # For other types (like Literal), try to use the first allowed value
@@ -183,18 +550,4 @@ def create_default_response(model_class: Type[T]) -> T:
             else:
                 default_values[field_name] = None
     
-    return model_class(**default_values)
-
-def extract_json_from_response(content: str) -> Optional[dict]:
-    """Extracts JSON from markdown-formatted response."""
-    try:
-        json_start = content.find("```json")
-        if json_start != -1:
-            json_text = content[json_start + 7:]  # Skip past ```json
-            json_end = json_text.find("```")
-            if json_end != -1:
-                json_text = json_text[:json_end].strip()
-                return json.loads(json_text)
-    except Exception as e:
-        print(f"Error extracting JSON from response: {e}")
-    return None
+    return default_values
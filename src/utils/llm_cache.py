@@ -0,0 +1,339 @@
+"""Response cache for LLM calls"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+import numpy as np
+from langchain_core.prompts import ChatPromptTemplate
+
+logger = logging.getLogger('ai-product-evaluator')
+
+# Returned by backends when a key is absent or expired
+MISS = object()
+
+# Runs of whitespace, collapsed by the opt-in whitespace-insensitive cache key
+_whitespace_pattern = re.compile(r"\s+")
+
+
+class CacheBackend(Protocol):
+    """Storage for cached LLM responses."""
+
+    def get(self, key: str) -> Any:
+        """Return the value stored under key, or MISS."""
+        ...
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value under key."""
+        ...
+
+    def clear(self) -> None:
+        """Drop every stored value."""
+        ...
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU of (stored_at, value) pairs with optional expiry."""
+
+    def __init__(self, max_size: int, ttl: float = 0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept (0 disables the cache)
+            ttl: Seconds before an entry expires (0 keeps entries until evicted)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Return a copy of the value stored under key, or MISS."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            stored_at, value = entry
+            if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return MISS
+            self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a copy of value and evict the least recently used entries."""
+        if self.max_size <= 0:
+            return
+        entry = (time.monotonic(), copy.deepcopy(value))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Thread-safe on-disk cache of JSON-serializable values with optional expiry.
+
+    Entries survive restarts, so repeated development runs reuse earlier responses.
+    """
+
+    def __init__(self, path: str, ttl: float = 0):
+        """
+        Initialize the cache, creating the database file if needed.
+
+        Args:
+            path: Path of the SQLite database file
+            ttl: Seconds before an entry expires (0 keeps entries until cleared)
+        """
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+
+    def get(self, key: str) -> Any:
+        """Return the value stored under key, or MISS."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT stored_at, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return MISS
+            stored_at, value = row
+            # Wall-clock time, since entries outlive the process
+            if self.ttl > 0 and time.time() - stored_at > self.ttl:
+                with self._connection:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return MISS
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value, skipping values that cannot be serialized to JSON."""
+        try:
+            serialized = json.dumps(value)
+        except (TypeError, ValueError):
+            logger.debug("Not storing a value that cannot be serialized in the disk cache")
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, stored_at, value) VALUES (?, ?, ?)",
+                (key, time.time(), serialized)
+            )
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+
+class TieredCache:
+    """Cache that reads through a fast tier to a slower one, copying hits into the fast tier."""
+
+    def __init__(self, fast: CacheBackend, slow: CacheBackend):
+        """
+        Initialize the cache.
+
+        Args:
+            fast: Tier checked first, e.g. a MemoryCache
+            slow: Tier checked on a fast-tier miss, e.g. a SQLiteCache
+        """
+        self.fast = fast
+        self.slow = slow
+
+    def get(self, key: str) -> Any:
+        """Return the value stored under key in either tier, or MISS."""
+        value = self.fast.get(key)
+        if value is MISS:
+            value = self.slow.get(key)
+            if value is not MISS:
+                self.fast.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value in both tiers."""
+        self.fast.set(key, value)
+        self.slow.set(key, value)
+
+    def clear(self) -> None:
+        """Drop every entry in both tiers."""
+        self.fast.clear()
+        self.slow.clear()
+
+
+class ResponseCache:
+    """
+    Cache of LLM responses keyed by a hash of the model settings, prompt and output format.
+
+    Responses are keyed on the exact rendered prompt. With normalize_whitespace set they are
+    also stored under a key with runs of whitespace collapsed, so prompts that only differ
+    in spacing or line breaks share an entry.
+    """
+
+    def __init__(self, backend: CacheBackend, normalize_whitespace: bool = False):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: Storage for the cached responses
+            normalize_whitespace: Whether to also key responses on the whitespace-collapsed prompt
+        """
+        self.backend = backend
+        self.normalize_whitespace = normalize_whitespace
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self, model_settings: str, prompt: Any, output_format: Optional[str] = None) -> Tuple[str, ...]:
+        """
+        Build the cache keys for a request.
+
+        Args:
+            model_settings: Provider, model and sampling settings of the request
+            prompt: The prompt sent to the LLM
+            output_format: Optional output format specification
+
+        Returns:
+            The exact key, followed by the whitespace-collapsed key if normalize_whitespace is set
+        """
+        texts = [("exact", render_prompt(prompt))]
+        if self.normalize_whitespace:
+            texts.append(("whitespace", render_prompt(prompt, collapse_whitespace=True)))
+        return tuple(
+            hashlib.sha256(json.dumps([model_settings, kind, text, output_format]).encode()).hexdigest()
+            for kind, text in texts
+        )
+
+    def get(self, keys: Tuple[str, ...]) -> Any:
+        """Return the cached response for the first key that has one, or MISS."""
+        for key in keys:
+            value = self.backend.get(key)
+            if value is not MISS:
+                self.hits += 1
+                logger.debug("LLM cache hit (%d hits, %d misses)", self.hits, self.misses)
+                return value
+        self.misses += 1
+        logger.debug("LLM cache miss (%d hits, %d misses)", self.hits, self.misses)
+        return MISS
+
+    def put(self, keys: Tuple[str, ...], value: Any) -> None:
+        """Store a response under every key."""
+        for key in keys:
+            self.backend.set(key, value)
+
+    def clear(self) -> None:
+        """Drop all cached responses and log the counters of the cleared run."""
+        logger.info("Clearing LLM cache after %d hits and %d misses", self.hits, self.misses)
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def render_prompt(prompt: Any, collapse_whitespace: bool = False) -> str:
+    """Render a prompt into a canonical string for hashing, optionally with runs of whitespace collapsed."""
+    def text(content: Any) -> Any:
+        if collapse_whitespace and isinstance(content, str):
+            return _whitespace_pattern.sub(" ", content).strip()
+        return content
+
+    if isinstance(prompt, ChatPromptTemplate):
+        prompt = prompt.format_messages()
+    if isinstance(prompt, list):
+        return json.dumps([[message.type, text(message.content)] for message in prompt])
+    return text(str(prompt))
+
+
+class SemanticCache:
+    """
+    Cache of LLM responses matched by prompt embedding similarity.
+    
+    Responses are grouped by scope (model settings and output format) and a lookup
+    returns the response of the most similar earlier prompt in the same scope when
+    their cosine similarity reaches the threshold, so paraphrased prompts share a
+    response. Embeddings are compared by brute force, which suits a few thousand
+    entries per scope.
+    """
+
+    def __init__(self, embed: Callable[[str], List[float]], threshold: float, max_size: int):
+        """
+        Initialize the cache.
+
+        Args:
+            embed: Function returning the embedding of a text
+            threshold: Minimum cosine similarity for a cached response to be reused
+            max_size: Maximum number of entries kept per scope, oldest evicted first
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.max_size = max_size
+        self._scopes: Dict[Any, Tuple[np.ndarray, List[Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: Any, text: str) -> Tuple[Any, Optional[np.ndarray]]:
+        """
+        Look up the response of the most similar cached prompt.
+
+        Args:
+            scope: Key that cached prompts must share to match
+            text: The rendered prompt
+
+        Returns:
+            A copy of the cached response or MISS, and the normalized prompt embedding
+            to store the new response under (None if embedding failed)
+        """
+        try:
+            vector = np.asarray(self.embed(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning("Error embedding prompt for the semantic cache: %s", e)
+            return MISS, None
+        vector /= np.linalg.norm(vector) or 1.0
+
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None:
+                return MISS, vector
+            matrix, values = entry
+            similarities = matrix @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return MISS, vector
+            value = values[best]
+        logger.debug("Semantic cache hit with similarity %.3f", similarities[best])
+        return copy.deepcopy(value), vector
+
+    def put(self, scope: Any, vector: np.ndarray, value: Any) -> None:
+        """Store a copy of value under a normalized prompt embedding, evicting the oldest entries."""
+        if self.max_size <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            matrix, values = self._scopes.get(scope, (np.empty((0, vector.shape[0]), dtype=np.float32), []))
+            matrix = np.vstack([matrix, vector])[-self.max_size:]
+            values = (values + [value])[-self.max_size:]
+            self._scopes[scope] = (matrix, values)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._scopes.clear()
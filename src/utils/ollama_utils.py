@@ -1,115 +1,183 @@
-import os
+import atexit
 import json
+import logging
+import time
 import requests
-from typing import Dict, Any, Optional, List
-from langchain_core.messages import HumanMessage, SystemMessage
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Callable, Iterator, Optional, List, Tuple
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+import config
+from utils.json_extract import extract_json_from_response
+
+logger = logging.getLogger('ai-product-evaluator')
+
+# Built once, since json.loads builds a new decoder whenever it is given options.
+# Non-strict decoding accepts raw newlines and tabs inside strings, which models often emit.
+_lenient_decoder = json.JSONDecoder(strict=False)
 
 # Ollama API endpoint
-OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api")
+OLLAMA_API_URL = config.OLLAMA_URL
+
+# Shared session so repeated model listings and generations reuse pooled connections.
+# The pool holds one connection per concurrent LLM request so none are discarded under load.
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_maxsize=config.LLM_MAX_CONCURRENCY))
+_session.mount("https://", HTTPAdapter(pool_maxsize=config.LLM_MAX_CONCURRENCY))
+atexit.register(_session.close)
+
+# Installed models change rarely, so a listing is reused for this many seconds
+_MODELS_TTL = 60.0
+_models_cache: Optional[Tuple[float, List[str]]] = None
 
 def get_available_models() -> List[str]:
-    """Get a list of available models from the Ollama server."""
+    """Get a list of available models from the Ollama server, reusing a recent listing."""
+    global _models_cache
+    if _models_cache is not None and time.monotonic() - _models_cache[0] < _MODELS_TTL:
+        return list(_models_cache[1])
     try:
-        response = requests.get(f"{OLLAMA_API_URL}/tags")
+        response = _session.get(f"{OLLAMA_API_URL}/tags", timeout=2)
         if response.status_code == 200:
-            models = response.json().get("models", [])
-            return [model["name"] for model in models]
+            models = [model["name"] for model in response.json().get("models", [])]
+            # Only successful listings are kept, so a server that just started is picked up right away
+            _models_cache = (time.monotonic(), models)
+            return list(models)
         return []
     except Exception as e:
-        print(f"Error fetching Ollama models: {e}")
+        logger.warning("Error fetching Ollama models: %s", e)
         return []
 
-def call_ollama(prompt: Any, model_name: str = "llama3.1", output_format: Optional[str] = None) -> Any:
+# Ollama chat roles of langchain message types
+_CHAT_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+def _chat_messages(prompt: Any, output_format: Optional[str] = None) -> List[Dict[str, str]]:
+    """Convert a prompt, with any JSON formatting instruction, into Ollama chat messages."""
+    if isinstance(prompt, ChatPromptTemplate):
+        # Templates are formatted with empty kwargs since we don't have any variables to format
+        prompt = prompt.format_messages()
+    if isinstance(prompt, list):
+        messages = [
+            {"role": _CHAT_ROLES.get(message.type, "user"), "content": message.content}
+            for message in prompt
+        ]
+    else:
+        messages = [{"role": "user", "content": str(prompt)}]
+    
+    # Add JSON formatting instruction if needed, ahead of the prompt so Ollama can reuse the shared prefix
+    if output_format:
+        messages.insert(0, {
+            "role": "system",
+            "content": f"Format your response as a valid JSON object with the following structure: {output_format}"
+        })
+    
+    return messages
+
+def _json_format(output_format: str) -> Any:
+    """Pick Ollama's format option: the schema itself for JSON schemas, plain JSON mode otherwise."""
+    try:
+        schema = json.loads(output_format)
+    except ValueError:
+        schema = None
+    if isinstance(schema, dict) and "properties" in schema:
+        # Constrain generation to the schema's structure
+        return schema
+    # Constrain generation to valid JSON
+    return "json"
+
+def call_ollama(
+    prompt: Any,
+    model_name: str = "llama3.1",
+    output_format: Optional[str] = None,
+    stream_callback: Optional[Callable[[str], None]] = None
+) -> Any:
     """
     Call the Ollama API with a prompt and optionally parse the output.
     
+    The response is streamed, so stream_callback sees each piece as it is generated.
+    
     Args:
         prompt: The prompt to send to Ollama
         model_name: Name of the model to use (default: llama3.1)
         output_format: Optional output format specification for JSON parsing
+        stream_callback: Optional function called with each piece of the response text
         
     Returns:
         The Ollama response, optionally parsed according to the output format
     """
-    # Convert prompt to string if it's a ChatPromptTemplate
-    if isinstance(prompt, ChatPromptTemplate):
+    payload = _chat_payload(prompt, model_name, output_format)
+    
+    try:
+        parts = []
+        for part in _stream_chat(payload):
+            parts.append(part)
+            if stream_callback is not None:
+                stream_callback(part)
+        content = "".join(parts)
+    except Exception as e:
+        logger.warning("Error calling Ollama API: %s", e)
+        return None
+    
+    # Parse JSON if needed
+    if output_format:
+        # Constrained decoding makes the reply a bare JSON value, so try it as a whole first
         try:
-            # Format the messages with empty kwargs since we don't have any variables to format
-            messages = prompt.format_messages()
-            prompt_text = ""
-            
-            for message in messages:
-                if isinstance(message, SystemMessage):
-                    prompt_text += f"System: {message.content}\n\n"
-                elif isinstance(message, HumanMessage):
-                    prompt_text += f"Human: {message.content}\n\n"
-                else:
-                    prompt_text += f"{message.type}: {message.content}\n\n"
+            parsed = _lenient_decoder.decode(content)
+            if isinstance(parsed, (dict, list)):
+                return parsed
+        except ValueError:
+            pass
+        try:
+            # Fall back to extracting JSON wrapped in prose, e.g. from servers that ignore the format option
+            json_content = extract_json_from_response(content)
+            if json_content:
+                return json_content
         except Exception as e:
-            print(f"Error formatting ChatPromptTemplate: {e}")
-            prompt_text = str(prompt)
-    else:
-        prompt_text = str(prompt)
+            logger.warning("Error parsing JSON from Ollama response: %s", e)
     
-    # Add JSON formatting instruction if needed
-    if output_format:
-        prompt_text += f"\n\nFormat your response as a valid JSON object with the following structure: {output_format}"
+    return content
+
+def stream_ollama(prompt: Any, model_name: str = "llama3.1", output_format: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream an Ollama response as text chunks.
+    
+    Closing the generator early closes the underlying connection, which stops generation.
     
-    # Prepare the request payload
+    Args:
+        prompt: The prompt to send to Ollama
+        model_name: Name of the model to use (default: llama3.1)
+        output_format: Optional output format specification for JSON output
+        
+    Yields:
+        Pieces of the response text as they arrive
+    """
+    try:
+        yield from _stream_chat(_chat_payload(prompt, model_name, output_format))
+    except requests.RequestException as e:
+        logger.warning("Error calling Ollama API: %s", e)
+
+def _chat_payload(prompt: Any, model_name: str, output_format: Optional[str]) -> Dict[str, Any]:
+    """Build a streaming /api/chat request body, so the model applies its own chat template to the roles."""
     payload = {
         "model": model_name,
-        "prompt": prompt_text,
-        "stream": False
+        "messages": _chat_messages(prompt, output_format),
+        "stream": True
     }
-    
-    try:
-        # Make the API request
-        response = requests.post(f"{OLLAMA_API_URL}/generate", json=payload)
-        
-        if response.status_code == 200:
-            result = response.json()
-            content = result.get("response", "")
-            
-            # Parse JSON if needed
-            if output_format:
-                try:
-                    # Try to extract JSON from the response
-                    json_content = extract_json_from_response(content)
-                    if json_content:
-                        return json_content
-                except Exception as e:
-                    print(f"Error parsing JSON from Ollama response: {e}")
-            
-            return content
-        else:
-            print(f"Error calling Ollama API: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        print(f"Error calling Ollama API: {e}")
-        return None
+    if output_format:
+        payload["format"] = _json_format(output_format)
+    return payload
 
-def extract_json_from_response(content: str) -> Optional[Dict[str, Any]]:
-    """Extract JSON from a response string."""
-    try:
-        # Try to find JSON in the response
-        json_start = content.find("{")
-        json_end = content.rfind("}") + 1
-        
-        if json_start >= 0 and json_end > json_start:
-            json_str = content[json_start:json_end]
-            return json.loads(json_str)
-        
-        # Try to find JSON array
-        json_start = content.find("[")
-        json_end = content.rfind("]") + 1
-        
-        if json_start >= 0 and json_end > json_start:
-            json_str = content[json_start:json_end]
-            return json.loads(json_str)
-        
-        return None
-    except Exception as e:
-        print(f"Error extracting JSON from response: {e}")
-        return None 
\ No newline at end of file
+def _stream_chat(payload: Dict[str, Any]) -> Iterator[str]:
+    """Post a chat request and yield the reply text as it arrives, raising on HTTP errors."""
+    with _session.post(f"{OLLAMA_API_URL}/chat", json=payload, stream=True) as response:
+        if response.status_code != 200:
+            raise requests.HTTPError(f"{response.status_code} - {response.text}")
+        # Each line is a JSON object holding the next piece of the reply
+        for line in response.iter_lines():
+            if not line:
+                continue
+            part = json.loads(line)
+            content = part.get("message", {}).get("content")
+            if content:
+                yield content
+            if part.get("done"):
+                return
@@ -0,0 +1,78 @@
+"""Chat completions through the OpenAI Batch API"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+from utils.json_extract import compact_json
+
+logger = logging.getLogger('ai-product-evaluator')
+
+# Batch statuses after which the job no longer changes
+_FINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+_CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+
+def run_chat_batch(
+    client: Any,
+    bodies: Dict[str, Dict[str, Any]],
+    poll_interval: float = 30.0,
+    timeout: float = 24 * 60 * 60
+) -> Dict[str, Optional[str]]:
+    """
+    Run chat completion requests as one OpenAI batch job and wait for the results.
+
+    Batch jobs are billed at a discount and do not count against the per-minute
+    rate limits, at the cost of finishing within the 24 hour completion window
+    rather than right away. This blocks until the job ends.
+
+    Args:
+        client: The openai.OpenAI client to submit the job with
+        bodies: Chat completion request bodies keyed by a custom id
+        poll_interval: Seconds between job status checks
+        timeout: Seconds to wait before cancelling the job
+
+    Returns:
+        The message content of each request keyed by its custom id, None for requests that failed
+
+    Raises:
+        RuntimeError: If the job fails, expires or is cancelled
+        TimeoutError: If the job does not finish within the timeout
+    """
+    lines = "\n".join(
+        compact_json({"custom_id": custom_id, "method": "POST", "url": _CHAT_COMPLETIONS_URL, "body": body})
+        for custom_id, body in bodies.items()
+    )
+    input_file = client.files.create(file=("batch.jsonl", lines.encode("utf-8")), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=_CHAT_COMPLETIONS_URL,
+        completion_window="24h"
+    )
+    logger.info("Submitted OpenAI batch %s with %d requests", batch.id, len(bodies))
+
+    deadline = time.monotonic() + timeout
+    while batch.status not in _FINAL_STATUSES:
+        if time.monotonic() > deadline:
+            client.batches.cancel(batch.id)
+            raise TimeoutError(f"OpenAI batch {batch.id} did not finish within {timeout:.0f} seconds")
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != "completed":
+        raise RuntimeError(f"OpenAI batch {batch.id} ended with status {batch.status}")
+    logger.info("OpenAI batch %s completed", batch.id)
+
+    contents: Dict[str, Optional[str]] = dict.fromkeys(bodies)
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line:
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if response.get("status_code") == 200:
+                contents[result["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+            else:
+                logger.warning("Batched request %s failed: %s", result.get("custom_id"), result.get("error") or response)
+    return contents
@@ -0,0 +1,238 @@
+"""Live Rich display of agent progress"""
+
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+from rich.style import Style
+from rich.text import Span, Text
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import bisect
+import threading
+# Monotonic clock for pacing redraws
+from time import monotonic as _now
+
+# Rows are pre-styled Text, so Rich's regex highlighter has nothing to add
+console = Console(highlight=False)
+
+# Row styles, shared by every refresh
+_STYLE_DONE = Style(color="green", bold=True)
+_STYLE_ERROR = Style(color="red", bold=True)
+_STYLE_PENDING = Style(color="yellow")
+_STYLE_NAME = Style(bold=True)
+_STYLE_TICKER = Style(color="cyan")
+
+# Width of the agent name column
+_NAME_WIDTH = 20
+
+# Seconds between redraws of the agent progress display; the final frame is drawn on stop
+_MIN_REFRESH_INTERVAL = 0.25
+
+# Style and symbol of each status, by lowercase status; other statuses are pending
+_STATUS_MARKERS = {
+    "done": (_STYLE_DONE, "✓"),
+    "error": (_STYLE_ERROR, "✗")
+}
+_PENDING_MARKER = (_STYLE_PENDING, "⋯")
+
+# Statuses drawn as soon as they are set, since they end an agent's run
+_FINAL_STATUSES = frozenset(_STATUS_MARKERS)
+
+
+class _AgentStatus:
+    """Latest status and ticker of one agent."""
+
+    __slots__ = ("status", "ticker", "marker")
+
+    def __init__(self):
+        self.status = ""
+        self.ticker: Optional[str] = None
+        # Style and symbol of the status, looked up when the status changes
+        self.marker = _PENDING_MARKER
+
+
+class AgentProgress:
+    """Manages progress tracking for multiple agents."""
+
+    def __init__(self):
+        self.agent_status: Dict[str, _AgentStatus] = {}
+        self.table = Table(show_header=False, box=None, padding=(0, 1))
+        self.table.add_column(width=100)
+        # Sort key and display name of each agent, computed when it first reports
+        self._agent_meta: Dict[str, Tuple[Tuple[int, str], str]] = {}
+        # Sort keys of the agents in display order, kept sorted as agents are added
+        self._ordered_agents: List[Tuple[int, str]] = []
+        # One Text per agent, updated in place when its status changes
+        self._row_texts: Dict[str, Text] = {}
+        # Agents whose status changed since the table was last refreshed
+        self._changed: Set[str] = set()
+        # Set when a status changed since the table was last rebuilt
+        self._dirty = False
+        # Agents update their status from worker threads while Live renders from its own
+        self._lock = threading.Lock()
+        # Live only redraws when a status update asks it to, so idle agents cost no redraws
+        self.live = Live(console=console, auto_refresh=False, get_renderable=self._render)
+        self.started = False
+        # When the display was last redrawn
+        self._last_refresh = 0.0
+        # Redraws updates that arrived too soon after the last redraw, once the interval has passed
+        self._trailing_refresh: Optional[threading.Timer] = None
+
+    def start(self):
+        """Start the progress display."""
+        if not self.started:
+            # Draw at once to catch up on updates made before the display started; until then
+            # updates are only recorded, and no table is built
+            self.live.start(refresh=True)
+            self.started = True
+
+    def stop(self):
+        """Stop the progress display."""
+        if self.started:
+            with self._lock:
+                if self._trailing_refresh is not None:
+                    self._trailing_refresh.cancel()
+                    self._trailing_refresh = None
+            self.live.stop()
+            self.started = False
+
+    def __enter__(self) -> "AgentProgress":
+        """Start the display for the duration of a with block."""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Stop the display, even when the block raised."""
+        self.stop()
+
+    def update_status(self, agent_name: str, ticker: Optional[str] = None, status: str = ""):
+        """Update the status of an agent."""
+        self.update_many([(agent_name, ticker, status)])
+
+    def update_many(self, updates: Iterable[Tuple[str, Optional[str], str]]) -> None:
+        """
+        Apply several (agent name, ticker, status) updates with at most one redraw.
+
+        Args:
+            updates: The updates to apply, in order
+        """
+        changed = False
+        immediate = False
+        with self._lock:
+            for agent_name, ticker, status in updates:
+                if self._apply(agent_name, ticker, status):
+                    changed = True
+                    immediate = immediate or status.lower() in _FINAL_STATUSES
+
+        if changed:
+            # Show finished and failed agents right away; other updates are batched into the next redraw
+            self._maybe_refresh(immediate=immediate)
+
+    def _apply(self, agent_name: str, ticker: Optional[str], status: str) -> bool:
+        """Record one update under the lock, returning whether it changed anything."""
+        current = self.agent_status.get(agent_name)
+        if current is not None and (not ticker or current.ticker == ticker) and (not status or current.status == status):
+            # Repeated updates change nothing, so skip marking the row and redrawing
+            return False
+        if current is None:
+            current = self.agent_status[agent_name] = _AgentStatus()
+            self._agent_meta[agent_name] = _agent_meta(agent_name)
+            bisect.insort(self._ordered_agents, self._agent_meta[agent_name][0])
+
+        if ticker:
+            current.ticker = ticker
+        if status:
+            current.status = status
+            current.marker = _STATUS_MARKERS.get(status.lower(), _PENDING_MARKER)
+
+        self._changed.add(agent_name)
+        self._dirty = True
+        return True
+
+    def _maybe_refresh(self, immediate: bool = False) -> None:
+        """
+        Redraw the display if the last redraw is old enough, or right away if immediate.
+
+        Otherwise a single trailing redraw is scheduled for when the interval has passed,
+        so the update still shows while agents wait on long LLM calls.
+        """
+        if not self.started:
+            return
+        now = _now()
+        wait = _MIN_REFRESH_INTERVAL - (now - self._last_refresh)
+        if immediate or wait <= 0:
+            self._last_refresh = now
+            # Outside the status lock, since redrawing takes it to rebuild the table
+            self.live.refresh()
+            return
+        with self._lock:
+            if self._trailing_refresh is None:
+                self._trailing_refresh = threading.Timer(wait, self._refresh_pending)
+                self._trailing_refresh.daemon = True
+                self._trailing_refresh.start()
+
+    def _refresh_pending(self) -> None:
+        """Redraw updates that were skipped by _maybe_refresh, unless a later redraw already drew them."""
+        with self._lock:
+            self._trailing_refresh = None
+            pending = self._dirty
+        if pending and self.started:
+            self._last_refresh = _now()
+            self.live.refresh()
+
+    def _render(self) -> Table:
+        """Return the table for Live, rebuilding it only if a status changed since the last render."""
+        with self._lock:
+            if self._dirty:
+                self._refresh_display()
+                self._dirty = False
+            return self.table
+
+    def _refresh_display(self):
+        """Refresh the rows of agents whose status changed, laying the table out again only for new agents."""
+        new_agents = [agent_name for agent_name in self._changed if agent_name not in self._row_texts]
+        for agent_name in self._changed:
+            text = self._row_texts.setdefault(agent_name, Text())
+            self._fill_row(text, self._agent_meta[agent_name][1], self.agent_status[agent_name])
+        self._changed.clear()
+
+        if new_agents:
+            self.table = Table(show_header=False, box=None, padding=(0, 1))
+            self.table.add_column(width=100)
+            for _, agent_name in self._ordered_agents:
+                self.table.add_row(self._row_texts[agent_name])
+
+    @staticmethod
+    def _fill_row(status_text: Text, agent_display: str, info: _AgentStatus) -> None:
+        """Rewrite an agent's row text in place from its status."""
+        status = info.status
+        ticker = info.ticker
+        style, symbol = info.marker
+
+        parts = [(f"{symbol} ", style), (agent_display, _STYLE_NAME)]
+        if ticker:
+            parts.append((f"[{ticker}] ", _STYLE_TICKER))
+        parts.append((status, style))
+
+        # Set the text and its spans in one go rather than appending and restyling piece by piece.
+        # The plain setter and the spans reference both reuse the row's existing lists.
+        # Spans are cleared first, so shortening the text has no stale spans to trim
+        spans = status_text.spans
+        spans.clear()
+        status_text.plain = "".join(part for part, _ in parts)
+        offset = 0
+        for part, part_style in parts:
+            spans.append(Span(offset, offset + len(part), part_style))
+            offset += len(part)
+
+
+def _agent_meta(agent_name: str) -> Tuple[Tuple[int, str], str]:
+    """Return an agent's sort key, with Risk Management and Portfolio Management at the bottom, and its fixed-width display name."""
+    if "risk_management" in agent_name:
+        category = 2
+    elif "portfolio_management" in agent_name:
+        category = 3
+    else:
+        category = 1
+    agent_display = agent_name.replace("_agent", "").replace("_", " ").title()
+    # Cut long names to leave at least one space before the status, so statuses stay aligned
+    return (category, agent_name), agent_display[:_NAME_WIDTH - 1].ljust(_NAME_WIDTH)
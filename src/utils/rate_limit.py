@@ -0,0 +1,37 @@
+"""Request rate limiting for LLM providers"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket that spreads requests evenly under a per-minute limit."""
+
+    def __init__(self, requests_per_minute: float):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Maximum sustained request rate (0 disables limiting)
+        """
+        self.rate = requests_per_minute / 60.0
+        # Allow a burst of up to one second's worth of requests, but always at least one
+        self.capacity = max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
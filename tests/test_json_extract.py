@@ -0,0 +1,99 @@
+from pydantic import BaseModel
+
+from utils.json_extract import (
+    JsonObjectStream,
+    extract_first_json_object,
+    extract_json_from_response,
+    parse_llm_json,
+    parse_llm_model
+)
+
+
+class Signal(BaseModel):
+    score: float = 0.5
+    reasoning: str = "default"
+
+
+def feed_all(stream, chunks):
+    """Feed chunks in order and return the first block the stream completes."""
+    for chunk in chunks:
+        block = stream.feed(chunk)
+        if block is not None:
+            return block
+    return None
+
+
+def test_stream_split_inside_escape():
+    text = 'Sure: {"reasoning": "a \\"quoted\\" } brace", "score": 0.9} done'
+    # Split right after each backslash, so the escaped character arrives in the next chunk
+    chunks = text.replace("\\", "\\\x00").split("\x00")
+    assert len(chunks) > 2
+    assert feed_all(JsonObjectStream(), chunks) == '{"reasoning": "a \\"quoted\\" } brace", "score": 0.9}'
+
+
+def test_stream_split_every_character():
+    text = 'x {"a": {"b": "c\\\\"}, "d": "}"} y'
+    assert feed_all(JsonObjectStream(), list(text)) == '{"a": {"b": "c\\\\"}, "d": "}"}'
+
+
+def test_stream_skips_placeholder_block():
+    chunks = ["Fill in {place", "holder} first. ", '{"score": 1', "}"]
+    assert feed_all(JsonObjectStream(), chunks) == '{"score": 1}'
+
+
+def test_stream_prose_only():
+    assert feed_all(JsonObjectStream(), ["I cannot ", "evaluate this idea."]) is None
+
+
+def test_extract_first_json_object_ignores_braces_in_strings():
+    text = 'Result: {"reasoning": "uses {braces}", "nested": {"a": 1}} trailing }'
+    assert extract_first_json_object(text) == '{"reasoning": "uses {braces}", "nested": {"a": 1}}'
+
+
+def test_extract_first_json_object_prose_only():
+    assert extract_first_json_object("No JSON here.") is None
+
+
+def test_extract_json_from_response_skips_placeholder_block():
+    text = 'Replace {placeholder} with values: {"score": 0.7, "reasoning": "line one\nline two"}'
+    assert extract_json_from_response(text) == {"score": 0.7, "reasoning": "line one\nline two"}
+
+
+def test_extract_json_from_response_prefers_fenced_block():
+    text = 'Example {"score": 0} below.\n```json\n{"score": 0.8}\n```'
+    assert extract_json_from_response(text) == {"score": 0.8}
+
+
+def test_extract_json_from_response_prose_only():
+    assert extract_json_from_response("I would rather not answer.") is None
+
+
+def test_parse_llm_json_skips_placeholder_block():
+    assert parse_llm_json('Use {placeholder}: {"score": 0.3}', {"score": 0.5}) == {"score": 0.3}
+
+
+def test_parse_llm_json_prose_only_returns_copy_of_defaults():
+    defaults = {"score": 0.5}
+    parsed = parse_llm_json("Nothing to parse.", defaults)
+    assert parsed == defaults
+    assert parsed is not defaults
+
+
+def test_parse_llm_model_skips_placeholder_block():
+    signal = parse_llm_model('Fill {placeholder}. {"score": 0.9, "reasoning": "ok"}', Signal)
+    assert signal == Signal(score=0.9, reasoning="ok")
+
+
+def test_parse_llm_model_prose_only():
+    assert parse_llm_model("I cannot help with that.", Signal) is None
+
+
+def test_parse_llm_model_rejects_objects_that_set_no_fields():
+    assert parse_llm_model("{}", Signal) is None
+    assert parse_llm_model('Here: {"unrelated": 1}', Signal) is None
+
+
+def test_parse_llm_model_skips_unrelated_object_before_signal():
+    signal = parse_llm_model('Context {"unrelated": 1} then {"reasoning": "found"}', Signal)
+    assert signal.reasoning == "found"
+    assert signal.model_fields_set == {"reasoning"}